@@ -5,7 +5,7 @@ from dspy.teleprompt.bootstrap import BootstrapFewShot
 from dspy.predict.react import ReAct
 # 순환 import 방지를 위해 필요한 함수만 import
 # Narrative 전용 모델 사용
-from init_dspy import execute_with_sdk, execute_with_sdk_with_retry, get_narrative_optimal_model
+from init_dspy import execute_with_sdk, execute_with_sdk_with_retry, get_narrative_optimal_model, ensure_default_lm
 import time
 import random
 
@@ -256,12 +256,22 @@ class AdvancedAnalysisPipeline(Module):
         strategy_result = self.strategy_generator(input + req_result + reasoning_result)
         return strategy_result
 
+def is_valid_result(value) -> bool:
+    """구조적 결과 검증 - 비어 있거나 실패 표식(❌/⚠️)으로 시작하면 실패"""
+    if not value:
+        return False
+    text = str(value).strip()
+    return bool(text) and not text.startswith("❌") and not text.startswith("⚠️")
+
 def execute_with_retry(func, *args, max_retries=3, **kwargs):
     """재시도 로직을 포함한 함수 실행"""
+    # DSPy 기본 LM은 첫 실행 시점에 설정
+    ensure_default_lm()
+    
     for attempt in range(max_retries):
         try:
             result = func(*args, **kwargs)
-            if result and not str(result).startswith("❌") and not str(result).startswith("⚠️"):
+            if is_valid_result(result):
                 return result
             elif attempt == max_retries - 1:  # 마지막 시도
                 return result
@@ -286,7 +296,7 @@ def execute_agent_hybrid(prompt: str, model: str = None, use_sdk: bool = True):
     if use_sdk:
         try:
             result = execute_with_sdk(prompt, model)
-            if result and not result.startswith("❌") and not result.startswith("⚠️"):
+            if is_valid_result(result):
                 return result
         except Exception as e:
             print(f"SDK 실행 실패, DSPy로 폴백: {e}")
@@ -299,7 +309,7 @@ def run_requirement_table(full_prompt):
     def _run():
         result = dspy.Predict(RequirementTableSignature)(input=full_prompt)
         value = getattr(result, "requirement_table", "")
-        if not value or value.strip() == "" or "error" in value.lower():
+        if not is_valid_result(value):
             return "⚠️ 결과 생성 실패: 요구사항표가 정상적으로 생성되지 않았습니다."
         return value
     
@@ -309,7 +319,7 @@ def run_ai_reasoning(full_prompt):
     def _run():
         result = dspy.Predict(AIReasoningSignature)(input=full_prompt)
         value = getattr(result, "ai_reasoning", "")
-        if not value or value.strip() == "" or "error" in value.lower():
+        if not is_valid_result(value):
             return "⚠️ 결과 생성 실패: AI reasoning이 정상적으로 생성되지 않았습니다."
         return value
     
@@ -319,7 +329,7 @@ def run_precedent_comparison(full_prompt):
     def _run():
         result = dspy.Predict(PrecedentComparisonSignature)(input=full_prompt)
         value = getattr(result, "precedent_comparison", "")
-        if not value or value.strip() == "" or "error" in value.lower():
+        if not is_valid_result(value):
             return "⚠️ 결과 생성 실패: 유사 사례 비교가 정상적으로 생성되지 않았습니다."
         return value
     
@@ -329,7 +339,7 @@ def run_strategy_recommendation(full_prompt):
     def _run():
         result = dspy.Predict(StrategyRecommendationSignature)(input=full_prompt)
         value = getattr(result, "strategy_recommendation", "")
-        if not value or value.strip() == "" or "error" in value.lower():
+        if not is_valid_result(value):
             return "⚠️ 결과 생성 실패: 전략 제언이 정상적으로 생성되지 않았습니다."
         return value
     
@@ -340,7 +350,7 @@ def execute_agent(prompt):
     def _run():
         result = dspy.Predict(OptimizationConditionSignature)(input=prompt)
         value = getattr(result, "optimization_analysis", "")
-        if not value or value.strip() == "" or "error" in value.lower():
+        if not is_valid_result(value):
             return "⚠️ 결과 생성 실패: AI 분석이 정상적으로 생성되지 않았습니다."
         return value
     
@@ -353,11 +363,11 @@ def generate_narrative(prompt):
         # 직접 SDK 호출로 더 나은 성능
         result = execute_with_sdk_with_retry(prompt, get_narrative_optimal_model(), max_retries=3)
         
-        if not result or result.strip() == "" or "error" in result.lower():
+        if not is_valid_result(result):
             # DSPy 폴백
             result = dspy.Predict(NarrativeGenerationSignature)(input=prompt)
             value = getattr(result, "narrative_story", "")
-            if not value or value.strip() == "" or "error" in value.lower():
+            if not is_valid_result(value):
                 return "⚠️ 결과 생성 실패: Narrative가 정상적으로 생성되지 않았습니다."
             return value
         
@@ -393,7 +403,7 @@ def execute_midjourney_prompt(prompt):
     def _run():
         result = dspy.Predict(MidjourneyPromptSignature)(input=prompt)
         value = getattr(result, "midjourney_prompt", "")
-        if not value or value.strip() == "" or "error" in value.lower():
+        if not is_valid_result(value):
             return "⚠️ 결과 생성 실패: Midjourney 프롬프트가 정상적으로 생성되지 않았습니다."
         return value
     
@@ -405,7 +415,7 @@ def run_document_analyzer(full_prompt):
     def _run():
         result = dspy.Predict(DocumentAnalyzerSignature)(input=full_prompt)
         value = getattr(result, "document_analysis", "")
-        if not value or value.strip() == "" or "error" in value.lower():
+        if not is_valid_result(value):
             return "⚠️ 결과 생성 실패: 문서 분석이 정상적으로 생성되지 않았습니다."
         return value
     
@@ -416,7 +426,7 @@ def run_requirement_analyzer(full_prompt):
     def _run():
         result = dspy.Predict(RequirementAnalyzerSignature)(input=full_prompt)
         value = getattr(result, "requirement_analysis", "")
-        if not value or value.strip() == "" or "error" in value.lower():
+        if not is_valid_result(value):
             return "⚠️ 결과 생성 실패: 요구사항 분석이 정상적으로 생성되지 않았습니다."
         return value
     
@@ -427,7 +437,7 @@ def run_task_comprehension(full_prompt):
     def _run():
         result = dspy.Predict(TaskComprehensionSignature)(input=full_prompt)
         value = getattr(result, "task_comprehension", "")
-        if not value or value.strip() == "" or "error" in value.lower():
+        if not is_valid_result(value):
             return "⚠️ 결과 생성 실패: 과업 이해가 정상적으로 생성되지 않았습니다."
         return value
     
@@ -438,7 +448,7 @@ def run_risk_strategist(full_prompt):
     def _run():
         result = dspy.Predict(RiskStrategistSignature)(input=full_prompt)
         value = getattr(result, "risk_analysis", "")
-        if not value or value.strip() == "" or "error" in value.lower():
+        if not is_valid_result(value):
             return "⚠️ 결과 생성 실패: 리스크 분석이 정상적으로 생성되지 않았습니다."
         return value
     
@@ -449,7 +459,7 @@ def run_site_regulation_analysis(full_prompt):
     def _run():
         result = dspy.Predict(SiteRegulationAnalysisSignature)(input=full_prompt)
         value = getattr(result, "site_regulation_analysis", "")
-        if not value or value.strip() == "" or "error" in value.lower():
+        if not is_valid_result(value):
             return "⚠️ 결과 생성 실패: 대지 규제 분석이 정상적으로 생성되지 않았습니다."
         return value
     
@@ -460,7 +470,7 @@ def run_compliance_analyzer(full_prompt):
     def _run():
         result = dspy.Predict(ComplianceAnalyzerSignature)(input=full_prompt)
         value = getattr(result, "compliance_analysis", "")
-        if not value or value.strip() == "" or "error" in value.lower():
+        if not is_valid_result(value):
             return "⚠️ 결과 생성 실패: 규정 준수 분석이 정상적으로 생성되지 않았습니다."
         return value
     
@@ -471,7 +481,7 @@ def run_precedent_benchmarking(full_prompt):
     def _run():
         result = dspy.Predict(PrecedentBenchmarkingSignature)(input=full_prompt)
         value = getattr(result, "precedent_benchmarking", "")
-        if not value or value.strip() == "" or "error" in value.lower():
+        if not is_valid_result(value):
             return "⚠️ 결과 생성 실패: 사례 벤치마킹이 정상적으로 생성되지 않았습니다."
         return value
     
@@ -482,7 +492,7 @@ def run_competitor_analyzer(full_prompt):
     def _run():
         result = dspy.Predict(CompetitorAnalyzerSignature)(input=full_prompt)
         value = getattr(result, "competitor_analysis", "")
-        if not value or value.strip() == "" or "error" in value.lower():
+        if not is_valid_result(value):
             return "⚠️ 결과 생성 실패: 경쟁사 분석이 정상적으로 생성되지 않았습니다."
         return value
     
@@ -493,7 +503,7 @@ def run_design_trend_application(full_prompt):
     def _run():
         result = dspy.Predict(DesignTrendApplicationSignature)(input=full_prompt)
         value = getattr(result, "design_trend_application", "")
-        if not value or value.strip() == "" or "error" in value.lower():
+        if not is_valid_result(value):
             return "⚠️ 결과 생성 실패: 설계 트렌드 적용이 정상적으로 생성되지 않았습니다."
         return value
     
@@ -504,7 +514,7 @@ def run_mass_strategy(full_prompt):
     def _run():
         result = dspy.Predict(MassStrategySignature)(input=full_prompt)
         value = getattr(result, "mass_strategy", "")
-        if not value or value.strip() == "" or "error" in value.lower():
+        if not is_valid_result(value):
             return "⚠️ 결과 생성 실패: 매스 전략이 정상적으로 생성되지 않았습니다."
         return value
     
@@ -515,7 +525,7 @@ def run_flexible_space_strategy(full_prompt):
     def _run():
         result = dspy.Predict(FlexibleSpaceStrategySignature)(input=full_prompt)
         value = getattr(result, "flexible_space_strategy", "")
-        if not value or value.strip() == "" or "error" in value.lower():
+        if not is_valid_result(value):
             return "⚠️ 결과 생성 실패: 가변형 공간 전략이 정상적으로 생성되지 않았습니다."
         return value
     
@@ -526,7 +536,7 @@ def run_concept_development(full_prompt):
     def _run():
         result = dspy.Predict(ConceptDevelopmentSignature)(input=full_prompt)
         value = getattr(result, "concept_development", "")
-        if not value or value.strip() == "" or "error" in value.lower():
+        if not is_valid_result(value):
             return "⚠️ 결과 생성 실패: 컨셉 개발이 정상적으로 생성되지 않았습니다."
         return value
     
@@ -537,7 +547,7 @@ def run_area_programming(full_prompt):
     def _run():
         result = dspy.Predict(AreaProgrammingSignature)(input=full_prompt)
         value = getattr(result, "area_programming", "")
-        if not value or value.strip() == "" or "error" in value.lower():
+        if not is_valid_result(value):
             return "⚠️ 결과 생성 실패: 면적 프로그래밍이 정상적으로 생성되지 않았습니다."
         return value
     
@@ -548,7 +558,7 @@ def run_schematic_space_plan(full_prompt):
     def _run():
         result = dspy.Predict(SchematicSpacePlanSignature)(input=full_prompt)
         value = getattr(result, "schematic_space_plan", "")
-        if not value or value.strip() == "" or "error" in value.lower():
+        if not is_valid_result(value):
             return "⚠️ 결과 생성 실패: 스키매틱 공간 계획이 정상적으로 생성되지 않았습니다."
         return value
     
@@ -559,7 +569,7 @@ def run_ux_circulation_simulation(full_prompt):
     def _run():
         result = dspy.Predict(UXCirculationSimulationSignature)(input=full_prompt)
         value = getattr(result, "ux_circulation_simulation", "")
-        if not value or value.strip() == "" or "error" in value.lower():
+        if not is_valid_result(value):
             return "⚠️ 결과 생성 실패: 사용자 경험 및 동선 시뮬레이션이 정상적으로 생성되지 않았습니다."
         return value
     
@@ -570,7 +580,7 @@ def run_design_requirement_summary(full_prompt):
     def _run():
         result = dspy.Predict(DesignRequirementSummarySignature)(input=full_prompt)
         value = getattr(result, "design_requirement_summary", "")
-        if not value or value.strip() == "" or "error" in value.lower():
+        if not is_valid_result(value):
             return "⚠️ 결과 생성 실패: 설계 요구사항 종합 요약이 정상적으로 생성되지 않았습니다."
         return value
     
@@ -581,7 +591,7 @@ def run_cost_estimation(full_prompt):
     def _run():
         result = dspy.Predict(CostEstimationSignature)(input=full_prompt)
         value = getattr(result, "cost_estimation", "")
-        if not value or value.strip() == "" or "error" in value.lower():
+        if not is_valid_result(value):
             return "⚠️ 결과 생성 실패: 비용 추정이 정상적으로 생성되지 않았습니다."
         return value
     
@@ -592,7 +602,7 @@ def run_architectural_branding_identity(full_prompt):
     def _run():
         result = dspy.Predict(ArchitecturalBrandingIdentitySignature)(input=full_prompt)
         value = getattr(result, "architectural_branding_identity", "")
-        if not value or value.strip() == "" or "error" in value.lower():
+        if not is_valid_result(value):
             return "⚠️ 결과 생성 실패: 건축 브랜딩 정체성이 정상적으로 생성되지 않았습니다."
         return value
     
@@ -603,7 +613,7 @@ def run_action_planner(full_prompt):
     def _run():
         result = dspy.Predict(ActionPlannerSignature)(input=full_prompt)
         value = getattr(result, "action_planner", "")
-        if not value or value.strip() == "" or "error" in value.lower():
+        if not is_valid_result(value):
             return "⚠️ 결과 생성 실패: 실행 계획이 정상적으로 생성되지 않았습니다."
         return value
     
@@ -614,7 +624,7 @@ def run_site_environment_analysis(full_prompt):
     def _run():
         result = dspy.Predict(SiteEnvironmentAnalysisSignature)(input=full_prompt)
         value = getattr(result, "site_environment_analysis", "")
-        if not value or value.strip() == "" or "error" in value.lower():
+        if not is_valid_result(value):
             return "⚠️ 결과 생성 실패: 대지 환경 분석이 정상적으로 생성되지 않았습니다."
         return value
     
@@ -625,7 +635,7 @@ def run_structure_technology_analysis(full_prompt):
     def _run():
         result = dspy.Predict(StructureTechnologyAnalysisSignature)(input=full_prompt)
         value = getattr(result, "structure_technology_analysis", "")
-        if not value or value.strip() == "" or "error" in value.lower():
+        if not is_valid_result(value):
             return "⚠️ 결과 생성 실패: 구조 기술 분석이 정상적으로 생성되지 않았습니다."
         return value
     
@@ -636,7 +646,7 @@ def run_proposal_framework(full_prompt):
     def _run():
         result = dspy.Predict(ProposalFrameworkSignature)(input=full_prompt)
         value = getattr(result, "proposal_framework", "")
-        if not value or value.strip() == "" or "error" in value.lower():
+        if not is_valid_result(value):
             return "⚠️ 결과 생성 실패: 제안서 프레임워크가 정상적으로 생성되지 않았습니다."
         return value
     
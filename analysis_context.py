@@ -0,0 +1,159 @@
+# analysis_context.py
+"""
+이전 분석 결과 컨텍스트 관리
+- 완료된 단계마다 압축 요약(다이제스트)을 한 번만 만들어 보관 (결과가 바뀔 때만 갱신)
+- 직접 선행 단계(의존성 · content_dsl.source)는 원문, 간접 선행 단계는 다이제스트로 포함
+- 종합 단계(전체 이전 결과 필요)는 모든 완료 단계를 다이제스트로 포함
+- 전체 컨텍스트는 토큰 예산을 넘지 않도록 최근 단계부터 채움
+"""
+
+import hashlib
+import re
+
+from init_dspy import estimate_tokens
+
+CONTEXT_TOKEN_BUDGET = 12000   # 이전 결과 섹션 전체 상한 (추정 토큰)
+DIGEST_MAX_CHARS = 600         # 단계별 다이제스트 최대 길이
+DIGEST_LINE_MAX_CHARS = 120    # 섹션별 요약 문장 최대 길이
+
+# content_dsl.source 중 이전 단계 결과가 아닌 항목
+NON_STEP_SOURCES = {"user_inputs", "pdf_summary", "site_fields", "all_previous_results"}
+
+def get_source_step_ids(dsl_block: dict) -> set:
+    """블록이 원문으로 참조하는 이전 단계 ID 목록 (content_dsl.source의 '<id>_results' / '<id>')"""
+    sources = (dsl_block or {}).get("content_dsl", {}).get("source", []) or []
+    step_ids = set()
+    for source in sources:
+        if source in NON_STEP_SOURCES:
+            continue
+        step_ids.add(source[:-len("_results")] if source.endswith("_results") else source)
+    return step_ids
+
+def needs_all_previous_results(dsl_block: dict) -> bool:
+    """전체 이전 결과를 요구하는 종합 블록인지 여부"""
+    return "all_previous_results" in ((dsl_block or {}).get("content_dsl", {}).get("source", []) or [])
+
+def make_digest(result: str, max_chars: int = DIGEST_MAX_CHARS) -> str:
+    """단계 결과 압축 요약 - 섹션 제목과 각 섹션의 첫 서술 문장만 추림"""
+    lines = []
+    heading = None
+    for raw_line in (result or "").splitlines():
+        line = raw_line.strip()
+        if not line or line.startswith("|") or set(line) <= set("-=*_ "):
+            continue
+        if line.startswith("#"):
+            heading = line.lstrip("#").strip()
+            lines.append(f"[{heading}]")
+            continue
+        if heading is not None:
+            # 섹션마다 첫 서술 문장 하나만 사용
+            sentence = re.split(r"(?<=[.!?다])\s", line, maxsplit=1)[0]
+            lines.append(sentence[:DIGEST_LINE_MAX_CHARS])
+            heading = None
+    digest = " ".join(lines) if lines else (result or "").strip()
+    return digest[:max_chars] + ("..." if len(digest) > max_chars else "")
+
+class ContextText(str):
+    """이전 결과 섹션 문자열 - 단계별 항목 목록(entries)을 함께 보관 (토큰 예산 축약 시 항목 경계로 사용)"""
+    entries = ()
+
+    def __new__(cls, entries):
+        text = super().__new__(cls, "\n\n".join(entries))
+        text.entries = tuple(entries)
+        return text
+
+def get_step_key(history_item: dict) -> str:
+    """cot_history 항목 식별자 (step_id 우선, 예전 기록은 제목)"""
+    return history_item.get("step_id") or history_item.get("step", "")
+
+class RollingContext:
+    """완료 단계 다이제스트를 보관하고 예산 내에서 이전 결과 컨텍스트를 조립"""
+
+    def __init__(self, token_budget: int = CONTEXT_TOKEN_BUDGET):
+        self.token_budget = token_budget
+        self._digests = {}  # step_key → (result_hash, digest)
+
+    def update(self, step_key: str, result: str) -> str:
+        """단계 결과 다이제스트 갱신 - 결과가 바뀌지 않았으면 기존 다이제스트 재사용"""
+        result_hash = hashlib.sha1((result or "").encode("utf-8")).hexdigest()
+        cached = self._digests.get(step_key)
+        if cached and cached[0] == result_hash:
+            return cached[1]
+        digest = make_digest(result)
+        self._digests[step_key] = (result_hash, digest)
+        return digest
+
+    def build(self, cot_history: list, full_text_keys=(), exclude_keys=(), token_budget: int = None, include_keys=None) -> str:
+        """
+        이전 결과 섹션 조립 (ContextText - 항목 목록은 entries, 결과 본문의 굵은 글씨와 항목 경계를 구분하기 위함).
+        full_text_keys: 원문이 필요한 단계 (예산 안에서 원문, 넘치면 다이제스트)
+        exclude_keys: 제외할 단계 (예: 재분석 중인 현재 단계)
+        include_keys: 지정하면 이 단계들만 포함 (예: 전이 의존 단계), None이면 전체
+        """
+        budget = token_budget or self.token_budget
+        full_text_keys = set(full_text_keys)
+        items = [
+            h for h in cot_history
+            if h.get("result") and get_step_key(h) not in exclude_keys and h.get("step") not in exclude_keys
+            and (include_keys is None or get_step_key(h) in include_keys or h.get("step") in include_keys)
+        ]
+
+        chosen = {}
+        used = 0
+        # 1) 명시적으로 필요한 단계 원문 (최근 단계 우선)
+        for index in reversed(range(len(items))):
+            h = items[index]
+            if get_step_key(h) not in full_text_keys and h.get("step") not in full_text_keys:
+                continue
+            text = f"**{h['step']}**: {h['result']}"
+            cost = estimate_tokens(text)
+            if used + cost <= budget:
+                chosen[index] = text
+                used += cost
+        # 2) 나머지 단계 다이제스트 (최근 단계 우선, 예산을 넘는 항목은 건너뜀)
+        for index in reversed(range(len(items))):
+            if index in chosen:
+                continue
+            h = items[index]
+            text = f"**{h['step']}** (요약): {self.update(get_step_key(h), h['result'])}"
+            cost = estimate_tokens(text)
+            if used + cost > budget:
+                continue
+            chosen[index] = text
+            used += cost
+
+        omitted = len(items) - len(chosen)
+        if omitted:
+            print(f"📚 이전 결과 컨텍스트: {len(chosen)}개 단계 포함, {omitted}개 생략 (약 {used} 토큰)")
+        return ContextText([chosen[index] for index in sorted(chosen)])
+
+def build_previous_results_for_block(dsl_block: dict, cot_history: list, context: RollingContext, exclude_keys=()) -> str:
+    """
+    블록용 이전 결과 섹션 (세션 상태와 무관 - Streamlit · 배치 실행 공용).
+    직접 선행 단계는 원문, 간접 선행 단계는 다이제스트, 관련 없는 단계는 제외 (종합 단계는 전체 포함)
+    """
+    from analysis_system import STEP_DEPENDENCIES, ALL_PREVIOUS_STEPS, get_transitive_dependencies, depends_on_all_previous
+    from dsl_to_prompt import get_prompt_registry
+
+    if not cot_history:
+        return ""
+
+    step_id = dsl_block.get("id", "")
+    direct_ids = {d for d in STEP_DEPENDENCIES.get(step_id, []) if d != ALL_PREVIOUS_STEPS} | get_source_step_ids(dsl_block)
+
+    def with_titles(step_ids):
+        # 예전 기록(cot_history에 step_id 없음)은 제목으로 매칭
+        blocks_by_id = get_prompt_registry().blocks_by_id
+        return set(step_ids) | {blocks_by_id[i]["title"] for i in step_ids if i in blocks_by_id}
+
+    include_keys = None
+    if step_id in STEP_DEPENDENCIES and not (depends_on_all_previous(step_id) or needs_all_previous_results(dsl_block)):
+        # 전이 의존 단계만 포함 (관련 없는 단계 결과는 제외)
+        include_keys = with_titles(direct_ids | get_transitive_dependencies(step_id))
+
+    return context.build(
+        cot_history,
+        full_text_keys=with_titles(direct_ids),
+        exclude_keys=set(exclude_keys),
+        include_keys=include_keys
+    )
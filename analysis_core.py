@@ -0,0 +1,264 @@
+# analysis_core.py
+"""
+세션 독립 분석 API (Streamlit 세션 상태 없이 사용 - 배치 실행 · 자동 실행 공용)
+- PDF 수집: 텍스트 추출 → 청크 분석 (요약 · 사이트 정보 · 품질)
+- 워크플로우 제안: 용도/목적 → 의존성 순서를 지킨 단계 목록
+- 워크플로우 실행: DAG 스케줄러로 독립 단계 병렬 실행, 결과는 워크플로우 순서대로 cot_history에 반영
+- 보고서 생성 · 저장: Streamlit 앱과 같은 user_data 구성 (analysis_results/<프로젝트>.json, pdfs/)
+"""
+
+import os
+from datetime import datetime
+
+from init_dspy import DEFAULT_MODEL
+from step_scheduler import SCHEDULER_MAX_CONCURRENCY
+
+def merge_pending_results(cot_history, results, titles_by_id) -> list:
+    """
+    cot_history에 아직 반영되지 않은 완료 결과(단계 ID → 결과)를 합친 기록.
+    이미 있는 단계(재계산 중인 단계)는 새 결과로 교체, 없는 단계는 뒤에 추가
+    """
+    history = []
+    merged = set()
+    for h in cot_history:
+        step_id = h.get('step_id') or next((i for i, title in titles_by_id.items() if title == h.get('step')), None)
+        if step_id in results:
+            history.append({**h, 'step_id': step_id, 'result': results[step_id]})
+            merged.add(step_id)
+        else:
+            history.append(h)
+    history.extend(
+        {'step': titles_by_id[step_id], 'step_id': step_id, 'result': result}
+        for step_id, result in results.items() if step_id not in merged
+    )
+    return history
+
+def make_history_entry(title, step_id, result, structured=None) -> dict:
+    """cot_history 항목 - 구조화 결과가 있으면 요약 · 인사이트도 함께 (보고서에서 파싱 없이 사용)"""
+    entry = {"step": title, "step_id": step_id, "result": result}
+    if structured:
+        entry.update(structured=structured, summary=structured.get("summary", ""), insight=structured.get("insight", ""))
+    return entry
+
+def execute_step(step, payload):
+    """
+    단계 1개 실행 - 웹 검색 · 프롬프트 생성 · LLM 호출 (워커 스레드에서 호출, Streamlit 호출 없음).
+    payload의 result_cache에 같은 입력 해시의 결과가 있으면 LLM 호출 없이 재사용
+    payload의 structured_output이 켜져 있으면 구조화 출력(JSON)으로 요청하고 검증된 결과를 payload["structured"]에 보관
+    (검증 실패 시 마크다운 출력으로 다시 요청)
+    """
+    from dsl_to_prompt import convert_dsl_to_prompt, estimate_block_output_tokens, get_web_search_for_block
+    from init_dspy import execute_with_routing
+    from step_lineage import make_input_hash
+    from structured_output import execute_structured, is_structured_block, structured_output_instruction
+
+    block = payload["block"]
+    web_search_results = None
+    if payload["include_web_search"]:
+        web_search_results = get_web_search_for_block(step.id, payload["user_inputs"], quiet=True)
+    prompt = convert_dsl_to_prompt(
+        dsl_block=block,
+        user_inputs=payload["user_inputs"],
+        previous_summary=payload["previous_results"],
+        pdf_summary=payload["pdf_summary"],
+        site_fields=payload["site_fields"],
+        include_web_search=payload["include_web_search"],
+        web_search_results=web_search_results,
+        token_budget=payload["token_budget"]
+    )
+    payload["prompt"] = prompt
+    structured = payload.get("structured_output") and is_structured_block(block)
+    # 구조화 출력은 입력 해시를 따로 (마크다운 출력 결과를 재사용하지 않도록)
+    hashed_prompt = prompt + structured_output_instruction(block) if structured else prompt
+    payload["input_hash"] = make_input_hash(hashed_prompt, payload.get("upstream_hashes", {}))
+    cached = (payload.get("result_cache") or {}).get(payload["input_hash"])
+    if cached:
+        print(f"♻️ 입력이 같은 이전 결과 재사용: {step.id}")
+        return cached
+    if structured:
+        result, payload["structured"] = execute_structured(
+            prompt,
+            block,
+            block_id=step.id,
+            preferred_model=payload["model"],
+            hedge=payload["hedge"],
+            output_budget=estimate_block_output_tokens(block)
+        )
+        if result:
+            return result
+    return execute_with_routing(
+        prompt,
+        block_id=step.id,
+        preferred_model=payload["model"],
+        max_retries=3,
+        hedge=payload["hedge"],
+        output_budget=estimate_block_output_tokens(block)
+    )
+
+def ingest_pdf(pdf_path: str) -> dict:
+    """PDF 수집 - 텍스트 추출 후 청크 분석 (앱의 PDF 업로드 처리와 같은 결과 키)"""
+    from utils_pdf import extract_text_from_pdf
+    from summary_generator import analyze_pdf_in_chunks, get_pdf_quality_report
+
+    pdf_text = extract_text_from_pdf(pdf_path, "path")
+    if not pdf_text:
+        raise ValueError(f"PDF 텍스트 추출 실패: {pdf_path}")
+    comprehensive_result = analyze_pdf_in_chunks(pdf_text)
+    return {
+        "pdf_summary": comprehensive_result["summary"],
+        "site_fields": comprehensive_result["site_fields"],
+        "pdf_analysis_result": comprehensive_result,
+        "pdf_quality_report": get_pdf_quality_report(pdf_text)
+    }
+
+def resolve_purpose(value):
+    """용도 지정값(한글 값 또는 enum 이름) → PurposeType"""
+    from analysis_system import PurposeType
+    try:
+        return PurposeType(value)
+    except ValueError:
+        return PurposeType[value]
+
+def resolve_objectives(values):
+    """목적 지정값 목록(한글 값 또는 enum 이름) → [ObjectiveType]"""
+    from analysis_system import ObjectiveType
+    objectives = []
+    for value in values or []:
+        try:
+            objectives.append(ObjectiveType(value))
+        except ValueError:
+            objectives.append(ObjectiveType[value])
+    return objectives
+
+def suggest_workflow_steps(purpose, objectives, removed_steps=()) -> list:
+    """용도/목적별 제안 워크플로우 - 최종 실행 순서의 단계 목록 (선행 단계가 항상 먼저)"""
+    from analysis_system import get_analysis_system
+
+    system = get_analysis_system()
+    workflow = system.suggest_analysis_steps(purpose, objectives)
+    workflow.steps = [step for step in workflow.steps if step.id not in removed_steps]
+    workflow.custom_steps = [step for step in (workflow.custom_steps or []) if step.id not in removed_steps]
+    return system.get_final_workflow(workflow)
+
+def run_project_workflow(steps, user_inputs, pdf_summary="", site_fields=None, model=DEFAULT_MODEL,
+                         web_search=False, hedge=False, max_concurrency=SCHEDULER_MAX_CONCURRENCY,
+                         cot_history=None, on_update=None, structured_output=False) -> dict:
+    """
+    프로젝트 워크플로우 실행 (세션 상태 없이).
+    web_search: True면 모든 단계, 단계 ID 집합이면 해당 단계만 웹 검색 포함
+    cot_history: 이미 완료된 결과 (해당 단계는 다시 실행하지 않음)
+    structured_output: 구조화 출력(JSON) 사용 - 구조화 결과 · 요약 · 인사이트를 cot_history 항목에 함께 저장
+    반환: {cot_history, step_history, step_lineage, states, errors}
+    """
+    from analysis_context import RollingContext, build_previous_results_for_block
+    from analysis_system import build_step_dag
+    from dsl_to_prompt import get_prompt_registry
+    from init_dspy import get_prompt_token_budget
+    from step_lineage import get_result_hashes, get_upstream_hashes, make_lineage_record
+    from step_scheduler import DagScheduler
+
+    blocks_by_id = get_prompt_registry().blocks_by_id
+    cot_history = list(cot_history or [])
+    step_history = []
+    completed_keys = {h.get('step_id') or h.get('step') for h in cot_history}
+    completed_ids = {
+        step.id for step in steps
+        if step.id in completed_keys or blocks_by_id.get(step.id, {}).get('title') in completed_keys
+    }
+    runnable_steps = [step for step in steps if step.id in blocks_by_id or step.id in completed_ids]
+    skipped = [step.id for step in steps if step not in runnable_steps]
+    if skipped:
+        print(f"⚠️ 프롬프트 블록이 없는 단계 제외: {', '.join(skipped)}")
+
+    context = RollingContext()
+    token_budget = get_prompt_token_budget(model)
+    titles_by_id = {step_id: block['title'] for step_id, block in blocks_by_id.items()}
+    dag = build_step_dag(runnable_steps)
+    step_lineage = {}
+
+    def prepare(step, results):
+        block = blocks_by_id[step.id]
+        # 아직 반영되지 않은 완료 결과도 선행 단계 컨텍스트로 사용
+        history = merge_pending_results(cot_history, results, titles_by_id)
+        return {
+            "block": block,
+            "user_inputs": user_inputs,
+            "previous_results": build_previous_results_for_block(block, history, context),
+            "upstream_hashes": get_upstream_hashes(step.id, dag, get_result_hashes(history, titles_by_id)),
+            "pdf_summary": pdf_summary,
+            "site_fields": site_fields or {},
+            "include_web_search": web_search is True or (bool(web_search) and step.id in web_search),
+            "token_budget": token_budget,
+            "model": model,
+            "hedge": hedge,
+            "structured_output": structured_output
+        }
+
+    def commit(step, payload, result):
+        title = blocks_by_id[step.id]['title']
+        prompt = (payload or {}).get("prompt", "")
+        step_history.append({
+            "id": step.id,
+            "title": title,
+            "prompt": prompt,
+            "result": result,
+            "timestamp": datetime.now().isoformat()
+        })
+        cot_history.append(make_history_entry(title, step.id, result, (payload or {}).get("structured")))
+        context.update(step.id, result)
+        if payload and payload.get("input_hash"):
+            step_lineage[step.id] = make_lineage_record(payload["input_hash"], result, payload.get("upstream_hashes", {}))
+
+    scheduler = DagScheduler(
+        runnable_steps, dag, prepare, execute_step, commit,
+        on_update=on_update, completed_ids=completed_ids, max_concurrency=max_concurrency
+    )
+    states = scheduler.run()
+    return {
+        "cot_history": cot_history,
+        "step_history": step_history,
+        "step_lineage": step_lineage,
+        "states": states,
+        "errors": dict(scheduler.errors)
+    }
+
+def build_project_report(user_inputs, cot_history, report_type="전체 분석 보고서") -> str:
+    """분석 결과 보고서 (마크다운) - 앱의 보고서 생성과 같은 내용"""
+    from report_generator import build_report_content
+    return build_report_content(user_inputs, cot_history, report_type, True, True, False)
+
+def get_project_result_path(auth_system, username, project_name) -> str:
+    """프로젝트 결과 파일 경로 (user_data/<사용자>/analysis_results/<프로젝트>.json)"""
+    return os.path.join(auth_system.get_user_data_path(username), "analysis_results", f"{project_name}.json")
+
+def save_project_result(auth_system, username, project_name, user_inputs, run_result, ingested=None,
+                        pdf_path=None, report=None) -> str:
+    """
+    프로젝트 결과 저장 - 앱의 '프로젝트 저장'과 같은 형식으로 저장해 웹 UI에서 바로 불러올 수 있음.
+    PDF는 앱과 같이 pdfs/<사용자>_<파일명>.pdf로 복사, 보고서는 reports/<프로젝트>.md
+    """
+    ingested = ingested or {}
+    if pdf_path:
+        with open(pdf_path, "rb") as f:
+            pdf_name = f"{username}_{os.path.splitext(os.path.basename(pdf_path))[0]}"
+            auth_system.save_user_pdf(username, pdf_name, f.read())
+
+    project_data = {
+        "project_name": project_name,
+        "user_inputs": user_inputs,
+        "cot_history": run_result.get("cot_history", []),
+        "step_history": run_result.get("step_history", []),
+        "pdf_summary": ingested.get("pdf_summary", ""),
+        "site_fields": ingested.get("site_fields", {}),
+        "pdf_analysis_result": ingested.get("pdf_analysis_result", {}),
+        "step_lineage": run_result.get("step_lineage", {}),
+        "created_at": datetime.now().isoformat()
+    }
+    auth_system.save_user_analysis_result(username, project_name, project_data)
+
+    if report:
+        reports_dir = os.path.join(auth_system.ensure_user_directory(username), "reports")
+        os.makedirs(reports_dir, exist_ok=True)
+        with open(os.path.join(reports_dir, f"{project_name}.md"), "w", encoding="utf-8") as f:
+            f.write(report)
+    return get_project_result_path(auth_system, username, project_name)
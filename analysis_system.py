@@ -10,9 +10,12 @@
 - 전체 순서 확정 및 분석 실행
 """
 
-from typing import Dict, List
-from dataclasses import dataclass
+import threading
+from typing import Dict, List, Mapping, Tuple
+from dataclasses import dataclass, field, replace
 from enum import Enum
+from functools import lru_cache
+from types import MappingProxyType
 
 class PurposeType(Enum):
     """용도 분류"""
@@ -39,6 +42,125 @@ class ObjectiveType(Enum):
     OPERATION_MANAGEMENT = "운영/관리"
     OTHER = "기타"
 
+# 전체 이전 단계 결과를 종합하는 단계의 의존성 표식
+ALL_PREVIOUS_STEPS = "*"
+
+# 단계 완료 색인 상태 (단계 ID → {status, title, result_hash, updated})
+STEP_DONE = "done"      # 결과 있음 (최신)
+STEP_STALE = "stale"    # 결과 있음 (선행 단계 결과가 바뀌어 다시 계산 필요)
+STEP_FAILED = "failed"  # 자동 실행 실패 (결과 없음)
+RESULT_STATUSES = (STEP_DONE, STEP_STALE)
+
+# 블록별 선행 단계 (프롬프트 컨텍스트 선택 · 실행 가능 여부 판단에 사용)
+STEP_DEPENDENCIES = {
+    "document_analyzer": [],
+    "site_environment_analysis": [],
+    "site_regulation_analysis": [],
+    "requirement_analyzer": ["document_analyzer"],
+    "task_comprehension": ["document_analyzer", "requirement_analyzer"],
+    "risk_strategist": ["requirement_analyzer", "task_comprehension"],
+    "compliance_analyzer": ["site_regulation_analysis"],
+    "precedent_benchmarking": ["requirement_analyzer"],
+    "competitor_analyzer": ["precedent_benchmarking"],
+    "design_trend_application": ["competitor_analyzer"],
+    "concept_development": ["requirement_analyzer"],
+    "area_programming": ["concept_development"],
+    "mass_strategy": ["site_regulation_analysis", "area_programming"],
+    "flexible_space_strategy": ["mass_strategy"],
+    "schematic_space_plan": ["area_programming"],
+    "ux_circulation_simulation": ["schematic_space_plan"],
+    "structure_technology_analysis": ["site_environment_analysis"],
+    "architectural_branding_identity": ["concept_development"],
+    "requirements_extractor": ["document_analyzer"],
+    "design_requirement_summary": [ALL_PREVIOUS_STEPS],
+    "cost_estimation": ["design_requirement_summary"],
+    "action_planner": [ALL_PREVIOUS_STEPS],
+    "proposal_framework": [ALL_PREVIOUS_STEPS],
+    "hyderabad_campus_expansion_analysis": ["site_regulation_analysis"],
+    "hyderabad_research_infra_strategy": ["hyderabad_campus_expansion_analysis"],
+    "hyderabad_talent_collaboration_infra": ["hyderabad_research_infra_strategy"],
+    "hyderabad_welfare_branding_environment": ["hyderabad_talent_collaboration_infra"],
+    "hyderabad_security_zoning_plan": ["hyderabad_campus_expansion_analysis"],
+    "hyderabad_masterplan_roadmap": [
+        "hyderabad_campus_expansion_analysis",
+        "hyderabad_research_infra_strategy",
+        "hyderabad_talent_collaboration_infra",
+        "hyderabad_welfare_branding_environment",
+        "hyderabad_security_zoning_plan"
+    ],
+}
+
+def get_transitive_dependencies(step_id: str) -> set:
+    """선언된 선행 단계의 전이 폐쇄 (ALL_PREVIOUS_STEPS 표식 제외)"""
+    result = set()
+    stack = [d for d in STEP_DEPENDENCIES.get(step_id, []) if d != ALL_PREVIOUS_STEPS]
+    while stack:
+        dependency = stack.pop()
+        if dependency in result or dependency == step_id:
+            continue
+        result.add(dependency)
+        stack.extend(d for d in STEP_DEPENDENCIES.get(dependency, []) if d != ALL_PREVIOUS_STEPS)
+    return result
+
+def depends_on_all_previous(step_id: str) -> bool:
+    """전체 이전 단계 결과가 필요한 종합 단계인지 여부"""
+    return ALL_PREVIOUS_STEPS in STEP_DEPENDENCIES.get(step_id, [])
+
+@lru_cache(maxsize=256)
+def _dependency_order(step_keys: Tuple[Tuple[str, Tuple[str, ...]], ...]) -> Tuple[int, ...]:
+    """(단계 ID, 선행 단계 ID들) 목록 → 의존성 순서 인덱스 (같은 구성은 한 번만 계산)"""
+    step_ids = {step_id for step_id, _ in step_keys}
+    remaining = list(range(len(step_keys)))
+    placed = set()
+    order = []
+    while remaining:
+        position = next(
+            (pos for pos, index in enumerate(remaining)
+             if all(d in placed or d not in step_ids for d in step_keys[index][1] if d != ALL_PREVIOUS_STEPS)),
+            0  # 순환 의존성이면 기존 순서대로 진행
+        )
+        index = remaining.pop(position)
+        placed.add(step_keys[index][0])
+        order.append(index)
+    return tuple(order)
+
+def order_steps_by_dependencies(steps: list) -> list:
+    """기존 순서를 최대한 유지하면서 선행 단계가 항상 먼저 오도록 정렬 (워크플로우에 있는 단계만 고려)"""
+    step_keys = tuple((step.id, tuple(step.dependencies or ())) for step in steps)
+    return [steps[index] for index in _dependency_order(step_keys)]
+
+def build_step_dag(steps: list) -> Dict[str, set]:
+    """
+    워크플로우 단계의 의존 그래프 (단계 ID → 워크플로우 안의 선행 단계 ID 집합).
+    종합 단계(ALL_PREVIOUS_STEPS)는 워크플로우상 앞선 모든 단계에 의존, 워크플로우에 없는 선행 단계는 무시
+    """
+    step_ids = [step.id for step in steps]
+    dag = {}
+    for index, step in enumerate(steps):
+        dependencies = set()
+        for dependency in step.dependencies or []:
+            if dependency == ALL_PREVIOUS_STEPS:
+                dependencies.update(step_ids[:index])
+            elif dependency in step_ids and dependency != step.id:
+                dependencies.add(dependency)
+        dag[step.id] = dependencies
+    return dag
+
+def get_critical_path_length(dag: Dict[str, set], durations: Dict[str, float] = None) -> float:
+    """의존 그래프의 임계 경로 길이 (durations 미지정 시 단계 수 기준) - 순환 의존성은 무시"""
+    memo = {}
+
+    def finish_time(step_id, visiting=()):
+        if step_id in memo:
+            return memo[step_id]
+        if step_id in visiting:
+            return 0.0
+        start = max((finish_time(d, visiting + (step_id,)) for d in dag.get(step_id, ())), default=0.0)
+        memo[step_id] = start + (durations or {}).get(step_id, 1.0)
+        return memo[step_id]
+
+    return max((finish_time(step_id) for step_id in dag), default=0.0)
+
 @dataclass
 class AnalysisStep:
     """분석 단계 정보"""
@@ -53,109 +175,171 @@ class AnalysisStep:
     dependencies: List[str] = None
     
     def __post_init__(self):
-        if self.dependencies is None:
-            self.dependencies = []
+        if not self.dependencies:
+            # 지정하지 않으면 블록별로 선언된 선행 단계 사용
+            self.dependencies = list(STEP_DEPENDENCIES.get(self.id, []))
 
 @dataclass
 class AnalysisWorkflow:
-    """분석 워크플로우"""
+    """
+    분석 워크플로우.
+    step_order: 최종 실행 순서의 단계 ID 배열 (order 순서 + 의존성 보정, 단계 목록이 바뀔 때만 다시 계산)
+    steps · custom_steps를 다시 대입하면 자동으로 무효화되고, 목록을 제자리에서 바꾸면 refresh_order() 호출
+    """
     purpose: PurposeType
     objective: ObjectiveType
     steps: List[AnalysisStep]
     custom_steps: List[AnalysisStep] = None
+    step_order: Tuple[str, ...] = field(default=None, init=False, repr=False, compare=False)
     
     def __post_init__(self):
         if self.custom_steps is None:
             self.custom_steps = []
 
+    def __setattr__(self, name, value):
+        super().__setattr__(name, value)
+        if name in ("steps", "custom_steps"):
+            super().__setattr__("step_order", None)
+
+    def refresh_order(self):
+        """최종 실행 순서 다시 계산 (같은 ID가 여러 번 있으면 먼저 나온 단계)"""
+        steps_by_id = {}
+        for step in sorted(self.steps + self.custom_steps, key=lambda x: x.order):
+            steps_by_id.setdefault(step.id, step)
+        ordered = order_steps_by_dependencies(list(steps_by_id.values()))
+        self._steps_by_id = {step.id: step for step in ordered}
+        self.step_order = tuple(self._steps_by_id)
+
+    def get_step_order(self) -> Tuple[str, ...]:
+        """최종 실행 순서의 단계 ID 배열 (무효화된 경우에만 다시 계산)"""
+        if self.step_order is None:
+            self.refresh_order()
+        return self.step_order
+
+    def get_step(self, step_id: str) -> AnalysisStep:
+        """워크플로우의 단계 (없으면 None)"""
+        self.get_step_order()
+        return self._steps_by_id.get(step_id)
+
+    def get_ordered_steps(self) -> List[AnalysisStep]:
+        """최종 실행 순서의 단계 목록 (저장된 ID 배열 기준)"""
+        return [self._steps_by_id[step_id] for step_id in self.get_step_order()]
+
+@dataclass(frozen=True)
+class StepCatalog:
+    """
+    분석 단계 카탈로그 (프로세스 전역, 읽기 전용).
+    필수 · 용도별 권장 · 목적별 추가 · 번외 단계 정의를 한 번만 구성해 보관하고 단계 ID로 색인.
+    같은 ID라도 정의 묶음별로 순서 · 분류가 다를 수 있어 묶음별 튜플을 유지하고,
+    워크플로우에는 항상 사본을 넘김 (UI에서 순서를 바꿔도 카탈로그는 그대로)
+    """
+    purpose_objectives: Mapping[PurposeType, Tuple[ObjectiveType, ...]]
+    required: Tuple[AnalysisStep, ...]
+    recommended: Mapping[PurposeType, Tuple[AnalysisStep, ...]]
+    objective: Mapping[ObjectiveType, Tuple[AnalysisStep, ...]]
+    optional: Tuple[AnalysisStep, ...]
+    optional_by_id: Mapping[str, AnalysisStep]
+    steps_by_id: Mapping[str, AnalysisStep]
+    cot_order: Mapping[str, int]
+
+def copy_step(step: AnalysisStep) -> AnalysisStep:
+    """워크플로우용 단계 사본 (카탈로그 정의는 수정하지 않음)"""
+    return replace(step, dependencies=list(step.dependencies or []))
+
+def get_completed_ids(steps: List[AnalysisStep], completed_steps) -> set:
+    """
+    완료된 단계 ID 집합.
+    completed_steps: 완료 색인(단계 ID → {status, ...}) 또는 완료된 단계 ID · 제목 목록 (예전 호출 방식)
+    """
+    if isinstance(completed_steps, Mapping):
+        return {step.id for step in steps if completed_steps.get(step.id, {}).get("status") in RESULT_STATUSES}
+    completed = set(completed_steps)
+    return {step.id for step in steps if step.id in completed or step.title in completed}
+
+def is_step_ready(step: AnalysisStep, workflow_ids: set, completed_ids: set, previous_done: bool) -> bool:
+    """
+    선행 단계 완료 여부 (워크플로우에 없는 선행 단계는 무시).
+    previous_done: 워크플로우상 앞선 단계가 모두 완료됐는지 (종합 단계 판정용)
+    """
+    for dependency in step.dependencies or []:
+        if dependency == ALL_PREVIOUS_STEPS:
+            if not previous_done:
+                return False
+        elif dependency in workflow_ids and dependency not in completed_ids:
+            return False
+    return True
+
+_step_catalog = None
+_step_catalog_lock = threading.Lock()
+
 class AnalysisSystem:
     """분석 시스템 핵심 클래스"""
     
     def __init__(self):
-        self.purpose_objective_mapping = self._load_purpose_objective_mapping()
-        self.required_steps = self._load_required_steps()
-        self.recommended_steps = self._load_recommended_steps()
-        self.optional_steps = self._load_optional_steps()
+        self.catalog = self._get_step_catalog()
+        self.purpose_objective_mapping = self.catalog.purpose_objectives
+        self.required_steps = self.catalog.required
+        self.recommended_steps = self.catalog.recommended
+        self.optional_steps = self.catalog.optional
+
+    def _get_step_catalog(self) -> StepCatalog:
+        """프로세스 전역 단계 카탈로그 (첫 생성 시 한 번만 구성)"""
+        global _step_catalog
+        if _step_catalog is None:
+            with _step_catalog_lock:
+                if _step_catalog is None:
+                    _step_catalog = self._build_step_catalog()
+        return _step_catalog
+
+    def _build_step_catalog(self) -> StepCatalog:
+        """단계 정의 로드 후 읽기 전용 카탈로그 구성"""
+        required = tuple(self._load_required_steps())
+        recommended = {purpose: tuple(steps) for purpose, steps in self._load_recommended_steps().items()}
+        objective = {objective: tuple(steps) for objective, steps in self._load_objective_steps().items()}
+        optional = tuple(self._load_optional_steps())
+
+        # 단계 ID 색인 (같은 ID가 여러 묶음에 있으면 먼저 정의된 것)
+        steps_by_id = {}
+        for step in required + sum(recommended.values(), ()) + sum(objective.values(), ()) + optional:
+            steps_by_id.setdefault(step.id, step)
+
+        return StepCatalog(
+            purpose_objectives=MappingProxyType({p: tuple(o) for p, o in self._load_purpose_objective_mapping().items()}),
+            required=required,
+            recommended=MappingProxyType(recommended),
+            objective=MappingProxyType(objective),
+            optional=optional,
+            optional_by_id=MappingProxyType({step.id: step for step in reversed(optional)}),
+            steps_by_id=MappingProxyType(steps_by_id),
+            cot_order=MappingProxyType(self._load_recommended_cot_order())
+        )
 
     # ─── 실행과 관련된 핵심 로직 (과거 코드 통합) ─────────────────────────────
     
     def get_available_objectives(self, purpose: PurposeType) -> List[ObjectiveType]:
         """용도에 따른 사용 가능한 목적 반환"""
-        return self.purpose_objective_mapping.get(purpose, [ObjectiveType.OTHER])
+        return list(self.purpose_objective_mapping.get(purpose, [ObjectiveType.OTHER]))
     
     def suggest_analysis_steps(self, purpose: PurposeType, objectives: List[ObjectiveType]) -> AnalysisWorkflow:
-        """분석 단계 자동 제안 - 용도별 권장 블록 기반"""
+        """분석 단계 자동 제안 - 용도별 권장 블록 기반 (카탈로그 단계의 사본으로 구성)"""
         # 1. 필수 단계 추가
-        steps = self.required_steps.copy()
+        steps = list(self.catalog.required)
         print(f"DEBUG: 필수 단계 수 = {len(steps)}")
         
         # 2. 용도별 권장 단계 추가
-        if purpose in self.recommended_steps:
-            steps.extend(self.recommended_steps[purpose])
-            print(f"DEBUG: 용도별 권장 단계 추가됨 = {len(self.recommended_steps[purpose])}개")
+        if purpose in self.catalog.recommended:
+            steps.extend(self.catalog.recommended[purpose])
+            print(f"DEBUG: 용도별 권장 단계 추가됨 = {len(self.catalog.recommended[purpose])}개")
         else:
             print(f"DEBUG: 용도 {purpose.value}에 대한 권장 단계 없음")
         
         # 3. 목적별 추가 필수 단계 추가 (목적에 따라)
         for objective in objectives:
             print(f"DEBUG: 목적 {objective.value} 처리 중...")
-            if objective == ObjectiveType.PLANNING_CONCEPT_DESIGN:
-                # 계획안/컨셉/디자인 목적일 때 추가 필수
-                additional_steps = [
-                    AnalysisStep(
-                        id="design_trend_application",
-                        title="통합 디자인 트렌드 적용 전략",
-                        description="건축·인테리어·조경 분야의 핵심 트렌드와 실현 가능한 적용 전략을 제시",
-                        is_recommended=True,
-                        order=11,
-                        category="디자인트렌드"
-                    ),
-                    AnalysisStep(
-                        id="design_requirement_summary",
-                        title="최종 설계 요구사항 및 가이드라인",
-                        description="분석 결과를 바탕으로 실제 설계에 적용 가능한 요구사항과 가이드라인을 구조화",
-                        is_recommended=True,
-                        order=12,
-                        category="요구사항정리"
-                    )
-                ]
+            additional_steps = self.catalog.objective.get(objective, ())
+            if additional_steps:
                 steps.extend(additional_steps)
-                print(f"DEBUG: 계획안/컨셉/디자인 목적 추가 단계 = {len(additional_steps)}개")
-            
-            elif objective == ObjectiveType.MARKET_PROFITABILITY_INVESTMENT:
-                # 상권/수익성/투자 목적일 때 추가 필수
-                additional_steps = [
-                    AnalysisStep(
-                        id="precedent_benchmarking",
-                        title="선진사례 벤치마킹 및 최적 운영전략",
-                        description="국내외 유사 프로젝트 사례를 심층 분석해 차별화 요소와 최적 운영 방안을 도출",
-                        is_recommended=True,
-                        order=11,
-                        category="벤치마킹"
-                    ),
-
-                ]
-                steps.extend(additional_steps)
-                print(f"DEBUG: 상권/수익성/투자 목적 추가 단계 = {len(additional_steps)}개")
-            
-            elif objective == ObjectiveType.LEGAL_PERMIT:
-                # 법적/인허가 목적일 때 추가 필수
-                additional_steps = [
-                    AnalysisStep(
-                        id="design_requirement_summary",
-                        title="최종 설계 요구사항 및 가이드라인",
-                        description="분석 결과를 바탕으로 실제 설계에 적용 가능한 요구사항과 가이드라인을 구조화",
-                        is_recommended=True,
-                        order=11,
-                        category="요구사항정리"
-                    )
-                ]
-                steps.extend(additional_steps)
-                print(f"DEBUG: 법적/인허가 목적 추가 단계 = {len(additional_steps)}개")
-            
-            elif objective == ObjectiveType.OPERATION_MANAGEMENT:
-                # 운영/관리 목적일 때는 추가 단계 없음 (cost_estimation에 통합됨)
-                pass
+                print(f"DEBUG: {objective.value} 목적 추가 단계 = {len(additional_steps)}개")
         
         print(f"DEBUG: 중복 제거 전 총 단계 수 = {len(steps)}")
         
@@ -164,13 +348,14 @@ class AnalysisSystem:
         seen_ids = set()
         for step in steps:
             if step.id not in seen_ids:
-                unique_steps.append(step)
+                unique_steps.append(copy_step(step))
                 seen_ids.add(step.id)
         
         print(f"DEBUG: 중복 제거 후 총 단계 수 = {len(unique_steps)}")
         
-        # 5. 순서 정렬
+        # 5. 순서 정렬 (선행 단계가 먼저 오도록 보정)
         unique_steps.sort(key=lambda x: x.order)
+        unique_steps = order_steps_by_dependencies(unique_steps)
         
         return AnalysisWorkflow(
             purpose=purpose,
@@ -180,9 +365,10 @@ class AnalysisSystem:
 
     def add_optional_step(self, workflow: AnalysisWorkflow, step_id: str) -> AnalysisWorkflow:
         """번외 단계 추가 (과거 코드 방식)"""
-        optional_step = next((step for step in self.optional_steps if step.id == step_id), None)
+        optional_step = self.catalog.optional_by_id.get(step_id)
         if optional_step:
-            workflow.custom_steps.append(optional_step)
+            workflow.custom_steps.append(copy_step(optional_step))
+            workflow.refresh_order()
         return workflow
 
     def remove_step(self, workflow: AnalysisWorkflow, step_id: str) -> AnalysisWorkflow:
@@ -193,13 +379,11 @@ class AnalysisSystem:
 
     def reorder_steps(self, workflow: AnalysisWorkflow, new_order: List[str]) -> AnalysisWorkflow:
         """순서 변경 (과거 코드 방식)"""
-        all_steps = workflow.steps + workflow.custom_steps
+        steps_by_id = {}
+        for step in workflow.steps + workflow.custom_steps:
+            steps_by_id.setdefault(step.id, step)
         
-        ordered_steps = []
-        for step_id in new_order:
-            step = next((s for s in all_steps if s.id == step_id), None)
-            if step:
-                ordered_steps.append(step)
+        ordered_steps = [steps_by_id[step_id] for step_id in new_order if step_id in steps_by_id]
         
         required_steps = [step for step in ordered_steps if step.is_required]
         other_steps = [step for step in ordered_steps if not step.is_required]
@@ -210,34 +394,34 @@ class AnalysisSystem:
         return workflow
 
     def get_final_workflow(self, workflow: AnalysisWorkflow) -> List[AnalysisStep]:
-        """최종 실행 단계 목록 (과거 코드 방식)"""
-        all_steps = workflow.steps + workflow.custom_steps
-        all_steps.sort(key=lambda x: x.order)
-        return all_steps
+        """최종 실행 단계 목록 - order 순서에서 선행 단계가 항상 먼저 오도록 보정 (모든 호출 측이 같은 위상 순서 사용)"""
+        return workflow.get_ordered_steps()
 
     # ─── 실행 상태 관리 (새로 추가) ─────────────────────────────
     
     def get_current_step(self, workflow: AnalysisWorkflow, current_index: int) -> AnalysisStep:
         """현재 실행할 단계 반환"""
-        all_steps = self.get_final_workflow(workflow)
-        if 0 <= current_index < len(all_steps):
-            return all_steps[current_index]
+        step_order = workflow.get_step_order()
+        if 0 <= current_index < len(step_order):
+            return workflow.get_step(step_order[current_index])
         return None
 
-    def get_step_progress(self, workflow: AnalysisWorkflow, completed_steps: List[str]) -> Dict:
-        """단계별 진행 상황 반환"""
+    def get_step_progress(self, workflow: AnalysisWorkflow, completed_steps) -> Dict:
+        """단계별 진행 상황 반환 (completed_steps: 완료 색인 또는 완료된 단계 ID · 제목 목록)"""
         all_steps = self.get_final_workflow(workflow)
+        completed_ids = get_completed_ids(all_steps, completed_steps)
+        completed_count = len(completed_ids) if isinstance(completed_steps, Mapping) else len(completed_steps)
         progress = {
             "total": len(all_steps),
-            "completed": len(completed_steps),
-            "current_index": len(completed_steps),
-            "progress_percentage": (len(completed_steps) / len(all_steps)) * 100 if all_steps else 0,
+            "completed": completed_count,
+            "current_index": completed_count,
+            "progress_percentage": (completed_count / len(all_steps)) * 100 if all_steps else 0,
             "steps_status": []
         }
         
         for i, step in enumerate(all_steps):
-            status = "completed" if step.title in completed_steps else "pending"
-            if i == len(completed_steps):
+            status = "completed" if step.id in completed_ids else "pending"
+            if i == completed_count:
                 status = "current"
             
             progress["steps_status"].append({
@@ -248,26 +432,28 @@ class AnalysisSystem:
         
         return progress
 
-    def can_execute_step(self, workflow: AnalysisWorkflow, step_id: str, completed_steps: List[str]) -> bool:
-        """단계 실행 가능 여부 확인"""
-        step = next((s for s in self.get_final_workflow(workflow) if s.id == step_id), None)
-        if not step:
+    def can_execute_step(self, workflow: AnalysisWorkflow, step_id: str, completed_steps) -> bool:
+        """단계 실행 가능 여부 확인 (completed_steps: 완료 색인 또는 완료된 단계 ID · 제목 목록)"""
+        step_order = workflow.get_step_order()
+        if step_id not in step_order:
             return False
         
-        # 의존성 확인
-        for dependency in step.dependencies:
-            if dependency not in completed_steps:
-                return False
-        
-        return True
+        all_steps = workflow.get_ordered_steps()
+        completed_ids = get_completed_ids(all_steps, completed_steps)
+        previous_done = all(s in completed_ids for s in step_order[:step_order.index(step_id)])
+        return is_step_ready(workflow.get_step(step_id), set(step_order), completed_ids, previous_done)
 
-    def get_next_executable_step(self, workflow: AnalysisWorkflow, completed_steps: List[str]) -> AnalysisStep:
-        """다음 실행 가능한 단계 반환"""
-        all_steps = self.get_final_workflow(workflow)
+    def get_next_executable_step(self, workflow: AnalysisWorkflow, completed_steps) -> AnalysisStep:
+        """다음 실행 가능한 단계 반환 (워크플로우 한 번 순회, completed_steps: 완료 색인 또는 완료된 단계 ID · 제목 목록)"""
+        all_steps = workflow.get_ordered_steps()
+        completed_ids = get_completed_ids(all_steps, completed_steps)
+        workflow_ids = set(workflow.get_step_order())
         
+        previous_done = True
         for step in all_steps:
-            if step.title not in completed_steps and self.can_execute_step(workflow, step.id, completed_steps):
+            if step.id not in completed_ids and is_step_ready(step, workflow_ids, completed_ids, previous_done):
                 return step
+            previous_done = previous_done and step.id in completed_ids
         
         return None
 
@@ -806,6 +992,51 @@ class AnalysisSystem:
             ]
         }
 
+    def _load_objective_steps(self) -> Dict[ObjectiveType, List[AnalysisStep]]:
+        """목적별 추가 필수 단계"""
+        return {
+            ObjectiveType.PLANNING_CONCEPT_DESIGN: [
+                AnalysisStep(
+                    id="design_trend_application",
+                    title="통합 디자인 트렌드 적용 전략",
+                    description="건축·인테리어·조경 분야의 핵심 트렌드와 실현 가능한 적용 전략을 제시",
+                    is_recommended=True,
+                    order=11,
+                    category="디자인트렌드"
+                ),
+                AnalysisStep(
+                    id="design_requirement_summary",
+                    title="최종 설계 요구사항 및 가이드라인",
+                    description="분석 결과를 바탕으로 실제 설계에 적용 가능한 요구사항과 가이드라인을 구조화",
+                    is_recommended=True,
+                    order=12,
+                    category="요구사항정리"
+                )
+            ],
+            ObjectiveType.MARKET_PROFITABILITY_INVESTMENT: [
+                AnalysisStep(
+                    id="precedent_benchmarking",
+                    title="선진사례 벤치마킹 및 최적 운영전략",
+                    description="국내외 유사 프로젝트 사례를 심층 분석해 차별화 요소와 최적 운영 방안을 도출",
+                    is_recommended=True,
+                    order=11,
+                    category="벤치마킹"
+                )
+            ],
+            ObjectiveType.LEGAL_PERMIT: [
+                AnalysisStep(
+                    id="design_requirement_summary",
+                    title="최종 설계 요구사항 및 가이드라인",
+                    description="분석 결과를 바탕으로 실제 설계에 적용 가능한 요구사항과 가이드라인을 구조화",
+                    is_recommended=True,
+                    order=11,
+                    category="요구사항정리"
+                )
+            ],
+            # 운영/관리 목적은 추가 단계 없음 (cost_estimation에 통합됨)
+            ObjectiveType.OPERATION_MANAGEMENT: [],
+        }
+
     def _load_optional_steps(self) -> List[AnalysisStep]:
         """선택적 분석 단계들"""
         return [
@@ -891,7 +1122,8 @@ class AnalysisSystem:
                     "is_recommended": step.is_recommended,
                     "is_optional": step.is_optional,
                     "order": step.order,
-                    "category": step.category
+                    "category": step.category,
+                    "dependencies": step.dependencies
                 }
                 for step in self.get_final_workflow(workflow)
             ]
@@ -912,7 +1144,8 @@ class AnalysisSystem:
                 is_recommended=step_config["is_recommended"],
                 is_optional=step_config["is_optional"],
                 order=step_config["order"],
-                category=step_config["category"]
+                category=step_config["category"],
+                dependencies=step_config.get("dependencies")
             )
             steps.append(step)
         
@@ -959,12 +1192,22 @@ class AnalysisSystem:
 
     def sort_steps_by_recommended_order(self, steps: List[AnalysisStep]) -> List[AnalysisStep]:
         """권장 CoT 순서에 따라 단계 정렬"""
-        cot_order = self._load_recommended_cot_order()
+        cot_order = self.catalog.cot_order
         
         def get_order(step):
             return cot_order.get(step.id, 999)  # 매핑되지 않은 단계는 마지막에
         
-        return sorted(steps, key=get_order)
+        return order_steps_by_dependencies(sorted(steps, key=get_order))
+
+_shared_system = None
+
+def get_analysis_system() -> AnalysisSystem:
+    """프로세스 전역 AnalysisSystem (Streamlit 재실행마다 새로 만들지 않음 - 워크플로우는 매번 사본으로 생성)"""
+    global _shared_system
+    if _shared_system is None:
+        # 동시에 만들어져도 카탈로그는 하나를 공유하므로 잠금 불필요
+        _shared_system = AnalysisSystem()
+    return _shared_system
 
 # 사용 예시
 if __name__ == "__main__":
@@ -40,6 +40,11 @@ if st.sidebar.button("🔄 초기화", type="secondary", help="모든 분석 데
     st.session_state.cot_history = []
     st.session_state.step_history = []
     st.session_state.step_results = {}
+    st.session_state.step_completion = {}
+    st.session_state.step_lineage = {}
+    # 자동 실행 체크포인트 · 진행 상태 (남아 있으면 다음 실행이 이전 결과를 재개 결과로 반영)
+    st.session_state.run_checkpoints = {}
+    st.session_state.run_all_status = {}
     st.session_state.workflow_steps = []
     st.session_state.editable_steps = []
     st.session_state.current_step_display_data = None
@@ -180,6 +185,20 @@ with st.sidebar:
         if selected_model != st.session_state.selected_model:
             st.session_state.selected_model = selected_model
             st.success(f"모델이 {selected_model}로 변경되었습니다!")
+        
+        # 요청 헤징 (응답이 p95 지연을 넘기면 대체 모델로 백업 요청)
+        st.checkbox(
+            "⚡ 요청 헤징 사용",
+            key="enable_hedging",
+            help="응답이 평소(p95)보다 늦어지면 대체 모델로 백업 요청을 보내고 먼저 도착한 결과를 사용합니다. API 사용량이 늘어날 수 있습니다."
+        )
+        
+        # 구조화 출력 (도구 사용으로 JSON 결과를 받아 검증, 표는 배열로 저장)
+        st.checkbox(
+            "🧩 구조화 출력 (JSON)",
+            key="structured_output",
+            help="출력 구조 · 필수 표 컬럼으로 만든 스키마에 맞춰 JSON으로 결과를 받고 검증합니다. 검증에 실패하면 일반 출력으로 다시 요청합니다."
+        )
             
     except Exception as e:
         st.error(f"모델 설정 오류: {e}")
@@ -240,7 +259,10 @@ with st.expander("프로젝트 정보 입력", expanded=st.session_state.get('sh
         pdf_text = extract_text_from_pdf(pdf_bytes, "bytes")
 
         # 새로운 고급 분석 사용 (청크 분석)
-        comprehensive_result = analyze_pdf_in_chunks(pdf_text)
+        # 사이드바에서 선택한 모델을 이번 분석 요청에만 적용
+        from init_dspy import model_context
+        with model_context(st.session_state.get('selected_model')):
+            comprehensive_result = analyze_pdf_in_chunks(pdf_text)
 
         # 기존 호환성을 위한 처리
         pdf_summary = comprehensive_result["summary"]
@@ -0,0 +1,195 @@
+# batch_runner.py
+"""
+여러 프로젝트 일괄 분석 (Streamlit 없이 실행)
+- 매니페스트(JSON)에 프로젝트별 PDF · 프로젝트 정보 · 용도/목적 지정
+- 프로젝트마다 PDF 수집 → 제안 워크플로우 실행 (단계 DAG 병렬) → 보고서 생성 → user_data 저장
+- 프로젝트 단위 워커 풀로 동시에 처리, 결과는 웹 UI의 '프로젝트 불러오기'로 바로 확인 가능
+- 이미 모든 단계가 완료된 프로젝트는 건너뛰고, 일부만 완료된 프로젝트는 남은 단계만 실행 (--force로 처음부터)
+
+매니페스트 예시:
+    {
+      "projects": [
+        {
+          "name": "성수동 복합문화공간",
+          "pdf": "inputs/seongsu.pdf",
+          "purpose": "문화 및 집회시설",
+          "objectives": ["계획안/컨셉/디자인", "상권/수익성/투자"],
+          "user_inputs": {"owner": "...", "site_location": "...", "site_area": "...", "zoning": "...",
+                          "building_type": "...", "project_goal": "..."},
+          "web_search": false,
+          "structured_output": false
+        }
+      ]
+    }
+
+실행:
+    python batch_runner.py manifest.json --user admin --workers 2 --step-concurrency 3
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+
+from analysis_core import (
+    build_project_report,
+    get_project_result_path,
+    ingest_pdf,
+    resolve_objectives,
+    resolve_purpose,
+    run_project_workflow,
+    save_project_result,
+    suggest_workflow_steps,
+)
+from init_dspy import DEFAULT_MODEL
+from step_scheduler import SCHEDULER_MAX_CONCURRENCY, DONE
+
+BATCH_MAX_WORKERS = 2   # 동시에 처리하는 프로젝트 수 (단계 동시 실행 수와 곱해져 API 동시 요청 수가 됨)
+
+def load_manifest(path: str) -> list:
+    """매니페스트 로드 - 프로젝트 목록 (상대 PDF 경로는 매니페스트 위치 기준)"""
+    with open(path, "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    projects = manifest.get("projects", []) if isinstance(manifest, dict) else manifest
+    base_dir = os.path.dirname(os.path.abspath(path))
+    for project in projects:
+        if not project.get("name"):
+            raise ValueError("매니페스트의 모든 프로젝트에 name이 필요합니다.")
+        if project.get("pdf") and not os.path.isabs(project["pdf"]):
+            project["pdf"] = os.path.join(base_dir, project["pdf"])
+    return projects
+
+def load_saved_project(auth_system, username, project_name):
+    """이전에 저장된 프로젝트 결과 (없으면 None)"""
+    path = get_project_result_path(auth_system, username, project_name)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"⚠️ 저장된 프로젝트 로드 실패 ({path}): {e}")
+        return None
+
+def run_project(project, auth_system, args) -> dict:
+    """프로젝트 1개 처리 - PDF 수집 → 워크플로우 실행 → 보고서 → 저장, 처리 요약 반환"""
+    from init_dspy import model_context
+
+    name = project["name"]
+    started = time.time()
+    user_inputs = {"project_name": name, **project.get("user_inputs", {})}
+    steps = suggest_workflow_steps(
+        resolve_purpose(project["purpose"]),
+        resolve_objectives(project.get("objectives", [])),
+        removed_steps=set(project.get("removed_steps", []))
+    )
+
+    saved = None if args.force else load_saved_project(auth_system, args.user, name)
+    if saved:
+        done_keys = {h.get("step_id") or h.get("step") for h in saved.get("cot_history", [])}
+        if all(step.id in done_keys or step.title in done_keys for step in steps):
+            print(f"⏭️ [{name}] 이미 완료된 프로젝트 - 건너뜀")
+            return {"name": name, "status": "skipped", "elapsed": 0.0}
+        print(f"♻️ [{name}] 저장된 결과에서 이어서 실행 ({len(done_keys)}개 단계 완료)")
+
+    with model_context(args.model):
+        # PDF 수집 (이어서 실행할 때는 저장된 분석 결과 재사용)
+        if saved and saved.get("pdf_summary"):
+            ingested = {key: saved.get(key) for key in ("pdf_summary", "site_fields", "pdf_analysis_result")}
+        elif project.get("pdf"):
+            print(f"📄 [{name}] PDF 분석: {project['pdf']}")
+            ingested = ingest_pdf(project["pdf"])
+        else:
+            ingested = {}
+
+        print(f"🧭 [{name}] 워크플로우 {len(steps)}개 단계 실행")
+        run_result = run_project_workflow(
+            steps,
+            user_inputs,
+            pdf_summary=ingested.get("pdf_summary", ""),
+            site_fields=ingested.get("site_fields", {}),
+            model=args.model,
+            web_search=project.get("web_search", args.web_search),
+            max_concurrency=args.step_concurrency,
+            cot_history=(saved or {}).get("cot_history"),
+            structured_output=project.get("structured_output", args.structured)
+        )
+    if saved:
+        run_result["step_history"] = saved.get("step_history", []) + run_result["step_history"]
+        run_result["step_lineage"] = {**saved.get("step_lineage", {}), **run_result["step_lineage"]}
+
+    report = build_project_report(user_inputs, run_result["cot_history"], args.report_type) if not args.no_report else None
+    path = save_project_result(
+        auth_system, args.user, name, user_inputs, run_result,
+        ingested=ingested, pdf_path=None if saved else project.get("pdf"), report=report
+    )
+
+    states = run_result["states"]
+    completed = sum(1 for state in states.values() if state == DONE)
+    status = "done" if completed == len(states) else "partial"
+    print(f"{'✅' if status == 'done' else '⚠️'} [{name}] {completed}/{len(states)}개 단계 완료 → {path}")
+    return {
+        "name": name,
+        "status": status,
+        "completed": completed,
+        "total": len(states),
+        "errors": run_result["errors"],
+        "elapsed": round(time.time() - started, 1),
+        "path": path
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="여러 프로젝트 일괄 분석 (Streamlit 없이 실행)")
+    parser.add_argument("manifest", help="프로젝트 매니페스트 JSON")
+    parser.add_argument("--user", default="admin", help="결과를 저장할 사용자 (user_data/<사용자>)")
+    parser.add_argument("--workers", type=int, default=BATCH_MAX_WORKERS, help="동시에 처리할 프로젝트 수")
+    parser.add_argument("--step-concurrency", type=int, default=SCHEDULER_MAX_CONCURRENCY, help="프로젝트별 동시 실행 단계 수")
+    parser.add_argument("--model", default=DEFAULT_MODEL, help="기준 모델 (단계별 라우팅의 기준)")
+    parser.add_argument("--report-type", default="전체 분석 보고서",
+                        choices=["전체 분석 보고서", "요약 보고서", "전문가 보고서", "클라이언트 보고서"])
+    parser.add_argument("--no-report", action="store_true", help="보고서 파일을 만들지 않음")
+    parser.add_argument("--web-search", action="store_true", help="매니페스트에 지정이 없는 프로젝트도 웹 검색 포함")
+    parser.add_argument("--structured", action="store_true", help="매니페스트에 지정이 없는 프로젝트도 구조화 출력(JSON) 사용")
+    parser.add_argument("--force", action="store_true", help="저장된 결과를 무시하고 처음부터 실행")
+    parser.add_argument("--summary", help="일괄 처리 요약 JSON 저장 경로")
+    args = parser.parse_args(argv)
+
+    from auth_system import AuthSystem
+    auth_system = AuthSystem()
+    if args.user not in auth_system.users:
+        parser.error(f"등록되지 않은 사용자입니다: {args.user}")
+    # 프로젝트 워커가 동시에 디렉터리를 만들지 않도록 미리 생성
+    user_path = auth_system.ensure_user_directory(args.user)
+    for sub_dir in ("analysis_results", "pdfs"):
+        os.makedirs(os.path.join(user_path, sub_dir), exist_ok=True)
+
+    projects = load_manifest(args.manifest)
+    print(f"📦 일괄 분석 시작: 프로젝트 {len(projects)}개 (동시 {args.workers}개 × 단계 {args.step_concurrency}개)")
+    started = time.time()
+
+    results = []
+    with ThreadPoolExecutor(max_workers=max(1, args.workers), thread_name_prefix="batch") as executor:
+        futures = {executor.submit(run_project, project, auth_system, args): project["name"] for project in projects}
+        for future in as_completed(futures):
+            try:
+                results.append(future.result())
+            except Exception as e:
+                # 프로젝트 하나의 실패가 다른 프로젝트 처리를 멈추지 않음
+                print(f"❌ [{futures[future]}] 처리 실패: {e}")
+                results.append({"name": futures[future], "status": "failed", "error": str(e)})
+
+    counts = {status: sum(1 for r in results if r["status"] == status) for status in ("done", "partial", "skipped", "failed")}
+    print(f"🏁 일괄 분석 종료 ({time.time() - started:.1f}s): 완료 {counts['done']} · 일부 완료 {counts['partial']} · "
+          f"건너뜀 {counts['skipped']} · 실패 {counts['failed']}")
+
+    if args.summary:
+        with open(args.summary, "w", encoding="utf-8") as f:
+            json.dump({"finished_at": datetime.now().isoformat(), "counts": counts, "projects": results},
+                      f, ensure_ascii=False, indent=2)
+    return 0 if counts["failed"] == 0 and counts["partial"] == 0 else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,23 +1,138 @@
-from search_helper import search_web_serpapi  # 주석 해제
+from search_helper import search_web_many  # 주석 해제
 import json
+import os
+import hashlib
+import threading
+from prompt_budget import fit_prompt_sections
 
 
+# === 프롬프트 블록 레지스트리 (프로세스 전역, 파일 변경 시에만 재로드) ===
+
+class PromptBlockRegistry:
+    """
+    prompt_blocks_dsl.json을 한 번만 파싱·검증해 보관.
+    블록 ID 인덱스, 핵심 원칙(core) 내용, 블록별 고정 섹션을 미리 계산하고
+    파일의 mtime/크기가 바뀌었을 때만 해시를 비교해 재로드.
+    """
+
+    def __init__(self, json_path: str):
+        self.json_path = json_path
+        self._lock = threading.Lock()
+        self._stat = None
+        self.version = None
+        self.core = []
+        self.extra = []
+        self.blocks_by_id = {}
+        self.core_content = ""
+        self.static_sections = {}
+
+    @staticmethod
+    def validate(data) -> list:
+        """DSL 파일 구조 검증 - 오류 메시지 목록 반환"""
+        errors = []
+        if not isinstance(data, dict):
+            return ["최상위 구조가 객체(dict)가 아닙니다."]
+        blocks = data.get("blocks")
+        if not isinstance(blocks, list):
+            return ["'blocks' 목록이 없습니다."]
+        seen = set()
+        for i, block in enumerate(blocks):
+            if not isinstance(block, dict):
+                errors.append(f"blocks[{i}]: 객체가 아닙니다.")
+                continue
+            block_id = block.get("id")
+            if not block_id or not isinstance(block_id, str):
+                errors.append(f"blocks[{i}]: id가 없습니다.")
+            elif block_id in seen:
+                errors.append(f"blocks[{i}]: 중복된 id '{block_id}'")
+            seen.add(block_id)
+            if not isinstance(block.get("content_dsl", {}), dict):
+                errors.append(f"blocks[{i}] ({block_id}): content_dsl이 객체가 아닙니다.")
+        return errors
+
+    def _file_stat(self):
+        file_info = os.stat(self.json_path)
+        return (file_info.st_mtime_ns, file_info.st_size)
+
+    def refresh(self):
+        """파일이 바뀌었으면 재로드 (변경 없으면 stat 1회만 수행)"""
+        file_stat = self._file_stat()
+        if file_stat == self._stat:
+            return
+        with self._lock:
+            if file_stat == self._stat:
+                return
+            with open(self.json_path, "rb") as f:
+                raw = f.read()
+            version = hashlib.sha256(raw).hexdigest()
+            if version == self.version:
+                # 내용은 같고 mtime만 변경
+                self._stat = file_stat
+                return
+            
+            try:
+                data = json.loads(raw.decode("utf-8"))
+                errors = self.validate(data)
+                if errors:
+                    raise ValueError("; ".join(errors))
+            except ValueError as e:
+                if self.version is None:
+                    raise
+                # 편집 중인 잘못된 파일은 무시하고 마지막 정상 버전 유지
+                print(f"⚠️ 프롬프트 블록 파일 검증 실패, 이전 버전 유지: {e}")
+                self._stat = file_stat
+                return
+            
+            # JSON에서 default_intro 로드
+            default_intro = data.get("default_intro", {})
+            core = [default_intro] if default_intro else []
+            extra = data["blocks"]
+            core_content = "\n\n".join([block.get("content", "") for block in core])
+            
+            self.core = core
+            self.extra = extra
+            self.blocks_by_id = {block["id"]: block for block in extra}
+            self.core_content = core_content
+            self.static_sections = {
+                block["id"]: render_static_sections(block, core_content=core_content) for block in extra
+            }
+            self.version = version
+            self._stat = file_stat
+            print(f"✅ 프롬프트 블록 로드: {len(extra)}개 블록 (버전 {version[:8]})")
+
+    def get_block(self, block_id: str):
+        self.refresh()
+        return self.blocks_by_id.get(block_id)
+
+    def get_static_sections(self, dsl_block: dict):
+        """레지스트리에 등록된 블록과 동일한 블록이면 미리 렌더링된 고정 섹션 반환"""
+        self.refresh()
+        block_id = dsl_block.get("id") if dsl_block else None
+        if block_id and self.blocks_by_id.get(block_id) is dsl_block:
+            return self.static_sections.get(block_id)
+        return None
+
+_registries = {}
+_registries_lock = threading.Lock()
+
+def get_prompt_registry(json_path="prompt_blocks_dsl.json") -> PromptBlockRegistry:
+    """경로별 프로세스 전역 레지스트리 반환 (최신 상태로 갱신)"""
+    path = os.path.abspath(json_path)
+    registry = _registries.get(path)
+    if registry is None:
+        with _registries_lock:
+            registry = _registries.setdefault(path, PromptBlockRegistry(path))
+    registry.refresh()
+    return registry
+
 def load_prompt_blocks(json_path="prompt_blocks_dsl.json"):
     """
     고정 블럭(core)은 따로, 나머지 분석 블럭은 따로 리턴.
     """
-    with open(json_path, "r", encoding="utf-8") as f:
-        data = json.load(f)
-    
-    # JSON에서 default_intro 로드
-    default_intro = data.get("default_intro", {})
-    core = [default_intro] if default_intro else []
-    
-    # JSON에 정의된 나머지 블럭
-    extra = data["blocks"] if isinstance(data, dict) else []
+    registry = get_prompt_registry(json_path)
     return {
-        "core": core,      # 리스트 형태
-        "extra": extra     # 리스트 형태
+        "core": list(registry.core),      # 리스트 형태
+        "extra": list(registry.extra)     # 리스트 형태
     }
 
 def dsl_to_content(dsl: dict) -> str:
@@ -161,8 +276,30 @@ def dsl_to_content(dsl: dict) -> str:
 
     return "\n".join(lines)
 
-def get_web_search_for_block(block_id: str, user_inputs: dict) -> str:
-    """각 블록별로 관련된 웹 검색 수행"""
+# === 블록 구조 기반 출력 분량 추정 (토큰) ===
+OUTPUT_TOKENS_BASE = 800                 # 도입부 · 결론 · 한계와 다음 단계
+OUTPUT_TOKENS_PER_SECTION = 700          # output_structure 항목당 (표 + 해설 300-600자)
+OUTPUT_TOKENS_PER_SECTION_TEMPLATE = 900 # section_templates 항목당 (서술형 템플릿)
+OUTPUT_TOKENS_PER_EXTRA_TABLE = 400      # 섹션 수를 넘는 추가 표 1개당
+
+def estimate_block_output_tokens(dsl_block: dict) -> int:
+    """블록의 output_structure · section_templates · templates.tables로 출력 토큰 수 추정"""
+    content_dsl = dsl_block.get("content_dsl", {}) if dsl_block else {}
+    sections = content_dsl.get("output_structure", []) or []
+    section_templates = (content_dsl.get("presentation", {}) or {}).get("section_templates", {}) or {}
+    tables = (content_dsl.get("templates", {}) or {}).get("tables", {}) or {}
+    
+    estimate = OUTPUT_TOKENS_BASE
+    if section_templates:
+        estimate += OUTPUT_TOKENS_PER_SECTION_TEMPLATE * len(section_templates)
+    else:
+        estimate += OUTPUT_TOKENS_PER_SECTION * len(sections)
+    # 섹션 표 외에 추가로 요구되는 표
+    estimate += OUTPUT_TOKENS_PER_EXTRA_TABLE * max(0, len(tables) - len(sections))
+    return estimate
+
+def get_search_queries_for_block(block_id: str, user_inputs: dict) -> list:
+    """블록별 웹 검색어 목록 (검색 없이 검색어만 계산)"""
     
     # 블록별 검색 쿼리 매핑
     search_queries = {
@@ -203,235 +340,299 @@ def get_web_search_for_block(block_id: str, user_inputs: dict) -> str:
         ]
     }
     
-    queries = search_queries.get(block_id, ["건축 분석 2024"])
-    
-    all_results = []
-    for query in queries:
-        try:
-            result = search_web_serpapi(query)
-            if result and result != "[검색 API 키 없음]":
-                all_results.append(f"검색어: {query}\n{result}")
-        except Exception as e:
-            print(f"웹 검색 실패 ({query}): {e}")
-    
-    return "\n\n".join(all_results) if all_results else ""
+    return search_queries.get(block_id, ["건축 분석 2024"])
 
-def convert_dsl_to_prompt(
-    dsl_block: dict,
-    user_inputs: dict,
-    previous_summary: str = "",
-    pdf_summary: dict = None,
-    site_fields: dict = None,
-    include_web_search: bool = True
-) -> str:
-    """완전히 개선된 DSL을 프롬프트로 변환"""
-    
-    # 핵심 원칙 블록 로드
-    core_blocks = load_prompt_blocks().get("core", [])
-    core_content = ""
-    if core_blocks:
-        core_content = "\n\n".join([block.get("content", "") for block in core_blocks])
+def get_web_search_for_block(block_id: str, user_inputs: dict, quiet: bool = False, token_budget: int = None) -> str:
+    """각 블록별로 관련된 웹 검색 수행 - 검색어 동시 실행, 마감 시간 내 결과만 사용
+
+    결과는 URL · 유사 스니펫 중복을 제거하고 블록 목표 관련도 순으로 토큰 예산(token_budget)까지만 포함
+    quiet: 워커 스레드에서 호출할 때 True (Streamlit 알림 대신 로그 출력)
+    """
+    from search_results import compress_results, SEARCH_RESULT_TOKEN_BUDGET
+    
+    queries = get_search_queries_for_block(block_id, user_inputs)
+    
+    items = []
+    for query, results in search_web_many(queries, quiet=quiet):
+        items.extend(dict(item, query=query) for item in results)
+    if not items:
+        return ""
+    
+    # 관련도 기준: 블록 목표 + 건물 유형
+    block = get_prompt_registry().get_block(block_id) or {}
+    goal = f"{block.get('content_dsl', {}).get('goal', '')} {user_inputs.get('building_type', '')}"
+    selected = compress_results(items, goal, token_budget or SEARCH_RESULT_TOKEN_BUDGET)
+    if not selected:
+        return ""
+    
+    searched = " · ".join(dict.fromkeys(query for query, _ in selected))
+    return f"검색어: {searched}\n" + "\n---\n".join(text for _, text in selected)
+
+# 블록 버전(내용 해시)별 고정 섹션 캐시 - 레지스트리 밖의 블록(복사본 등)용
+STATIC_SECTION_CACHE_SIZE = 128
+_static_section_cache = {}
+_static_section_cache_lock = threading.Lock()
+
+def get_block_version(dsl_block: dict) -> str:
+    """블록 내용 해시 (블록이 수정되면 바뀜)"""
+    payload = json.dumps(dsl_block, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def get_static_sections(dsl_block: dict) -> dict:
+    """블록 고정 섹션 반환 - 레지스트리 사전 렌더링 → 버전별 캐시 → 새로 렌더링 순"""
+    registry = get_prompt_registry()
+    sections = registry.get_static_sections(dsl_block)
+    if sections is not None:
+        return sections
+    
+    key = (registry.version, get_block_version(dsl_block))
+    sections = _static_section_cache.get(key)
+    if sections is None:
+        sections = render_static_sections(dsl_block, core_content=registry.core_content)
+        with _static_section_cache_lock:
+            if len(_static_section_cache) >= STATIC_SECTION_CACHE_SIZE:
+                _static_section_cache.pop(next(iter(_static_section_cache)))
+            _static_section_cache[key] = sections
+    return sections
+
+def _render_framework(framework: dict) -> str:
+    lines = ["# 분석 프레임워크", f"접근 방식: {framework.get('approach', '')}", f"방법론: {framework.get('methodology', '')}"]
+    
+    criteria = framework.get('criteria', [])
+    if criteria:
+        lines.append("\n평가 기준:")
+        lines.extend(f"{i}. {criterion}" for i, criterion in enumerate(criteria, 1))
+    
+    # analysis_framework.scoring 처리
+    if "scoring" in framework:
+        scoring = framework["scoring"]
+        lines.append("\n## 📈 평가 기준 및 가중치")
+        if "criteria" in scoring:
+            lines.append("평가 항목:")
+            lines.extend(f"{i}. {criterion}" for i, criterion in enumerate(scoring["criteria"], 1))
+        if "scale" in scoring:
+            lines.append(f"점수 범위: {scoring['scale']}")
+        if "weights" in scoring:
+            lines.append("가중치:")
+            lines.extend(f"- {key}: {weight}" for key, weight in scoring["weights"].items())
+        if "weights_overrides_allowed" in scoring:
+            lines.append(f"가중치 조정 가능: {scoring['weights_overrides_allowed']}")
+    return "\n".join(lines) + "\n"
+
+def _render_quality(quality: dict) -> str:
+    lines = ["# ⚠️ 품질 기준"]
+    
+    constraints = quality.get('constraints', [])
+    if constraints:
+        lines.append("제약사항:")
+        lines.extend(f"- {constraint}" for constraint in constraints)
+    
+    required_phrases = quality.get('required_phrases', [])
+    if required_phrases:
+        lines.append(f"\n필수 포함 문구: {', '.join(required_phrases)}")
+    
+    validation_rules = quality.get('validation_rules', [])
+    if validation_rules:
+        lines.append("\n검증 규칙:")
+        lines.extend(f"- {rule}" for rule in validation_rules)
+    return "\n".join(lines) + "\n"
+
+def _render_presentation(presentation: dict) -> str:
+    lines = [
+        "# 📋 출력 형식",
+        f"언어 톤: {presentation.get('language_tone', '')}",
+        f"형식: {presentation.get('target_format', '')}",
+    ]
+    
+    explanatory_template = presentation.get('explanatory_template', '')
+    if explanatory_template:
+        lines.append(f"해설 템플릿: {explanatory_template}")
+    
+    visual_elements = presentation.get('visual_elements', [])
+    if visual_elements:
+        lines.append(f"시각 요소: {', '.join(visual_elements)}")
+    
+    if "options" in presentation:
+        lines.append("출력 옵션:")
+        lines.extend(f"- {key}: {value}" for key, value in presentation["options"].items())
+    
+    # section_templates 처리
+    section_templates = presentation.get('section_templates', {})
+    if section_templates:
+        lines.append("\n## 📋 섹션별 상세 템플릿:")
+        for section_name, template in section_templates.items():
+            lines.append(f"\n### {section_name}:")
+            
+            table_title = template.get('table_title', '')
+            if table_title:
+                lines.append(f"- **표 제목:** {table_title}")
+            
+            required_columns = template.get('required_columns', [])
+            if required_columns:
+                lines.append("- **필수 컬럼:**")
+                lines.extend(f"  {i}. {column}" for i, column in enumerate(required_columns, 1))
+            
+            narrative_template = template.get('narrative_template', '')
+            if narrative_template:
+                lines.append(f"- **해설 템플릿:** {narrative_template}")
+            
+            diagram_title = template.get('diagram_title', '')
+            if diagram_title:
+                lines.append(f"- **다이어그램 제목:** {diagram_title}")
+    return "\n".join(lines) + "\n"
+
+def _render_templates(templates: dict) -> str:
+    lines = ["# 📋 템플릿 구조"]
+    if "tables" in templates:
+        lines.append("## 표 템플릿:")
+        for table_name, columns in templates["tables"].items():
+            lines.append(f"### {table_name}:")
+            lines.extend(f"{i}. {column}" for i, column in enumerate(columns, 1))
+            lines.append("")
+    
+    if "analysis_sections" in templates:
+        lines.append("## 분석 섹션:")
+        for section_name, section_data in templates["analysis_sections"].items():
+            lines.append(f"### {section_name}:")
+            if "required_elements" in section_data:
+                lines.append(f"필수 요소: {', '.join(section_data['required_elements'])}")
+            if "narrative_template" in section_data:
+                lines.append(f"서술 템플릿: {section_data['narrative_template']}")
+            lines.append("")
+    
+    # alternatives 처리
+    if "alternatives" in templates:
+        lines.append("## 대안 옵션:")
+        for i, alt in enumerate(templates["alternatives"], 1):
+            lines.append(f"### {i}. {alt.get('name', '대안')}:")
+            if "idea" in alt:
+                lines.append(f"개념: {alt['idea']}")
+            for key, label in (("pros", "장점"), ("cons", "단점"), ("conditions", "적용 조건"), ("tags", "태그")):
+                if key in alt:
+                    lines.append(f"{label}: {', '.join(alt[key])}")
+            lines.append("")
+    return "\n".join(lines) + "\n"
+
+def _render_data_contract(data_contract: dict) -> str:
+    lines = ["# 📊 데이터 요구사항"]
+    if "expected_site_fields" in data_contract:
+        lines.append(f"필요한 사이트 정보: {', '.join(data_contract['expected_site_fields'])}")
+    if "units" in data_contract:
+        lines.append(f"단위: {data_contract['units']}")
+    if "locale_overrides" in data_contract:
+        lines.append(f"지역 설정: {data_contract['locale_overrides']}")
+    if "missing_policy" in data_contract:
+        lines.append(f"데이터 누락 시 정책: {data_contract['missing_policy']}")
+    return "\n".join(lines) + "\n"
+
+def _render_output_structure(output_structure: list, block_title: str) -> str:
+    lines = [
+        "# 📋 출력 구조",
+        f"**중요: 이 블록({block_title})의 고유한 분석만 수행하세요.**\n",
+        "다음 구조로 분석 결과를 제공하세요. 각 구조는 반드시 지정된 형식으로 작성하세요:\n",
+    ]
+    for i, structure in enumerate(output_structure, 1):
+        lines.append(f"## {i}. {structure}")
+        lines.append(f"[{structure}에 해당하는 내용만 여기에 작성]\n")
+    lines.extend([
+        "⚠️ **중요 지시사항:**",
+        "1. 각 구조는 반드시 '## 번호. 구조명' 형식으로 시작하세요",
+        "2. 각 구조의 내용은 해당 구조에만 관련된 내용으로 작성하세요",
+        "3. 모든 구조를 빠짐없이 작성하되, 내용이 중복되지 않도록 하세요",
+        "4. 구조 간 구분을 명확히 하세요",
+        "5. 각 구조는 독립적으로 완성된 내용이어야 합니다",
+        "6. **이 블록의 고유한 분석만 수행하고, 다른 블록의 내용을 포함하지 마세요**\n",
+    ])
+    return "\n".join(lines) + "\n"
+
+def render_static_sections(dsl_block: dict, core_content: str = None) -> dict:
+    """
+    블록 정의에만 의존하는 프롬프트 섹션 렌더링 (사용자 입력·이전 결과와 무관).
+    head_sections: [(섹션 이름, 텍스트)] 핵심 원칙 ~ 데이터 요구사항
+    head: head_sections를 이어 붙인 텍스트, output_structure: 출력 구조 섹션
+    """
+    # 핵심 원칙 블록 로드 (레지스트리에 미리 계산된 내용 사용)
+    if core_content is None:
+        core_content = get_prompt_registry().core_content
     
     dsl = dsl_block.get("content_dsl", {})
-    prompt_parts = []
+    sections = []
     
     # 핵심 원칙을 맨 앞에 추가
     if core_content:
-        prompt_parts.append(f"# 핵심 원칙 및 유의사항\n{core_content}\n")
+        sections.append(("core", f"# 핵심 원칙 및 유의사항\n{core_content}\n"))
     
-    # 0. 블록 ID 및 제목 명시 (새로 추가)
+    # 0. 블록 ID 및 제목 명시 / 1. 기본 역할 및 목표
     block_id = dsl_block.get("id", "")
     block_title = dsl_block.get("title", "")
-    prompt_parts.append(f"# 현재 분석 블록\n")
-    prompt_parts.append(f"**블록 ID:** {block_id}\n")
-    prompt_parts.append(f"**블록 제목:** {block_title}\n")
-    prompt_parts.append(f"**분석 목적:** 이 블록만의 고유한 분석을 수행하세요.\n\n")
-    
-    # 1. 기본 역할 및 목표
-    prompt_parts.append(f"# 분석 목표\n{dsl.get('goal', '')}")
-    prompt_parts.append(f"# 역할\n{dsl.get('role', '건축 분석 전문가')}")
-    
+    block_parts = [
+        f"# 현재 분석 블록\n",
+        f"**블록 ID:** {block_id}\n",
+        f"**블록 제목:** {block_title}\n",
+        f"**분석 목적:** 이 블록만의 고유한 분석을 수행하세요.\n\n",
+        f"# 분석 목표\n{dsl.get('goal', '')}",
+        f"# 역할\n{dsl.get('role', '건축 분석 전문가')}",
+    ]
     if dsl.get('context'):
-        prompt_parts.append(f"# 맥락\n{dsl['context']}")
-    
-    # 2. 분석 프레임워크 - 확장된 버전
-    framework = dsl.get('analysis_framework', {})
-    if framework:
-        framework_text = f"# 분석 프레임워크\n"
-        framework_text += f"접근 방식: {framework.get('approach', '')}\n"
-        framework_text += f"방법론: {framework.get('methodology', '')}\n"
-        
-        criteria = framework.get('criteria', [])
-        if criteria:
-            framework_text += f"\n평가 기준:\n"
-            for i, criterion in enumerate(criteria, 1):
-                framework_text += f"{i}. {criterion}\n"
-        
-        # 새로 추가: analysis_framework.scoring 처리
-        if "scoring" in framework:
-            scoring = framework["scoring"]
-            framework_text += f"\n## 📈 평가 기준 및 가중치\n"
-            if "criteria" in scoring:
-                framework_text += f"평가 항목:\n"
-                for i, criterion in enumerate(scoring["criteria"], 1):
-                    framework_text += f"{i}. {criterion}\n"
-            if "scale" in scoring:
-                framework_text += f"점수 범위: {scoring['scale']}\n"
-            if "weights" in scoring:
-                framework_text += f"가중치:\n"
-                for key, weight in scoring["weights"].items():
-                    framework_text += f"- {key}: {weight}\n"
-            if "weights_overrides_allowed" in scoring:
-                framework_text += f"가중치 조정 가능: {scoring['weights_overrides_allowed']}\n"
-        
-        prompt_parts.append(framework_text)
+        block_parts.append(f"# 맥락\n{dsl['context']}")
+    sections.append(("block", "\n\n".join(block_parts)))
+    
+    # 2. 분석 프레임워크
+    if dsl.get('analysis_framework'):
+        sections.append(("framework", _render_framework(dsl['analysis_framework'])))
     
     # 3. 작업 목록
     tasks = dsl.get('tasks', [])
     if tasks:
-        tasks_text = f"# 📋 주요 분석 작업\n"
-        for i, task in enumerate(tasks, 1):
-            tasks_text += f"{i}. {task}\n"
-        prompt_parts.append(tasks_text)
-    
-    # 4. 품질 기준 - 확장된 버전
-    quality = dsl.get('quality_standards', {})
-    if quality:
-        quality_text = f"# ⚠️ 품질 기준\n"
-        
-        constraints = quality.get('constraints', [])
-        if constraints:
-            quality_text += f"제약사항:\n"
-            for constraint in constraints:
-                quality_text += f"- {constraint}\n"
-        
-        required_phrases = quality.get('required_phrases', [])
-        if required_phrases:
-            quality_text += f"\n필수 포함 문구: {', '.join(required_phrases)}\n"
-        
-        validation_rules = quality.get('validation_rules', [])
-        if validation_rules:
-            quality_text += f"\n검증 규칙:\n"
-            for rule in validation_rules:
-                quality_text += f"- {rule}\n"
-        
-        prompt_parts.append(quality_text)
-    
-    # 5. 출력 형식 - 대폭 확장된 버전
-    presentation = dsl.get('presentation', {})
-    if presentation:
-        presentation_text = f"# 📋 출력 형식\n"
-        presentation_text += f"언어 톤: {presentation.get('language_tone', '')}\n"
-        presentation_text += f"형식: {presentation.get('target_format', '')}\n"
-        
-        # 새로 추가된 explanatory_template 처리
-        explanatory_template = presentation.get('explanatory_template', '')
-        if explanatory_template:
-            presentation_text += f"해설 템플릿: {explanatory_template}\n"
-        
-        visual_elements = presentation.get('visual_elements', [])
-        if visual_elements:
-            presentation_text += f"시각 요소: {', '.join(visual_elements)}\n"
-        
-        # 새로 추가된 presentation.options 처리
-        if "options" in presentation:
-            options = presentation["options"]
-            presentation_text += f"출력 옵션:\n"
-            for key, value in options.items():
-                presentation_text += f"- {key}: {value}\n"
-        
-        # 새로 추가된 section_templates 처리 - 대폭 확장
-        section_templates = presentation.get('section_templates', {})
-        if section_templates:
-            presentation_text += f"\n## 📋 섹션별 상세 템플릿:\n"
-            for section_name, template in section_templates.items():
-                presentation_text += f"\n### {section_name}:\n"
-                
-                # table_title 처리
-                table_title = template.get('table_title', '')
-                if table_title:
-                    presentation_text += f"- **표 제목:** {table_title}\n"
-                
-                # required_columns 처리 - 배열 형태로 확장
-                required_columns = template.get('required_columns', [])
-                if required_columns:
-                    presentation_text += f"- **필수 컬럼:**\n"
-                    for i, column in enumerate(required_columns, 1):
-                        if isinstance(column, str):
-                            presentation_text += f"  {i}. {column}\n"
-                        else:
-                            presentation_text += f"  {i}. {column}\n"
-                
-                # narrative_template 처리
-                narrative_template = template.get('narrative_template', '')
-                if narrative_template:
-                    presentation_text += f"- **해설 템플릿:** {narrative_template}\n"
-                
-                # diagram_title 처리 (새로 추가)
-                diagram_title = template.get('diagram_title', '')
-                if diagram_title:
-                    presentation_text += f"- **다이어그램 제목:** {diagram_title}\n"
-        
-        prompt_parts.append(presentation_text)
+        sections.append(("tasks", "# 📋 주요 분석 작업\n" + "".join(f"{i}. {task}\n" for i, task in enumerate(tasks, 1))))
     
-    # 6. 새로 추가: templates 처리
-    templates = dsl.get('templates', {})
-    if templates:
-        templates_text = f"# 📋 템플릿 구조\n"
-        if "tables" in templates:
-            templates_text += f"## 표 템플릿:\n"
-            for table_name, columns in templates["tables"].items():
-                templates_text += f"### {table_name}:\n"
-                for i, column in enumerate(columns, 1):
-                    templates_text += f"{i}. {column}\n"
-                templates_text += "\n"
-        
-        if "analysis_sections" in templates:
-            templates_text += f"## 분석 섹션:\n"
-            for section_name, section_data in templates["analysis_sections"].items():
-                templates_text += f"### {section_name}:\n"
-                if "required_elements" in section_data:
-                    templates_text += f"필수 요소: {', '.join(section_data['required_elements'])}\n"
-                if "narrative_template" in section_data:
-                    templates_text += f"서술 템플릿: {section_data['narrative_template']}\n"
-                templates_text += "\n"
-        
-        # 새로 추가: alternatives 처리
-        if "alternatives" in templates:
-            templates_text += f"## 대안 옵션:\n"
-            for i, alt in enumerate(templates["alternatives"], 1):
-                templates_text += f"### {i}. {alt.get('name', '대안')}:\n"
-                if "idea" in alt:
-                    templates_text += f"개념: {alt['idea']}\n"
-                if "pros" in alt:
-                    pros = ", ".join(alt["pros"])
-                    templates_text += f"장점: {pros}\n"
-                if "cons" in alt:
-                    cons = ", ".join(alt["cons"])
-                    templates_text += f"단점: {cons}\n"
-                if "conditions" in alt:
-                    conditions = ", ".join(alt["conditions"])
-                    templates_text += f"적용 조건: {conditions}\n"
-                if "tags" in alt:
-                    tags = ", ".join(alt["tags"])
-                    templates_text += f"태그: {tags}\n"
-                templates_text += "\n"
-        
-        prompt_parts.append(templates_text)
-    
-    # 7. 새로 추가: data_contract 처리
-    data_contract = dsl.get('data_contract', {})
-    if data_contract:
-        contract_text = f"# 📊 데이터 요구사항\n"
-        if "expected_site_fields" in data_contract:
-            contract_text += f"필요한 사이트 정보: {', '.join(data_contract['expected_site_fields'])}\n"
-        if "units" in data_contract:
-            contract_text += f"단위: {data_contract['units']}\n"
-        if "locale_overrides" in data_contract:
-            contract_text += f"지역 설정: {data_contract['locale_overrides']}\n"
-        if "missing_policy" in data_contract:
-            contract_text += f"데이터 누락 시 정책: {data_contract['missing_policy']}\n"
-        prompt_parts.append(contract_text)
+    # 4. 품질 기준
+    if dsl.get('quality_standards'):
+        sections.append(("quality", _render_quality(dsl['quality_standards'])))
+    
+    # 5. 출력 형식
+    if dsl.get('presentation'):
+        sections.append(("presentation", _render_presentation(dsl['presentation'])))
+    
+    # 6. templates 처리
+    if dsl.get('templates'):
+        sections.append(("templates", _render_templates(dsl['templates'])))
+    
+    # 7. data_contract 처리
+    if dsl.get('data_contract'):
+        sections.append(("data_contract", _render_data_contract(dsl['data_contract'])))
+    
+    # 10. 출력 구조 (프로젝트 정보 뒤에 배치)
+    output_structure = dsl.get('output_structure', [])
+    
+    return {
+        "head_sections": sections,
+        "head": "\n\n".join(text for _, text in sections),
+        "output_structure": _render_output_structure(output_structure, block_title) if output_structure else "",
+    }
+
+def convert_dsl_to_prompt(
+    dsl_block: dict,
+    user_inputs: dict,
+    previous_summary: str = "",
+    pdf_summary: dict = None,
+    site_fields: dict = None,
+    include_web_search: bool = True,
+    static_sections: dict = None,
+    web_search_results: str = None,
+    token_budget: int = None
+) -> str:
+    """완전히 개선된 DSL을 프롬프트로 변환
+
+    static_sections / web_search_results: 미리 준비된 값이 있으면 재계산하지 않고 사용
+    token_budget: 프롬프트 토큰 상한 (미지정 시 기본 모델 예산) - 초과하면 우선순위 낮은 섹션부터 축약
+    """
+    
+    # 블록 고정 섹션 (핵심 원칙 ~ 데이터 요구사항, 출력 구조) - 레지스트리 블록이면 미리 렌더링된 섹션 사용
+    if static_sections is None:
+        static_sections = get_static_sections(dsl_block)
+    
+    sections = list(static_sections.get("head_sections") or [("static", static_sections["head"])])
     
     # 8. 프로젝트 기본 정보
     project_info = f"# 프로젝트 기본 정보\n"
@@ -441,7 +642,7 @@ def convert_dsl_to_prompt(
     project_info += f"- 면적: {user_inputs.get('site_area', 'N/A')}\n"
     project_info += f"- 건물유형: {user_inputs.get('building_type', 'N/A')}\n"
     project_info += f"- 프로젝트 목표: {user_inputs.get('project_goal', 'N/A')}\n"
-    prompt_parts.append(project_info)
+    sections.append(("project_info", project_info))
     
     # 9. 사이트 분석 정보
     if site_fields:
@@ -450,45 +651,35 @@ def convert_dsl_to_prompt(
             if value and str(value).strip():
                 readable_key = key.replace('_', ' ').title()
                 site_text += f"- {readable_key}: {value}\n"
-        prompt_parts.append(site_text)
+        sections.append(("site_fields", site_text))
     
     # 10. 출력 구조 - 강화된 버전
-    output_structure = dsl.get('output_structure', [])
-    if output_structure:
-        structure_text = f"# 📋 출력 구조\n"
-        structure_text += f"**중요: 이 블록({block_title})의 고유한 분석만 수행하세요.**\n\n"
-        structure_text += f"다음 구조로 분석 결과를 제공하세요. 각 구조는 반드시 지정된 형식으로 작성하세요:\n\n"
-        
-        for i, structure in enumerate(output_structure, 1):
-            structure_text += f"## {i}. {structure}\n"
-            structure_text += f"[{structure}에 해당하는 내용만 여기에 작성]\n\n"
-        
-        structure_text += f"⚠️ **중요 지시사항:**\n"
-        structure_text += f"1. 각 구조는 반드시 '## 번호. 구조명' 형식으로 시작하세요\n"
-        structure_text += f"2. 각 구조의 내용은 해당 구조에만 관련된 내용으로 작성하세요\n"
-        structure_text += f"3. 모든 구조를 빠짐없이 작성하되, 내용이 중복되지 않도록 하세요\n"
-        structure_text += f"4. 구조 간 구분을 명확히 하세요\n"
-        structure_text += f"5. 각 구조는 독립적으로 완성된 내용이어야 합니다\n"
-        structure_text += f"6. **이 블록의 고유한 분석만 수행하고, 다른 블록의 내용을 포함하지 마세요**\n\n"
-        
-        prompt_parts.append(structure_text)
+    if static_sections["output_structure"]:
+        sections.append(("output_structure", static_sections["output_structure"]))
     
-    # 11. 이전 분석 결과
+    # 11. 이전 분석 결과 (RollingContext가 조립한 결과면 단계 항목 단위로 축약)
+    section_entries = {}
     if previous_summary:
-        prompt_parts.append(f"# 📚 이전 분석 결과\n{previous_summary}\n")
+        sections.append(("previous_results", f"# 📚 이전 분석 결과\n{previous_summary}\n"))
+        if getattr(previous_summary, "entries", None):
+            section_entries["previous_results"] = ("# 📚 이전 분석 결과\n", previous_summary.entries)
     
     # 12. PDF 요약
     if pdf_summary:
-        prompt_parts.append(f"# 📄 PDF 문서 요약\n{pdf_summary}\n")
+        sections.append(("pdf", f"# 📄 PDF 문서 요약\n{pdf_summary}\n"))
     
     # 13. 웹 검색 결과
     if include_web_search:
-        web_search_results = get_web_search_for_block(dsl_block.get("id", ""), user_inputs)
+        if web_search_results is None:
+            web_search_results = get_web_search_for_block(dsl_block.get("id", ""), user_inputs)
         if web_search_results:
             web_search_text = f"# 🌐 최신 웹 검색 결과\n{web_search_results}\n"
-            prompt_parts.append(web_search_text)
+            sections.append(("web_search", web_search_text))
+    
+    # 섹션별 토큰 집계 및 예산 초과 시 축약
+    sections = fit_prompt_sections(sections, token_budget, label=dsl_block.get("id", ""), entries=section_entries)
     
-    return "\n\n".join(prompt_parts)
+    return "\n\n".join(text for _, text in sections if text)
 
 # 단계별 특화된 프롬프트 함수들 - 확장된 버전
 def prompt_requirement_table(dsl_block, user_inputs, previous_summary="", pdf_summary=None, site_fields=None):
@@ -693,3 +884,38 @@ BLOCK_FUNCTION_MAPPING = {
     # "hyderabad_masterplan_roadmap": prompt_hyderabad_masterplan_roadmap,
 }
 
+
+if __name__ == "__main__":
+    # 프롬프트 조립 벤치마크: 매 호출 고정 섹션 렌더링 vs 블록 버전별 사전 렌더링
+    import time
+    
+    blocks = load_prompt_blocks()["extra"]
+    sample_inputs = {
+        "project_name": "벤치마크 프로젝트",
+        "owner": "발주처",
+        "site_location": "서울시 강남구",
+        "site_area": "12,000㎡",
+        "building_type": "연구시설",
+        "project_goal": "연구 인프라 확충"
+    }
+    sample_site_fields = {"zoning": "준주거지역", "far_limit": "400%"}
+    previous_summary = "**이전 단계**: " + "이전 분석 결과 " * 200
+    pdf_summary = "PDF 요약 " * 100
+    rounds = 200
+    
+    def assemble(static_sections_of):
+        started = time.perf_counter()
+        for _ in range(rounds):
+            for block in blocks:
+                convert_dsl_to_prompt(
+                    block, sample_inputs, previous_summary, pdf_summary, sample_site_fields,
+                    include_web_search=False, static_sections=static_sections_of(block)
+                )
+        return (time.perf_counter() - started) / (rounds * len(blocks)) * 1e6
+    
+    uncached = assemble(lambda block: render_static_sections(block))
+    cached = assemble(get_static_sections)
+    
+    print(f"블록 {len(blocks)}개 × {rounds}회 프롬프트 조립 (웹 검색 제외)")
+    print(f"- 매번 렌더링: {uncached:.1f} µs/블록")
+    print(f"- 사전 렌더링: {cached:.1f} µs/블록 ({uncached / cached:.1f}배)")
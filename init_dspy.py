@@ -2,36 +2,59 @@
 # init_dspy.py
 import dspy
 import os
+import json
 import time
 import random
+import threading
+from contextlib import contextmanager
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from dotenv import load_dotenv
 import anthropic
 from anthropic import Anthropic
 
 load_dotenv()
 
-# Anthropic API 키 설정
-anthropic_api_key = os.environ.get('ANTHROPIC_API_KEY')
-if not anthropic_api_key:
-    print("💡 로컬 개발에서는 .streamlit/secrets.toml 파일을 사용하세요.")
-    raise ValueError("ANTHROPIC_API_KEY를 설정해주세요.")
+# Anthropic API 키 / 클라이언트 / 기본 LM은 첫 사용 시점에 생성 (import 시 네트워크·키 의존 제거)
+_anthropic_client = None
+_init_lock = threading.Lock()
 
-# Anthropic SDK 클라이언트 추가
-anthropic_client = Anthropic(api_key=anthropic_api_key)
+def get_anthropic_api_key() -> str:
+    """Anthropic API 키 조회 - 없으면 사용 시점에 오류"""
+    api_key = os.environ.get('ANTHROPIC_API_KEY')
+    if not api_key:
+        print("💡 로컬 개발에서는 .streamlit/secrets.toml 파일을 사용하세요.")
+        raise ValueError("ANTHROPIC_API_KEY를 설정해주세요.")
+    return api_key
 
-if not getattr(dspy.settings, "lm", None):
-    try:
-        lm = dspy.LM(
-            "claude-sonnet-4-20250514",  # 더 강력한 모델로 업그레이드
-            provider="anthropic",
-            api_key=anthropic_api_key,
-            max_tokens=8000  # 토큰 수 증가
-        )
-        dspy.configure(lm=lm, track_usage=True)
-        print("✅ Claude Sonnet 4 모델이 성공적으로 설정되었습니다.")
-    except Exception as e:
-        print(f"❌ Claude 모델 설정 실패: {e}")
-        raise
+def get_anthropic_client() -> Anthropic:
+    """Anthropic SDK 클라이언트 (지연 생성, 프로세스 내 1회)"""
+    global _anthropic_client
+    if _anthropic_client is None:
+        with _init_lock:
+            if _anthropic_client is None:
+                _anthropic_client = Anthropic(api_key=get_anthropic_api_key())
+    return _anthropic_client
+
+def ensure_default_lm():
+    """DSPy 기본 LM이 없으면 설정 (첫 DSPy 호출 직전에 사용)"""
+    if getattr(dspy.settings, "lm", None):
+        return
+    with _init_lock:
+        if getattr(dspy.settings, "lm", None):
+            return
+        try:
+            lm = dspy.LM(
+                "claude-sonnet-4-20250514",  # 더 강력한 모델로 업그레이드
+                provider="anthropic",
+                api_key=get_anthropic_api_key(),
+                max_tokens=8000  # 토큰 수 증가
+            )
+            dspy.configure(lm=lm, track_usage=True)
+            print("✅ Claude Sonnet 4 모델이 성공적으로 설정되었습니다.")
+        except Exception as e:
+            print(f"❌ Claude 모델 설정 실패: {e}")
+            raise
 
 # 사용 가능한 Claude 모델들
 available_models = [
@@ -41,49 +64,92 @@ available_models = [
     "claude-3-7-sonnet-20250219",  # Sonnet 3.7
 ]
 
-def get_available_models_sdk():
-    """Anthropic SDK로 사용 가능한 모델 조회 - 조건에 맞지 않는 모델 제외"""
+# === 모델 목록 캐시 (메모리 TTL + 디스크 폴백) ===
+MODEL_LIST_TTL_SEC = 6 * 3600
+MODEL_LIST_CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".model_list_cache.json")
+
+_model_list_cache = {"models": None, "fetched_at": 0.0}
+_model_list_refreshing = threading.Event()
+
+def _fetch_models_from_sdk() -> list:
+    """Anthropic SDK로 모델 목록 조회 - 허용된 모델만 반환 (네트워크 호출)"""
+    models = get_anthropic_client().models.list()
+    
+    # 모든 Claude 모델 가져오기
+    claude_models = [model.id for model in models if 'claude' in model.id]
+    
+    # 허용된 모델만 필터링 후 날짜순으로 정렬 (최신 버전 우선)
+    filtered_models = [model_id for model_id in claude_models if model_id in available_models]
+    filtered_models.sort(reverse=True)
+    return filtered_models
+
+def _load_model_list_from_disk():
+    """디스크에 저장된 모델 목록 로드 - (models, fetched_at) 또는 (None, 0)"""
     try:
-        models = anthropic_client.models.list()
-        
-        # 모든 Claude 모델 가져오기
-        claude_models = [model.id for model in models if 'claude' in model.id]
-        
-        # 허용할 모델들만 명시적으로 정의
-        allowed_models = [
-            "claude-opus-4-1-20250805",
-            "claude-opus-4-20250514", 
-            "claude-sonnet-4-20250514",
-            "claude-3-7-sonnet-20250219",
-        ]
-        
-        # 허용된 모델만 필터링
-        filtered_models = []
-        for model_id in claude_models:
-            if model_id in allowed_models:
-                filtered_models.append(model_id)
-        
-        # 날짜순으로 정렬 (최신 버전 우선)
-        filtered_models.sort(reverse=True)
-        
-        print(f"✅ SDK에서 {len(filtered_models)}개 모델 조회됨 (허용된 모델만)")
-        return filtered_models
-        
+        with open(MODEL_LIST_CACHE_PATH, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        models = [m for m in data.get("models", []) if m in available_models]
+        if models:
+            return models, float(data.get("fetched_at", 0))
+    except (OSError, ValueError):
+        pass
+    return None, 0.0
+
+def _save_model_list_to_disk(models: list, fetched_at: float):
+    """조회한 모델 목록을 디스크에 저장 (다음 콜드 스타트용)"""
+    try:
+        with open(MODEL_LIST_CACHE_PATH, "w", encoding="utf-8") as f:
+            json.dump({"models": models, "fetched_at": fetched_at}, f, ensure_ascii=False)
+    except OSError as e:
+        print(f"⚠️ 모델 목록 캐시 저장 실패: {e}")
+
+def refresh_model_list() -> list:
+    """SDK에서 모델 목록을 다시 조회해 메모리/디스크 캐시 갱신"""
+    try:
+        models = _fetch_models_from_sdk()
+        if models:
+            fetched_at = time.time()
+            _model_list_cache["models"] = models
+            _model_list_cache["fetched_at"] = fetched_at
+            _save_model_list_to_disk(models, fetched_at)
+            print(f"✅ SDK에서 {len(models)}개 모델 조회됨 (허용된 모델만)")
+        return models
     except Exception as e:
         print(f"⚠️ SDK 모델 목록 조회 실패: {e}")
-        # 폴백: 기본 모델 목록
-        fallback_models = [
-            "claude-opus-4-1-20250805",
-            "claude-opus-4-20250514", 
-            "claude-sonnet-4-20250514",
-            "claude-3-7-sonnet-20250219",
-        ]
-        return fallback_models
+        return []
+    finally:
+        _model_list_refreshing.clear()
+
+def _refresh_model_list_in_background():
+    """모델 목록 백그라운드 갱신 (중복 실행 방지)"""
+    if _model_list_refreshing.is_set():
+        return
+    _model_list_refreshing.set()
+    threading.Thread(target=refresh_model_list, name="model-list-refresh", daemon=True).start()
+
+def get_available_models_sdk(force_refresh: bool = False):
+    """사용 가능한 모델 목록 - 캐시 우선, 만료 시 백그라운드 갱신 (호출 경로에서 네트워크 대기 없음)"""
+    if force_refresh:
+        return refresh_model_list() or list(available_models)
+    
+    # 1) 메모리 캐시
+    if not _model_list_cache["models"]:
+        # 2) 디스크 캐시 (콜드 스타트)
+        models, fetched_at = _load_model_list_from_disk()
+        if models:
+            _model_list_cache["models"] = models
+            _model_list_cache["fetched_at"] = fetched_at
+    
+    if time.time() - _model_list_cache["fetched_at"] > MODEL_LIST_TTL_SEC:
+        _refresh_model_list_in_background()
+    
+    # 3) 폴백: 기본 모델 목록
+    return list(_model_list_cache["models"] or available_models)
 
 def debug_model_filtering():
     """모델 필터링 디버깅용 함수"""
     try:
-        models = anthropic_client.models.list()
+        models = get_anthropic_client().models.list()
         claude_models = [model.id for model in models if 'claude' in model.id]
         
         print("🔍 모든 Claude 모델:")
@@ -98,119 +164,548 @@ def debug_model_filtering():
     except Exception as e:
         print(f"❌ 디버깅 실패: {e}")
 
-def execute_with_sdk_with_retry(prompt: str, model: str = None, max_retries: int = 3):
-    """Anthropic SDK로 직접 실행 - 재시도 로직 포함"""
+# max_tokens로 잘린 응답은 전체 재생성 대신 이어쓰기 요청으로 완성
+MAX_CONTINUATIONS = 2
+CONTINUATION_MAX_TOKENS = 4096
+
+def _response_text(response) -> str:
+    """응답의 텍스트 블록을 이어 붙여 반환"""
+    return "".join(getattr(block, "text", "") for block in response.content)
+
+def _output_tokens(response) -> int:
+    """응답의 실제 출력 토큰 수 (usage가 없으면 0)"""
+    return getattr(getattr(response, "usage", None), "output_tokens", 0) or 0
+
+def _tool_input_text(response, tool_name: str) -> str:
+    """강제 도구 호출 응답의 도구 입력을 JSON 문자열로 반환 (결과 문자열 형식을 그대로 쓰도록)"""
+    for block in response.content:
+        if getattr(block, "type", "") == "tool_use" and block.name == tool_name:
+            return json.dumps(block.input, ensure_ascii=False)
+    return "❌ 구조화 출력 도구 호출이 없습니다."
+
+def _continue_truncated(prompt: str, partial: str, model: str):
+    """stop_reason == "max_tokens"로 잘린 응답을 assistant 프리필로 이어서 완성 - (결과, 이어쓰기 출력 토큰 합계) 반환"""
+    text = partial
+    output_tokens = 0
+    for i in range(MAX_CONTINUATIONS):
+        # 마지막 assistant 메시지는 공백으로 끝날 수 없음
+        text = text.rstrip()
+        print(f"✂️ 응답이 max_tokens에서 잘림. 이어쓰기 요청 ({i + 1}/{MAX_CONTINUATIONS})")
+        started_at = time.time()
+        try:
+            response = get_anthropic_client().messages.create(
+                model=model,
+                max_tokens=CONTINUATION_MAX_TOKENS,
+                messages=[
+                    {"role": "user", "content": prompt},
+                    {"role": "assistant", "content": text},
+                ]
+            )
+        except Exception as e:
+            # 이어쓰기 실패 시 지금까지 받은 부분 결과라도 반환
+            model_router.record(model, time.time() - started_at, "error")
+            print(f"⚠️ 이어쓰기 실패, 부분 결과 반환: {e}")
+            return text, output_tokens
+        model_router.record(model, time.time() - started_at, "ok")
+        text += _response_text(response)
+        output_tokens += _output_tokens(response)
+        if response.stop_reason != "max_tokens":
+            return text, output_tokens
+    print("⚠️ 이어쓰기 횟수 초과, 부분 결과 반환")
+    return text, output_tokens
+
+def execute_with_sdk_with_retry(prompt: str, model: str = None, max_retries: int = 3, max_tokens: int = None, tool: dict = None, budget_key: str = None):
+    """Anthropic SDK로 직접 실행 - 재시도 및 잘린 응답 이어쓰기 포함
+
+    tool: 지정하면 해당 도구 호출을 강제하고 도구 입력(JSON 문자열)을 반환 (구조화 출력)
+    budget_key: 구조화 출력이 잘렸을 때 잘린 길이를 기록할 출력 예산 키
+    """
+    return _execute_with_status(prompt, model, max_retries, max_tokens, tool, budget_key)[0]
+
+def _execute_with_status(prompt: str, model: str = None, max_retries: int = 3, max_tokens: int = None, tool: dict = None, budget_key: str = None):
+    """execute_with_sdk_with_retry 본체 - (결과, 이 호출의 마지막 시도 상태, 실제 출력 토큰 수) 반환
+
+    상태는 model_router.record와 같은 값 (ok / truncated / rate_limited / overloaded / error).
+    라우터 통계의 last_status는 다른 스레드의 호출이 섞이므로 대체 모델 전환 판단에는 이 값을 사용.
+    출력 토큰 수는 응답 usage 기준 (이어쓰기 포함 합계, 실패 시 0) - 블록별 출력 예산 기록용
+    """
     if model is None:
         model = "claude-sonnet-4-20250514"  # 기본 모델을 Sonnet 4로 변경
     
-    # 모델별 max_tokens 설정
-    model_max_tokens = {
-        "claude-3-7-sonnet-20250219": 8192,      # 최대 8192 토큰
-        "claude-sonnet-4-20250514": 12000,       # 최대 12000 토큰
-        "claude-opus-4-20250514": 12000,         # 최대 12000 토큰
-        "claude-opus-4-1-20250805": 12000        # 최대 12000 토큰
-    }
-    
-    # 선택된 모델의 max_tokens 가져오기
-    max_tokens = model_max_tokens.get(model, 8192)  # 기본값 8192
+    # 호출별 출력 예산 (모델 최대값을 넘지 않음), 미지정 시 모델 최대값
+    model_limit = MODEL_MAX_TOKENS.get(model, 8192)  # 기본값 8192
+    max_tokens = min(max_tokens, model_limit) if max_tokens else model_limit
+    tool_kwargs = {"tools": [tool], "tool_choice": {"type": "tool", "name": tool["name"]}} if tool else {}
     
+    status = None
     for attempt in range(max_retries):
+        started_at = time.time()
         try:
-            response = anthropic_client.messages.create(
+            response = get_anthropic_client().messages.create(
                 model=model,
-                max_tokens=max_tokens,  # 모델별 적절한 토큰 수 사용
-                messages=[{"role": "user", "content": prompt}]
+                max_tokens=max_tokens,  # 블록별 출력 예산 또는 모델 최대값
+                messages=[{"role": "user", "content": prompt}],
+                **tool_kwargs
             )
-            return response.content[0].text
+            if tool and response.stop_reason == "max_tokens":
+                # 잘린 도구 입력은 이어쓸 수 없음 - 잘린 길이를 기록해 다음 예산을 늘리고 모델 최대값으로 1회 재요청
+                model_router.record(model, time.time() - started_at, "truncated")
+                output_budget_tracker.record(budget_key, _output_tokens(response) or max_tokens)
+                if max_tokens < model_limit:
+                    print(f"✂️ 구조화 출력이 max_tokens({max_tokens})에서 잘림. 모델 최대값({model_limit})으로 재요청")
+                    return _execute_with_status(prompt, model, max_retries=1, max_tokens=model_limit, tool=tool, budget_key=budget_key)
+                # 모델 최대값에서도 잘리면 실패로 반환 (호출 측에서 마크다운 출력으로 재요청)
+                return "❌ 구조화 출력이 max_tokens에서 잘렸습니다.", "truncated", 0
+            model_router.record(model, time.time() - started_at, "ok")
+            if tool:
+                return _tool_input_text(response, tool["name"]), "ok", _output_tokens(response)
+            text = _response_text(response)
+            output_tokens = _output_tokens(response)
+            if response.stop_reason == "max_tokens":
+                text, continued_tokens = _continue_truncated(prompt, text, model)
+                output_tokens += continued_tokens
+            return text, "ok", output_tokens
             
         except anthropic.RateLimitError:
+            status = "rate_limited"
+            model_router.record(model, time.time() - started_at, status)
+            if attempt == max_retries - 1:  # 마지막 시도에서는 대기하지 않음
+                break
             wait_time = (2 ** attempt) + random.uniform(0, 1)  # 지수 백오프
             print(f"⚠️ Rate limit 도달. {wait_time:.1f}초 후 재시도... (시도 {attempt + 1}/{max_retries})")
             time.sleep(wait_time)
             
         except anthropic.APIError as e:
             if "overloaded_error" in str(e) or "Overloaded" in str(e):
+                status = "overloaded"
+                model_router.record(model, time.time() - started_at, status)
+                if attempt == max_retries - 1:
+                    break
+                if model_router.is_circuit_open(model):
+                    # 연속 과부하로 차단된 모델은 더 기다리지 않고 대체 모델에 맡김
+                    print(f"⛔ {model} 서킷 차단됨. 재시도를 중단합니다.")
+                    break
                 wait_time = (3 ** attempt) + random.uniform(1, 3)  # 과부하 시 더 긴 대기
                 print(f"⚠️ API 과부하. {wait_time:.1f}초 후 재시도... (시도 {attempt + 1}/{max_retries})")
                 time.sleep(wait_time)
             else:
-                return f"❌ API 오류: {e}"
+                model_router.record(model, time.time() - started_at, "error")
+                return f"❌ API 오류: {e}", "error", 0
                 
         except Exception as e:
+            status = "error"
+            model_router.record(model, time.time() - started_at, status)
             if attempt == max_retries - 1:  # 마지막 시도
-                return f"❌ 오류: {e}"
+                return f"❌ 오류: {e}", status, 0
             wait_time = (2 ** attempt) + random.uniform(0, 1)
             print(f"⚠️ 일반 오류. {wait_time:.1f}초 후 재시도... (시도 {attempt + 1}/{max_retries})")
             time.sleep(wait_time)
     
-    return "❌ 최대 재시도 횟수 초과. 잠시 후 다시 시도해주세요."
+    return "❌ 최대 재시도 횟수 초과. 잠시 후 다시 시도해주세요.", status, 0
 
 def execute_with_sdk(prompt: str, model: str = None):
     """Anthropic SDK로 직접 실행 - 기존 함수 호환성 유지"""
     return execute_with_sdk_with_retry(prompt, model, max_retries=3)
 
+# === 적응형 모델 라우팅 ===
+
+DEFAULT_MODEL = "claude-sonnet-4-20250514"
+
+# 응답 속도 순서 (빠르고 저렴한 모델 → 느리고 강력한 모델)
+MODEL_SPEED_ORDER = [
+    "claude-3-7-sonnet-20250219",
+    "claude-sonnet-4-20250514",
+    "claude-opus-4-20250514",
+    "claude-opus-4-1-20250805",
+]
+
+# 블록별 선언된 복잡도 (light / standard / heavy, 미선언 블록은 standard)
+BLOCK_COMPLEXITY = {
+    "task_comprehension": "light",
+    "action_planner": "light",
+    "design_trend_application": "light",
+    "doc_collector": "light",
+    "context_analyzer": "light",
+    "document_analyzer": "heavy",
+    "site_regulation_analysis": "heavy",
+    "concept_development": "heavy",
+    "mass_strategy": "heavy",
+    "cost_estimation": "heavy",
+    "proposal_framework": "heavy",
+}
+
+# 복잡도 → get_optimal_model 작업 유형
+COMPLEXITY_TASK_TYPES = {
+    "light": "cost_sensitive",
+    "standard": "detailed_analysis",
+    "heavy": "complex_analysis",
+}
+
+LARGE_PROMPT_TOKENS = 30000   # 이 이상이면 heavy 블록이 아닌 한 Opus 계열 회피
+SLOW_LATENCY_SEC = 150        # 최근 평균 응답 시간이 이보다 길면 느린 모델로 간주
+MAX_ERROR_RATE = 0.5          # 최근 오류율이 이보다 높으면 불안정한 모델로 간주
+OVERLOAD_COOLDOWN_SEC = 60    # 과부하 발생 후 해당 모델을 후순위로 미루는 시간
+STATS_WINDOW = 20             # 모델별로 유지하는 최근 호출 기록 수
+CIRCUIT_FAILURE_THRESHOLD = 3 # 연속 과부하 횟수가 이 이상이면 서킷 차단
+CIRCUIT_COOLDOWN_SEC = 120    # 서킷 차단 후 대체 모델로 우회하는 시간
+HEDGE_DEFAULT_DELAY_SEC = 45  # 통계가 부족할 때 백업 요청을 보내기까지의 대기 시간
+HEDGE_MIN_DELAY_SEC = 10      # 백업 요청 최소 대기 시간
+
+def estimate_tokens(text: str) -> int:
+    """프롬프트 토큰 수 추정 (한국어 혼합 텍스트 기준 약 2자당 1토큰)"""
+    return len(text or "") // 2 + 1
+
+def get_block_complexity(block_id: str) -> str:
+    """블록의 선언된 복잡도 반환"""
+    return BLOCK_COMPLEXITY.get(block_id or "", "standard")
+
+def _speed_rank(model: str) -> int:
+    """속도 순위 (낮을수록 빠름, 알 수 없는 모델은 기본 모델 순위)"""
+    if model in MODEL_SPEED_ORDER:
+        return MODEL_SPEED_ORDER.index(model)
+    return MODEL_SPEED_ORDER.index(DEFAULT_MODEL)
+
+class CircuitBreaker:
+    """모델별 서킷 브레이커 - 연속 과부하 시 일정 시간 동안 호출 차단"""
+
+    def __init__(self, failure_threshold: int = CIRCUIT_FAILURE_THRESHOLD, cooldown: float = CIRCUIT_COOLDOWN_SEC):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.consecutive_failures = 0
+        self.opened_at = None
+
+    @property
+    def state(self) -> str:
+        """closed(정상) / open(차단) / half_open(쿨다운 종료 후 시험 호출 허용)"""
+        if self.opened_at is None:
+            return "closed"
+        if time.time() - self.opened_at < self.cooldown:
+            return "open"
+        return "half_open"
+
+    def record_success(self):
+        self.consecutive_failures = 0
+        self.opened_at = None
+
+    def record_failure(self):
+        self.consecutive_failures += 1
+        # half_open 상태의 시험 호출이 실패하면 바로 다시 차단
+        if self.consecutive_failures >= self.failure_threshold or self.state == "half_open":
+            if self.state != "open":
+                print(f"⛔ 서킷 차단: 연속 과부하 {self.consecutive_failures}회, {self.cooldown:.0f}초 동안 대체 모델 사용")
+            self.opened_at = time.time()
+
+class ModelRouter:
+    """블록 복잡도, 프롬프트 크기, 최근 지연시간/오류율 기반 모델 라우터"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._history = {}        # model -> deque[(latency, status, timestamp)]
+        self._last_overload = {}  # model -> timestamp
+        self._breakers = {}       # model -> CircuitBreaker
+
+    def _breaker(self, model: str) -> CircuitBreaker:
+        return self._breakers.setdefault(model, CircuitBreaker())
+
+    def record(self, model: str, latency: float, status: str):
+        """호출 결과 기록 (status: ok / truncated / rate_limited / overloaded / error)"""
+        with self._lock:
+            history = self._history.setdefault(model, deque(maxlen=STATS_WINDOW))
+            history.append((latency, status, time.time()))
+            if status == "overloaded":
+                self._last_overload[model] = time.time()
+                self._breaker(model).record_failure()
+            elif status == "ok":
+                self._breaker(model).record_success()
+
+    def is_circuit_open(self, model: str) -> bool:
+        """서킷 차단 여부 (half_open은 시험 호출을 위해 허용)"""
+        with self._lock:
+            return self._breaker(model).state == "open"
+
+    def get_latency_percentile(self, model: str, percentile: float = 95) -> float:
+        """성공 호출 지연시간의 백분위수 (기록이 없으면 0)"""
+        with self._lock:
+            latencies = sorted(latency for latency, status, _ in self._history.get(model, []) if status == "ok")
+        if not latencies:
+            return 0.0
+        index = min(len(latencies) - 1, int(round(percentile / 100 * (len(latencies) - 1))))
+        return latencies[index]
+
+    def get_stats(self, model: str) -> dict:
+        """모델별 최근 통계 반환"""
+        with self._lock:
+            history = list(self._history.get(model, []))
+            last_overload = self._last_overload.get(model)
+        if not history:
+            return {"calls": 0, "avg_latency": 0.0, "error_rate": 0.0, "last_status": None, "last_overload": last_overload}
+        ok_latencies = [latency for latency, status, _ in history if status == "ok"]
+        # 출력 예산 부족으로 잘린 응답은 모델 오류로 보지 않음
+        errors = sum(1 for _, status, _ in history if status not in ("ok", "truncated"))
+        return {
+            "calls": len(history),
+            "avg_latency": sum(ok_latencies) / len(ok_latencies) if ok_latencies else 0.0,
+            "error_rate": errors / len(history),
+            "last_status": history[-1][1],
+            "last_overload": last_overload,
+        }
+
+    def is_healthy(self, model: str) -> bool:
+        """최근 과부하·오류율·지연시간 기준 정상 여부"""
+        if self.is_circuit_open(model):
+            return False
+        stats = self.get_stats(model)
+        if stats["last_overload"] and time.time() - stats["last_overload"] < OVERLOAD_COOLDOWN_SEC:
+            return False
+        if stats["calls"] >= 3 and stats["error_rate"] > MAX_ERROR_RATE:
+            return False
+        if stats["avg_latency"] > SLOW_LATENCY_SEC:
+            return False
+        return True
+
+    def route(self, block_id: str = None, prompt: str = "", preferred_model: str = None) -> list:
+        """호출할 모델 후보 목록 반환 (첫 번째가 1순위, 나머지는 장애 시 대체 모델)"""
+        complexity = get_block_complexity(block_id)
+        baseline = get_optimal_model(COMPLEXITY_TASK_TYPES[complexity])
+
+        if complexity == "light":
+            # 가벼운 블록은 선택 모델이 더 빠를 때만 그대로 사용
+            primary = preferred_model if preferred_model and _speed_rank(preferred_model) < _speed_rank(baseline) else baseline
+        else:
+            primary = preferred_model or baseline
+
+        # 큰 프롬프트는 heavy 블록이 아니면 기본 모델 이하로 제한
+        if (estimate_tokens(prompt) > LARGE_PROMPT_TOKENS and complexity != "heavy"
+                and _speed_rank(primary) > _speed_rank(DEFAULT_MODEL)):
+            primary = DEFAULT_MODEL
+
+        # 1순위 + 더 빠른 대체 모델들 (1순위와 가까운 모델부터)
+        fallbacks = [m for m in reversed(MODEL_SPEED_ORDER) if _speed_rank(m) < _speed_rank(primary)]
+        candidates = [primary] + fallbacks
+
+        # 서킷이 열린 모델은 제외 (전부 열려 있으면 마지막 수단으로 유지)
+        closed = [m for m in candidates if not self.is_circuit_open(m)]
+        if not closed:
+            # 후보가 모두 차단되면 차단되지 않은 다른 모델(더 느린 모델 포함)로 우회
+            closed = [m for m in MODEL_SPEED_ORDER if m not in candidates and not self.is_circuit_open(m)]
+        candidates = closed or candidates
+
+        # 정상 모델을 앞으로 (상대 순서 유지)
+        healthy = [m for m in candidates if self.is_healthy(m)]
+        return healthy + [m for m in candidates if m not in healthy]
+
+model_router = ModelRouter()
+
+# === 블록별 출력 예산 ===
+
+OUTPUT_BUDGET_MIN = 2048
+OUTPUT_BUDGET_HEADROOM = 1.25   # 과거 출력 길이 대비 여유분
+OUTPUT_HISTORY_MIN_SAMPLES = 3  # 이 이상 기록되면 구조 추정 대신 실측 사용
+OUTPUT_HISTORY_SIZE = 20
+OUTPUT_HISTORY_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".output_length_history.json")
+
+class OutputBudgetTracker:
+    """블록별 실제 출력 길이를 기록하고 호출별 max_tokens 예산 산정"""
+
+    def __init__(self, path: str = OUTPUT_HISTORY_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._history = None  # 첫 사용 시 디스크에서 로드
+
+    def _load(self):
+        if self._history is None:
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    self._history = {k: list(v)[-OUTPUT_HISTORY_SIZE:] for k, v in json.load(f).items()}
+            except (OSError, ValueError):
+                self._history = {}
+        return self._history
+
+    def record(self, block_id: str, output_tokens: int):
+        """블록 출력 길이 기록 (디스크에 저장)"""
+        if not block_id or output_tokens <= 0:
+            return
+        with self._lock:
+            history = self._load()
+            samples = history.setdefault(block_id, [])
+            samples.append(int(output_tokens))
+            del samples[:-OUTPUT_HISTORY_SIZE]
+            try:
+                with open(self.path, "w", encoding="utf-8") as f:
+                    json.dump(history, f, ensure_ascii=False)
+            except OSError as e:
+                print(f"⚠️ 출력 길이 기록 저장 실패: {e}")
+
+    def get_history_estimate(self, block_id: str):
+        """과거 출력 길이의 p90 (기록이 부족하면 None)"""
+        with self._lock:
+            samples = sorted(self._load().get(block_id, []))
+        if len(samples) < OUTPUT_HISTORY_MIN_SAMPLES:
+            return None
+        return samples[min(len(samples) - 1, int(len(samples) * 0.9))]
+
+    def get_budget(self, block_id: str = None, structural_estimate: int = None, model: str = None) -> int:
+        """호출별 max_tokens 예산 - 실측(p90) 우선, 없으면 블록 구조 추정, 모델 최대값으로 상한"""
+        model_limit = MODEL_MAX_TOKENS.get(model or DEFAULT_MODEL, 8192)
+        estimate = self.get_history_estimate(block_id) if block_id else None
+        if estimate is None:
+            estimate = structural_estimate
+        if not estimate:
+            return model_limit
+        return min(model_limit, max(OUTPUT_BUDGET_MIN, int(estimate * OUTPUT_BUDGET_HEADROOM)))
+
+output_budget_tracker = OutputBudgetTracker()
+
+# 헤징 요청용 스레드 풀 (주 요청 + 백업 요청)
+_hedge_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="hedge")
+
+def execute_hedged(prompt: str, model: str, backup_model: str, hedge_delay: float = None, max_retries: int = 1, max_tokens: int = None, tool: dict = None, budget_key: str = None):
+    """헤징 실행 - 주 요청이 p95 지연을 넘기면 백업 요청을 보내고 먼저 성공한 결과 사용"""
+    return _execute_hedged(prompt, model, backup_model, hedge_delay, max_retries, max_tokens, tool, budget_key)[0]
+
+def _execute_hedged(prompt: str, model: str, backup_model: str, hedge_delay: float = None, max_retries: int = 1, max_tokens: int = None, tool: dict = None, budget_key: str = None):
+    """execute_hedged 본체 - (결과, 사용한 응답의 실제 출력 토큰 수) 반환"""
+    if hedge_delay is None:
+        p95 = model_router.get_latency_percentile(model, 95)
+        hedge_delay = max(HEDGE_MIN_DELAY_SEC, p95) if p95 else HEDGE_DEFAULT_DELAY_SEC
+
+    primary = _hedge_executor.submit(_execute_with_status, prompt, model, max_retries, max_tokens, tool, budget_key)
+    done, _ = wait([primary], timeout=hedge_delay)
+    if done:
+        result, _, output_tokens = primary.result()
+        if result and not result.startswith("❌"):
+            return result, output_tokens
+
+    print(f"🪁 헤징: {model} 응답 지연/실패 → {backup_model} 백업 요청 ({hedge_delay:.0f}초 경과)")
+    backup = _hedge_executor.submit(_execute_with_status, prompt, backup_model, max_retries, max_tokens, tool, budget_key)
+    pending = {backup} if primary.done() else {primary, backup}
+    result, output_tokens = "", 0
+    if primary.done():
+        result, _, output_tokens = primary.result()
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            result, _, output_tokens = future.result()
+            if result and not result.startswith("❌"):
+                return result, output_tokens
+    return result, output_tokens
+
+def execute_with_routing(prompt: str, block_id: str = None, preferred_model: str = None, max_retries: int = 3, hedge: bool = False, output_budget: int = None, tool: dict = None):
+    """라우터가 고른 모델로 실행 - 과부하/속도 제한 시 더 빠른 모델로 전환
+
+    output_budget: 블록 구조로 추정한 출력 토큰 수 (과거 출력 기록이 쌓이면 실측 우선)
+    tool: 구조화 출력 도구 (지정하면 도구 입력 JSON 문자열 반환, 출력 기록은 마크다운 출력과 따로 관리)
+    """
+    budget_key = f"{block_id}:structured" if block_id and tool else block_id
+    candidates = model_router.route(block_id, prompt, preferred_model)
+    result = ""
+    output_tokens = 0
+    if hedge and len(candidates) > 1:
+        max_tokens = output_budget_tracker.get_budget(budget_key, output_budget, candidates[0])
+        result, output_tokens = _execute_hedged(prompt, candidates[0], candidates[1], max_tokens=max_tokens, tool=tool, budget_key=budget_key)
+        if not (result and not result.startswith("❌")):
+            # 두 요청 모두 실패하면 나머지 후보로 일반 라우팅
+            candidates = candidates[2:] or candidates[-1:]
+    if not (result and not result.startswith("❌")):
+        for i, model in enumerate(candidates):
+            is_last = i == len(candidates) - 1
+            max_tokens = output_budget_tracker.get_budget(budget_key, output_budget, model)
+            print(f"🔀 모델 라우팅: {block_id or '기본'} → {model} (후보 {i + 1}/{len(candidates)}, max_tokens {max_tokens})")
+            # 대체 모델이 남아 있으면 같은 모델에서 오래 재시도하지 않음
+            result, status, output_tokens = _execute_with_status(prompt, model, max_retries=max_retries if is_last else 1, max_tokens=max_tokens, tool=tool, budget_key=budget_key)
+            if result and not result.startswith("❌"):
+                break
+            if status not in ("overloaded", "rate_limited"):
+                # 과부하가 아닌 오류는 다른 모델로 바꿔도 해결되지 않음
+                return result
+    if block_id and result and not result.startswith("❌"):
+        # 실제 출력 토큰 수로 기록 (한국어는 2자당 1토큰 추정보다 토큰이 많음), usage가 없을 때만 추정
+        output_budget_tracker.record(budget_key, output_tokens or estimate_tokens(result))
+    return result
+
 def get_optimal_model(task_type: str) -> str:
     """작업 유형에 따른 최적 모델 선택"""
     model_mapping = {
         "detailed_analysis": "claude-sonnet-4-20250514",  # 상세 분석
         "complex_analysis": "claude-opus-4-1-20250805",   # 복잡한 분석
-        "cost_sensitive": "claude-3-5-sonnet-20241022",   # 비용 민감
+        "cost_sensitive": "claude-3-7-sonnet-20250219",   # 비용 민감 (허용 모델 중 가장 빠른 모델)
         "narrative_generation": "claude-sonnet-4-20250514"  # Narrative 생성 전용
     }
     return model_mapping.get(task_type, "claude-sonnet-4-20250514")  # 기본값을 Sonnet 4로 변경
 
-def configure_model(model_name: str):
-    """모델 동적 변경 - 스레드 안전 버전"""
+# === 요청 단위 모델 컨텍스트 ===
+
+# 모델별 max_tokens 설정
+MODEL_MAX_TOKENS = {
+    "claude-3-7-sonnet-20250219": 8192,      # 최대 8192 토큰
+    "claude-sonnet-4-20250514": 12000,       # 최대 12000 토큰
+    "claude-opus-4-20250514": 12000,         # 최대 12000 토큰
+    "claude-opus-4-1-20250805": 12000        # 최대 12000 토큰
+}
+
+# 모델별 프롬프트(입력) 토큰 예산 - 섹션별 축약 기준 (출력 여유분 · 지연 시간 고려)
+MODEL_PROMPT_TOKEN_BUDGET = {
+    "claude-3-7-sonnet-20250219": 24000,
+    "claude-sonnet-4-20250514": 30000,
+    "claude-opus-4-20250514": 24000,
+    "claude-opus-4-1-20250805": 24000
+}
+
+def get_prompt_token_budget(model_name: str = None) -> int:
+    """모델별 프롬프트 토큰 예산 (미지정 시 기본 모델 기준)"""
+    return MODEL_PROMPT_TOKEN_BUDGET.get(model_name or DEFAULT_MODEL, 24000)
+
+# 프로세스 전역 LM 풀 (모델별로 한 번만 생성해 재사용)
+_lm_pool = {}
+_lm_pool_lock = threading.Lock()
+
+def get_lm(model_name: str):
+    """모델별 dspy.LM 핸들 반환 - 풀에 없으면 생성 후 재사용"""
     if model_name not in available_models:
         raise ValueError(f"지원하지 않는 모델: {model_name}")
     
-    # 모델별 max_tokens 설정
-    model_max_tokens = {
-        "claude-3-7-sonnet-20250219": 8192,      # 최대 8192 토큰
-        "claude-sonnet-4-20250514": 12000,       # 최대 12000 토큰
-        "claude-opus-4-20250514": 12000,         # 최대 12000 토큰
-        "claude-opus-4-1-20250805": 12000        # 최대 12000 토큰
-    }
-    
-    # 선택된 모델의 max_tokens 가져오기
-    max_tokens = model_max_tokens.get(model_name, 8192)  # 기본값 8192
-    
-    try:
-        # 기존 설정 제거
-        if hasattr(dspy.settings, "lm"):
-            delattr(dspy.settings, "lm")
-        
-        # 새 모델 설정
-        lm = dspy.LM(
-            model_name,
-            provider="anthropic",
-            api_key=anthropic_api_key,
-            max_tokens=max_tokens  # 모델별 적절한 토큰 수 사용
-        )
-        dspy.configure(lm=lm, track_usage=True)
-        print(f"✅ 모델이 {model_name}로 변경되었습니다. (max_tokens: {max_tokens})")
-    except Exception as e:
-        print(f"❌ 모델 변경 실패: {e}")
-        # 기본 모델로 복구
-        try:
+    with _lm_pool_lock:
+        lm = _lm_pool.get(model_name)
+        if lm is None:
             lm = dspy.LM(
-                "claude-sonnet-4-20250514",  # 기본 모델을 Sonnet 4로 변경
+                model_name,
                 provider="anthropic",
-                api_key=anthropic_api_key,
-                max_tokens=12000
+                api_key=get_anthropic_api_key(),
+                max_tokens=MODEL_MAX_TOKENS.get(model_name, 8192)  # 모델별 적절한 토큰 수 사용
             )
-            dspy.configure(lm=lm, track_usage=True)
-        except:
-            pass
-        raise
+            _lm_pool[model_name] = lm
+            print(f"✅ LM 풀에 {model_name} 추가 (max_tokens: {MODEL_MAX_TOKENS.get(model_name, 8192)})")
+        return lm
+
+@contextmanager
+def model_context(model_name: str = None):
+    """현재 요청(스레드) 범위에만 모델을 적용하는 DSPy 컨텍스트 - 전역 설정은 변경하지 않음"""
+    ensure_default_lm()
+    if not model_name or model_name not in available_models:
+        # 알 수 없는 모델이면 전역 기본 LM 그대로 사용
+        yield
+        return
+    with dspy.context(lm=get_lm(model_name)):
+        yield
+
+def get_active_model():
+    """현재 스레드에서 활성화된 DSPy LM의 모델명 (알 수 없는 모델이면 None)"""
+    model = getattr(getattr(dspy.settings, "lm", None), "model", None)
+    if not isinstance(model, str):
+        return None
+    model = model.split("/")[-1]  # "anthropic/모델명" 형식 대응
+    return model if model in available_models else None
+
+def configure_model(model_name: str):
+    """프로세스 기본 모델 변경 - 요청별 모델 선택에는 model_context 사용"""
+    lm = get_lm(model_name)
+    dspy.configure(lm=lm, track_usage=True)
+    print(f"✅ 기본 모델이 {model_name}로 변경되었습니다. (max_tokens: {MODEL_MAX_TOKENS.get(model_name, 8192)})")
 
 def run_analysis_with_optimal_model(task_type: str, prompt: str, signature_class=None):
-    """작업 유형에 따른 최적 모델로 분석 실행"""
+    """작업 유형에 따른 최적 모델로 분석 실행 (요청 범위 모델 컨텍스트 사용)"""
     optimal_model = get_optimal_model(task_type)
     
-    # 모델 변경
-    configure_model(optimal_model)
-    
     # 분석 실행 (기본값 또는 지정된 Signature 사용)
     if signature_class is None:
         # 순환 import 방지를 위해 동적 import
@@ -219,11 +714,11 @@ def run_analysis_with_optimal_model(task_type: str, prompt: str, signature_class
             signature_class = RequirementTableSignature
         except ImportError:
             # Signature 클래스가 없으면 기본 DSPy Predict 사용
-            result = dspy.Predict()(input=prompt)
-            return result
+            with model_context(optimal_model):
+                return dspy.Predict()(input=prompt)
     
-    result = dspy.Predict(signature_class)(input=prompt)
-    return result
+    with model_context(optimal_model):
+        return dspy.Predict(signature_class)(input=prompt)
 
 # 모델 정보 제공 함수
 def get_model_info():
@@ -0,0 +1,86 @@
+# prompt_budget.py
+"""
+프롬프트 토큰 예산 관리
+- 프롬프트를 이름 있는 섹션(핵심 원칙 · 프레임워크 · 템플릿 · 프로젝트 정보 · 사이트 정보 · 이전 결과 · PDF · 웹 검색) 단위로 토큰 추정
+- 모델별 예산을 넘으면 우선순위가 낮은 섹션부터 축약 (웹 검색 → PDF → 이전 결과 → 템플릿 등)
+- 호출마다 섹션별 토큰 내역을 로그로 출력
+"""
+
+from init_dspy import estimate_tokens, get_prompt_token_budget
+
+TRUNCATION_MARKER = "…(토큰 예산 초과로 이하 생략)"
+
+# 축약 규칙: (섹션 이름, 최소 유지 토큰, 방식) - 앞에 있을수록 먼저 축약
+#   truncate: 줄 단위로 뒤에서부터 자름
+#   drop_oldest: 단계 항목 단위로 오래된 것부터 제거 후, 그래도 넘치면 자름 (항목 목록이 없으면 truncate)
+TRIM_RULES = [
+    ("web_search", 0, "truncate"),
+    ("pdf", 400, "truncate"),
+    ("previous_results", 1500, "drop_oldest"),
+    ("templates", 300, "truncate"),
+    ("presentation", 200, "truncate"),
+    ("site_fields", 200, "truncate"),
+    ("framework", 500, "truncate"),
+]
+
+def _truncate_text(text: str, max_tokens: int) -> str:
+    """추정 토큰 수가 max_tokens 이하가 되도록 줄 경계에서 자르고 생략 표시 추가"""
+    if max_tokens <= 0:
+        return ""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    max_chars = max((max_tokens - estimate_tokens(TRUNCATION_MARKER)) * 2, 0)
+    cut = text[:max_chars]
+    line_end = cut.rfind("\n")
+    if line_end > max_chars // 2:
+        cut = cut[:line_end]
+    return f"{cut.rstrip()}\n{TRUNCATION_MARKER}\n"
+
+def _drop_oldest_entries(header: str, entries: list, max_tokens: int) -> str:
+    """이전 결과 섹션에서 오래된 단계 항목부터 제거 (섹션 제목은 유지, 항목 경계는 조립 시의 항목 목록 기준)"""
+    entries = list(entries)
+    while len(entries) > 1 and estimate_tokens(header + "\n\n".join(entries) + "\n") > max_tokens:
+        entries.pop(0)
+    return _truncate_text(header + "\n\n".join(entries) + "\n", max_tokens)
+
+def fit_prompt_sections(sections: list, token_budget: int = None, label: str = "", entries: dict = None) -> list:
+    """
+    섹션 목록 [(이름, 텍스트)]을 토큰 예산에 맞게 축약해 반환 (순서 유지).
+    예산 이내면 원본 그대로 반환하며, 어느 경우든 섹션별 토큰 내역을 로그로 출력.
+    entries: drop_oldest 섹션의 (섹션 제목, 항목 목록) - 텍스트는 제목 + 빈 줄로 이은 항목 (없으면 줄 단위로 자름)
+    """
+    entries = entries or {}
+    budget = token_budget or get_prompt_token_budget()
+    sections = [(name, text) for name, text in sections if text]
+    costs = {name: estimate_tokens(text) for name, text in sections}
+    total = sum(costs.values())
+    trimmed = []
+
+    if total > budget:
+        texts = dict(sections)
+        for name, min_tokens, method in TRIM_RULES:
+            if total <= budget:
+                break
+            if name not in texts:
+                continue
+            target = max(min_tokens, costs[name] - (total - budget))
+            if target >= costs[name]:
+                continue
+            if method == "drop_oldest" and name in entries:
+                new_text = _drop_oldest_entries(*entries[name], target)
+            else:
+                new_text = _truncate_text(texts[name], target)
+            new_cost = estimate_tokens(new_text) if new_text else 0
+            trimmed.append(f"{name} {costs[name]}→{new_cost}")
+            total -= costs[name] - new_cost
+            texts[name] = new_text
+            costs[name] = new_cost
+        sections = [(name, texts[name]) for name, _ in sections]
+
+    breakdown = " · ".join(f"{name} {costs[name]}" for name, _ in sections)
+    print(f"🧮 프롬프트 토큰 [{label or '-'}] {breakdown} = {total} / {budget}")
+    if trimmed:
+        print(f"✂️ 토큰 예산 초과로 축약: {', '.join(trimmed)}")
+    if total > budget:
+        print(f"⚠️ 축약 후에도 예산 초과 ({total} / {budget}) - 필수 섹션은 유지")
+    return sections
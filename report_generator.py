@@ -736,9 +736,17 @@ def generate_word_report(content, user_inputs):
     return buffer.getvalue()
 
 def generate_report_content(report_type, include_charts, include_recommendations, include_appendix):
-    """보고서 내용 생성 - 보고서 유형별 차이점 적용"""
+    """보고서 내용 생성 - 현재 세션의 프로젝트 정보 · 분석 결과 사용"""
+    import streamlit as st
     from user_state import get_user_inputs
-    user_inputs = get_user_inputs()
+    return build_report_content(
+        get_user_inputs(),
+        st.session_state.get('cot_history', []),
+        report_type, include_charts, include_recommendations, include_appendix
+    )
+
+def build_report_content(user_inputs, cot_history, report_type, include_charts=True, include_recommendations=True, include_appendix=False):
+    """보고서 내용 생성 - 보고서 유형별 차이점 적용 (세션 상태와 무관, 배치 실행에서도 사용)"""
     
     # 기본 정보
     report_content = f"""
@@ -756,12 +764,11 @@ def generate_report_content(report_type, include_charts, include_recommendations
 """
     
     # 분석 결과 추가
-    import streamlit as st
-    if st.session_state.get('cot_history'):
+    if cot_history:
         if report_type == "전체 분석 보고서":
             # 전체 분석 보고서: 모든 상세 내용 포함
             report_content += "## 전체 분석 결과\n"
-            for i, history in enumerate(st.session_state.cot_history, 1):
+            for i, history in enumerate(cot_history, 1):
                 report_content += f"""
 ### {i}. {history['step']}
 
@@ -772,7 +779,7 @@ def generate_report_content(report_type, include_charts, include_recommendations
         
         elif report_type == "요약 보고서":
             # 요약 보고서: 핵심 요약과 인사이트만
-            for i, history in enumerate(st.session_state.cot_history, 1):
+            for i, history in enumerate(cot_history, 1):
                 report_content += f"""
 ### {i}. {history['step']}
 
@@ -786,7 +793,7 @@ def generate_report_content(report_type, include_charts, include_recommendations
         elif report_type == "전문가 보고서":
             # 전문가 보고서: 기술적 분석과 전문적 권장사항
             report_content += "## 전문가 분석 결과\n"
-            for i, history in enumerate(st.session_state.cot_history, 1):
+            for i, history in enumerate(cot_history, 1):
                 report_content += f"""
 ### {i}. {history['step']}
 
@@ -803,7 +810,7 @@ def generate_report_content(report_type, include_charts, include_recommendations
         elif report_type == "클라이언트 보고서":
             # 클라이언트 보고서: 비즈니스 관점의 핵심 내용
             report_content += "## 💼 비즈니스 분석 결과\n"
-            for i, history in enumerate(st.session_state.cot_history, 1):
+            for i, history in enumerate(cot_history, 1):
                 report_content += f"""
 ### {i}. {history['step']}
 
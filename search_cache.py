@@ -0,0 +1,118 @@
+# search_cache.py
+"""
+웹 검색 결과 디스크 캐시 (프로세스 · 세션 · 프로젝트 간 공유)
+- 키: (검색어, gl, hl, num, 공급자)
+- TTL 이내: 캐시 결과 그대로 사용 (hit)
+- TTL 초과 ~ 재검증 허용 기간: 캐시 결과를 즉시 반환하고 백그라운드에서 갱신 (stale-while-revalidate)
+- 네트워크 오류 시: 기간이 지난 결과라도 남아 있으면 대신 사용 (offline)
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+
+SEARCH_CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".search_cache.json")
+SEARCH_CACHE_TTL_SEC = int(os.environ.get("SEARCH_CACHE_TTL_SEC", 24 * 3600))            # 신선한 결과로 보는 기간
+SEARCH_CACHE_STALE_SEC = int(os.environ.get("SEARCH_CACHE_STALE_SEC", 7 * 24 * 3600))    # TTL 이후 재검증하며 사용하는 기간
+SEARCH_CACHE_MAX_AGE_SEC = 30 * 24 * 3600                                                # 오프라인 대비 보관 기간 (이후 삭제)
+SEARCH_CACHE_FORMAT = 2                                                                  # 저장 형식 버전 (2: 결과 목록)
+
+def make_search_key(query: str, gl: str, hl: str, num: int, provider: str = "serpapi") -> str:
+    """검색 조건 · 공급자별 캐시 키 (결과 형식 버전 포함)"""
+    payload = json.dumps([SEARCH_CACHE_FORMAT, query, gl, hl, num] + ([] if provider == "serpapi" else [provider]), ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+class SearchResultCache:
+    """검색 결과 디스크 캐시 - 스레드 안전, 조회 통계 보관"""
+
+    def __init__(self, path: str = SEARCH_CACHE_PATH, ttl_sec: int = SEARCH_CACHE_TTL_SEC, stale_sec: int = SEARCH_CACHE_STALE_SEC):
+        self.path = path
+        self.ttl_sec = ttl_sec
+        self.stale_sec = stale_sec
+        self.stats = {"hit": 0, "stale": 0, "miss": 0, "offline": 0}
+        self._entries = None  # 키 → {"query", "result", "fetched_at"} (첫 조회 시 로드)
+        self._lock = threading.Lock()
+        self._revalidating = set()
+
+    def _load(self):
+        """디스크 캐시 로드 (락 안에서 호출)"""
+        if self._entries is not None:
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                self._entries = json.load(f).get("entries", {})
+        except (OSError, ValueError):
+            self._entries = {}
+
+    def _save(self):
+        """디스크 캐시 저장 - 보관 기간이 지난 항목은 정리 (락 안에서 호출)"""
+        now = time.time()
+        self._entries = {
+            key: entry for key, entry in self._entries.items()
+            if now - entry.get("fetched_at", 0) < SEARCH_CACHE_MAX_AGE_SEC
+        }
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"entries": self._entries}, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"⚠️ 검색 캐시 저장 실패: {e}")
+
+    def lookup(self, key: str):
+        """캐시 조회 - (결과, 상태) 반환. 상태: 'fresh' / 'stale' / 'expired' / None(없음)"""
+        with self._lock:
+            self._load()
+            entry = self._entries.get(key)
+        if not entry:
+            return None, None
+        age = time.time() - entry.get("fetched_at", 0)
+        if age < self.ttl_sec:
+            return entry["result"], "fresh"
+        if age < self.ttl_sec + self.stale_sec:
+            return entry["result"], "stale"
+        return entry["result"], "expired"
+
+    def store(self, key: str, query: str, result):
+        """검색 결과 저장 (디스크에 즉시 반영)"""
+        with self._lock:
+            self._load()
+            self._entries[key] = {"query": query, "result": result, "fetched_at": time.time()}
+            self._save()
+
+    def count(self, status: str):
+        """조회 통계 증가"""
+        with self._lock:
+            self.stats[status] += 1
+
+    def revalidate_in_background(self, key: str, query: str, fetch):
+        """백그라운드 재검증 (같은 키 중복 실행 방지) - fetch()가 성공하면 캐시 갱신"""
+        with self._lock:
+            if key in self._revalidating:
+                return
+            self._revalidating.add(key)
+
+        def _run():
+            try:
+                self.store(key, query, fetch())
+                print(f"🔄 검색 캐시 갱신: {query}")
+            except Exception as e:
+                print(f"⚠️ 검색 캐시 갱신 실패 ({query}): {e}")
+            finally:
+                with self._lock:
+                    self._revalidating.discard(key)
+
+        threading.Thread(target=_run, name="search-revalidate", daemon=True).start()
+
+    def get_stats(self) -> dict:
+        """조회 통계 (hit / stale / miss / offline 횟수와 적중률)"""
+        with self._lock:
+            stats = dict(self.stats)
+        total = sum(stats.values())
+        stats["hit_rate"] = (stats["hit"] + stats["stale"] + stats["offline"]) / total if total else 0.0
+        return stats
+
+# 프로세스 전역 캐시
+search_cache = SearchResultCache()
@@ -0,0 +1,101 @@
+# search_fixture_server.py
+"""
+로컬 웹 검색 대역 서버 (SerpAPI 호환 응답)
+- 기록된 fixture(SEARCH_FIXTURE_RECORD_DIR로 저장한 JSON 파일)를 검색어별로 재생
+- fixture가 없는 검색어는 검색어로 만든 가상 결과 반환
+- 응답 지연(평균 · 편차)을 지정해 동시 검색 · 캐시 동작을 실제와 비슷한 조건에서 측정
+
+실행:
+    python search_fixture_server.py --fixtures search_fixtures --port 8765 --latency-ms 800 --jitter-ms 400
+    SEARCH_PROVIDER=fixture streamlit run app.py
+"""
+
+import argparse
+import glob
+import hashlib
+import json
+import os
+import random
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+def load_fixtures(fixture_dir: str) -> dict:
+    """fixture 디렉터리 로드 - {검색어: SerpAPI 응답}"""
+    fixtures = {}
+    for path in sorted(glob.glob(os.path.join(fixture_dir, "*.json"))):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            fixtures[data["query"]] = data["response"]
+        except (OSError, ValueError, KeyError) as e:
+            print(f"⚠️ fixture 로드 실패 ({path}): {e}")
+    return fixtures
+
+def synthetic_response(query: str, num: int) -> dict:
+    """fixture가 없는 검색어용 가상 결과"""
+    return {
+        "organic_results": [
+            {
+                "position": i,
+                "title": f"{query} - 참고 자료 {i}",
+                "link": f"https://example.com/{hashlib.sha1(query.encode('utf-8')).hexdigest()[:8]}/{i}",
+                "snippet": f"{query}에 관한 가상 검색 결과 {i}입니다. 로컬 fixture 서버에서 생성되었습니다."
+            }
+            for i in range(1, num + 1)
+        ]
+    }
+
+def make_handler(fixtures: dict, latency_ms: int, jitter_ms: int, error_rate: float):
+    class FixtureHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urlparse(self.path)
+            if url.path != "/search":
+                self.send_error(404)
+                return
+            params = parse_qs(url.query)
+            query = params.get("q", [""])[0]
+            num = int(params.get("num", ["3"])[0])
+
+            # 실제 API와 비슷한 응답 지연 · 오류
+            delay_ms = max(0, latency_ms + random.uniform(-jitter_ms, jitter_ms))
+            time.sleep(delay_ms / 1000)
+            if random.random() < error_rate:
+                self.send_error(503, "fixture server simulated error")
+                return
+
+            body = json.dumps(fixtures.get(query) or synthetic_response(query, num), ensure_ascii=False).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            print(f"🔎 fixture {self.address_string()} {format % args}")
+
+    return FixtureHandler
+
+def main():
+    parser = argparse.ArgumentParser(description="SerpAPI 호환 로컬 검색 fixture 서버")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--fixtures", default="search_fixtures", help="기록된 fixture JSON 디렉터리")
+    parser.add_argument("--latency-ms", type=int, default=800, help="평균 응답 지연")
+    parser.add_argument("--jitter-ms", type=int, default=400, help="응답 지연 편차")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="503 오류 응답 비율 (0~1)")
+    args = parser.parse_args()
+
+    fixtures = load_fixtures(args.fixtures)
+    handler = make_handler(fixtures, args.latency_ms, args.jitter_ms, args.error_rate)
+    server = ThreadingHTTPServer((args.host, args.port), handler)
+    print(f"✅ 검색 fixture 서버 시작: http://{args.host}:{args.port}/search (fixture {len(fixtures)}개, 지연 {args.latency_ms}±{args.jitter_ms}ms)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
@@ -1,70 +1,166 @@
 # search_helper.py
-import requests
-import os
+import threading
+import time
 import streamlit as st
-from dotenv import load_dotenv
-
-# .env 파일 로드
-load_dotenv()
-
-# 1단계: Streamlit Secrets에서 가져오기 (우선순위)
-SERP_API_KEY = st.secrets.get("SERP_API_KEY")
-
-# 2단계: 환경 변수에서 가져오기 (로컬 개발용)
-if not SERP_API_KEY:
-    SERP_API_KEY = os.environ.get("SERP_API_KEY")
-
-def search_web_serpapi(query):
-    """웹 검색 함수 - 오류 처리 및 디버깅 강화"""
-    
-    # API 키 확인
-    if not SERP_API_KEY:
-        st.warning("⚠️ SERP_API_KEY가 설정되지 않았습니다.")
-        return "[검색 API 키 없음]"
-    
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from search_cache import search_cache, make_search_key
+from search_providers import SearchError, SEARCH_REQUEST_TIMEOUT_SEC, get_search_provider
+
+SEARCH_FANOUT_DEADLINE_SEC = 12   # 여러 검색어 동시 검색 전체 마감 시간
+SEARCH_FANOUT_WORKERS = 4
+
+# 동시 검색용 워커 풀 (워커에서는 Streamlit 호출 없음)
+_search_executor = ThreadPoolExecutor(max_workers=SEARCH_FANOUT_WORKERS, thread_name_prefix="web-search")
+
+# 진행 중인 검색 (캐시 키 → Future) - 같은 검색어 중복 요청 방지
+_inflight = {}
+_inflight_lock = threading.Lock()
+
+def format_search_items(items):
+    """검색 결과 목록을 프롬프트용 텍스트로 포맷팅"""
+    if not items:
+        return "[검색 결과 없음]"
+    return "\n---\n".join(f"📄 {r.get('title') or '제목 없음'}\n{r.get('snippet') or '내용 없음'}" for r in items)
+
+def _search(query, gl="kr", hl="ko", num=3, use_cache=True, timeout=SEARCH_REQUEST_TIMEOUT_SEC):
+    """캐시 조회 후 필요 시 검색 - (결과, 알림) 반환
+    결과: 성공 시 결과 목록, 실패 시 오류 표시 문자열 / 알림: (수준, 메시지) 또는 None
+
+    Streamlit을 호출하지 않으므로 워커 스레드에서도 사용 가능 (알림 표시는 호출 측 담당)
+    """
+    provider = get_search_provider()
+    use_cache = use_cache and provider.uses_cache
+    key = make_search_key(query, gl, hl, num, provider.name)
+    cached, status = search_cache.lookup(key) if use_cache else (None, None)
+
+    # 신선한 캐시 결과
+    if status == "fresh":
+        search_cache.count("hit")
+        print(f"💾 검색 캐시 적중: {query}")
+        return cached, None
+
+    # 공급자 설정(API 키) 확인 (설정이 없으면 남아 있는 캐시라도 사용)
+    if not provider.is_configured():
+        if cached is not None:
+            search_cache.count("offline")
+            return cached, None
+        return "[검색 API 키 없음]", ("warning", provider.missing_config_message())
+
+    # 재검증 기간 내 결과는 즉시 반환하고 백그라운드에서 갱신
+    if status == "stale":
+        search_cache.count("stale")
+        print(f"💾 검색 캐시(재검증 중) 사용: {query}")
+        search_cache.revalidate_in_background(key, query, lambda: provider.search(query, gl, hl, num))
+        return cached, None
+
+    if use_cache:
+        search_cache.count("miss")
     try:
-        params = {
-            "q": query,
-            "api_key": SERP_API_KEY,
-            "engine": "google",
-            "num": 3,
-            "gl": "kr",  # 한국 지역 설정
-            "hl": "ko"   # 한국어 결과
-        }
-        
-        resp = requests.get("https://serpapi.com/search", params=params, timeout=10)
-        
-        # 응답 상태 확인
-        if resp.status_code != 200:
-            st.error(f"❌ SerpAPI 오류: {resp.status_code}")
-            return f"[검색 API 오류: {resp.status_code}]"
-        
-        data = resp.json()
-        
-        # 오류 응답 확인
-        if "error" in data:
-            st.error(f"❌ SerpAPI 오류: {data['error']}")
-            return f"[검색 API 오류: {data['error']}]"
-        
-        # 결과 처리
-        if "organic_results" in data and data["organic_results"]:
-            results = data["organic_results"]
-            formatted_results = []
-            for r in results:
-                title = r.get('title', '제목 없음')
-                snippet = r.get('snippet', '내용 없음')
-                formatted_results.append(f"📄 {title}\n{snippet}")
-            return "\n---\n".join(formatted_results)
-        else:
-            st.info("ℹ️ 검색 결과가 없습니다.")
-            return "[검색 결과 없음]"
-            
-    except requests.exceptions.Timeout:
-        st.error("❌ 검색 시간 초과")
-        return "[검색 시간 초과]"
-    except requests.exceptions.RequestException as e:
-        st.error(f"❌ 네트워크 오류: {e}")
-        return f"[네트워크 오류: {e}]"
+        result = provider.search(query, gl, hl, num, timeout=timeout)
+        if use_cache:
+            search_cache.store(key, query, result)
+        if not result and provider.name != "none":
+            return result, ("info", "ℹ️ 검색 결과가 없습니다.")
+        return result, None
+    except SearchError as e:
+        # 네트워크 · API 오류 시 기간이 지난 캐시 결과로 대체
+        if cached is not None:
+            search_cache.count("offline")
+            print(f"📴 검색 실패, 이전 캐시 결과 사용 ({query}): {e}")
+            return cached, None
+        return e.result, ("error", str(e))
     except Exception as e:
-        st.error(f"❌ 예상치 못한 오류: {e}")
-        return f"[검색 오류: {e}]"
\ No newline at end of file
+        if cached is not None:
+            search_cache.count("offline")
+            return cached, None
+        return f"[검색 오류: {e}]", ("error", f"❌ 예상치 못한 오류: {e}")
+
+def _show_notice(notice, quiet=False):
+    """검색 알림 표시 - quiet이면(워커 스레드 등) 로그로만 출력"""
+    if not notice:
+        return
+    level, message = notice
+    if quiet:
+        print(message)
+    else:
+        getattr(st, level)(message)
+
+def search_web_serpapi(query, gl="kr", hl="ko", num=3, use_cache=True, quiet=False):
+    """웹 검색 함수 - 디스크 캐시(TTL · stale-while-revalidate · 오프라인 대체) 및 오류 처리"""
+    result, notice = _search(query, gl, hl, num, use_cache)
+    _show_notice(notice, quiet)
+    return result if isinstance(result, str) else format_search_items(result)
+
+def _submit_search(query, gl="kr", hl="ko", num=3, timeout=SEARCH_REQUEST_TIMEOUT_SEC):
+    """검색 작업 예약 - 같은 조건의 검색이 진행 중이면 그 Future 재사용"""
+    key = make_search_key(query, gl, hl, num, get_search_provider().name)
+    with _inflight_lock:
+        future = _inflight.get(key)
+        if future is None:
+            future = _search_executor.submit(_search, query, gl, hl, num, True, timeout)
+            _inflight[key] = future
+            future.add_done_callback(lambda _f: _release_inflight(key, _f))
+    return future
+
+def _release_inflight(key, future):
+    with _inflight_lock:
+        if _inflight.get(key) is future:
+            del _inflight[key]
+
+def search_web_many(queries, gl="kr", hl="ko", num=3, deadline_sec=SEARCH_FANOUT_DEADLINE_SEC, quiet=False):
+    """
+    여러 검색어 동시 검색 - 전체 마감 시간 내에 끝난 결과만 반환 (부분 결과).
+    반환: [(검색어, 결과 목록)] 검색어 순서 유지, 마감 시간을 넘기거나 실패한 검색어는 제외
+    """
+    if not queries:
+        return []
+    started = time.time()
+    timeout = min(SEARCH_REQUEST_TIMEOUT_SEC, deadline_sec)
+    futures = {
+        query: _submit_search(query, gl, hl, num, timeout)
+        for query in dict.fromkeys(queries)
+    }
+    done, not_done = wait(futures.values(), timeout=deadline_sec)
+
+    results = []
+    for query, future in futures.items():
+        if future not in done:
+            continue
+        try:
+            result, notice = future.result()
+        except Exception as e:
+            print(f"웹 검색 실패 ({query}): {e}")
+            continue
+        _show_notice(notice, quiet)
+        if not isinstance(result, str):
+            results.append((query, result))
+
+    elapsed = time.time() - started
+    if not_done:
+        print(f"⏱️ 웹 검색 마감({deadline_sec}s) 초과: {len(not_done)}개 검색어 제외, {len(results)}개 결과 사용")
+    print(f"🌐 웹 검색 {len(results)}/{len(futures)}건 완료 ({elapsed:.1f}s)")
+    return results
+
+def warm_search_cache(queries, gl="kr", hl="ko", num=3):
+    """
+    검색어 목록을 백그라운드에서 미리 검색해 캐시를 채움 (결과를 기다리지 않음).
+    이미 신선한 캐시가 있는 검색어는 건너뜀. 예약한 검색어 수 반환
+    """
+    provider = get_search_provider()
+    if not provider.uses_cache or not provider.is_configured():
+        return 0
+    pending = []
+    for query in dict.fromkeys(q for q in queries if q):
+        _, status = search_cache.lookup(make_search_key(query, gl, hl, num, provider.name))
+        if status != "fresh":
+            pending.append(query)
+    for query in pending:
+        _submit_search(query, gl, hl, num, SEARCH_REQUEST_TIMEOUT_SEC)
+    if pending:
+        print(f"🔥 웹 검색 사전 준비: {len(pending)}개 검색어 백그라운드 검색 시작")
+    return len(pending)
+
+def get_search_cache_stats():
+    """검색 캐시 조회 통계"""
+    return search_cache.get_stats()
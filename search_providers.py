@@ -0,0 +1,181 @@
+# search_providers.py
+"""
+웹 검색 공급자 (전송 계층)
+- serpapi: SerpAPI (SERP_API_KEY 필요, 첫 검색 시 키 조회)
+- fixture: 로컬 HTTP 대역 서버 (search_fixture_server.py) - 오프라인 테스트 · 부하 측정용
+- none: 검색하지 않음
+공급자는 환경 변수 SEARCH_PROVIDER로 선택 (기본값 serpapi).
+SerpAPI 응답 해석(parse_serpapi_response)은 전송과 분리되어 fixture 공급자도 같은 형식을 사용.
+"""
+
+import hashlib
+import json
+import os
+import threading
+
+import requests
+from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+
+# .env 파일 로드
+load_dotenv()
+
+SEARCH_REQUEST_TIMEOUT_SEC = 10   # 검색 요청 1건 타임아웃
+SEARCH_POOL_SIZE = 4              # 호스트별 유지 커넥션 수
+
+SERPAPI_URL = "https://serpapi.com/search"
+SEARCH_FIXTURE_URL = os.environ.get("SEARCH_FIXTURE_URL", "http://127.0.0.1:8765/search")
+# 지정하면 SerpAPI 응답을 fixture 파일로 기록 (search_fixture_server.py에서 재생)
+SEARCH_FIXTURE_RECORD_DIR = os.environ.get("SEARCH_FIXTURE_RECORD_DIR")
+
+# 프로세스 전역 HTTP 세션 (커넥션 풀 · keep-alive 재사용)
+_http_session = requests.Session()
+_http_session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=SEARCH_POOL_SIZE))
+_http_session.mount("http://", HTTPAdapter(pool_connections=4, pool_maxsize=SEARCH_POOL_SIZE))
+
+class SearchError(Exception):
+    """검색 API 호출 실패 - result는 프롬프트에 넣을 오류 표시 문자열"""
+
+    def __init__(self, message: str, result: str):
+        super().__init__(message)
+        self.result = result
+
+def get_serp_api_key():
+    """SerpAPI 키 조회 - Streamlit Secrets 우선, 없으면 환경 변수 (호출 시점에 조회)"""
+    try:
+        import streamlit as st
+        api_key = st.secrets.get("SERP_API_KEY")
+    except Exception:
+        # secrets.toml이 없거나 Streamlit 밖에서 실행
+        api_key = None
+    return api_key or os.environ.get("SERP_API_KEY")
+
+def parse_serpapi_response(data: dict) -> list:
+    """SerpAPI 형식 응답 → 결과 목록 [{title, snippet, link, position}]"""
+    # 오류 응답 확인
+    if "error" in data:
+        raise SearchError(f"❌ SerpAPI 오류: {data['error']}", f"[검색 API 오류: {data['error']}]")
+    return [
+        {
+            "title": r.get('title', '제목 없음'),
+            "snippet": r.get('snippet', '내용 없음'),
+            "link": r.get('link', ''),
+            "position": r.get('position', i)
+        }
+        for i, r in enumerate(data.get("organic_results") or [], 1)
+    ]
+
+def _get_json(url: str, params: dict, timeout: float) -> dict:
+    """공용 세션으로 GET 요청 후 JSON 반환 - 전송 오류는 SearchError로 변환"""
+    try:
+        resp = _http_session.get(url, params=params, timeout=timeout)
+    except requests.exceptions.Timeout:
+        raise SearchError("❌ 검색 시간 초과", "[검색 시간 초과]")
+    except requests.exceptions.RequestException as e:
+        raise SearchError(f"❌ 네트워크 오류: {e}", f"[네트워크 오류: {e}]")
+
+    # 응답 상태 확인
+    if resp.status_code != 200:
+        raise SearchError(f"❌ 검색 API 오류: {resp.status_code}", f"[검색 API 오류: {resp.status_code}]")
+    return resp.json()
+
+def record_fixture(query: str, params: dict, data: dict):
+    """SerpAPI 응답을 fixture 파일로 저장 (SEARCH_FIXTURE_RECORD_DIR 지정 시)"""
+    if not SEARCH_FIXTURE_RECORD_DIR:
+        return
+    try:
+        os.makedirs(SEARCH_FIXTURE_RECORD_DIR, exist_ok=True)
+        name = hashlib.sha1(query.encode("utf-8")).hexdigest()[:16]
+        with open(os.path.join(SEARCH_FIXTURE_RECORD_DIR, f"{name}.json"), "w", encoding="utf-8") as f:
+            json.dump({"query": query, "gl": params.get("gl"), "hl": params.get("hl"), "response": data}, f, ensure_ascii=False, indent=2)
+    except OSError as e:
+        print(f"⚠️ 검색 fixture 기록 실패: {e}")
+
+class SearchProvider:
+    """검색 공급자 기본 클래스"""
+
+    name = "base"
+    uses_cache = True
+
+    def is_configured(self) -> bool:
+        return True
+
+    def missing_config_message(self) -> str:
+        return ""
+
+    def search(self, query: str, gl: str = "kr", hl: str = "ko", num: int = 3, timeout: float = SEARCH_REQUEST_TIMEOUT_SEC) -> list:
+        raise NotImplementedError
+
+class SerpApiProvider(SearchProvider):
+    """SerpAPI 공급자"""
+
+    name = "serpapi"
+
+    def is_configured(self) -> bool:
+        return bool(get_serp_api_key())
+
+    def missing_config_message(self) -> str:
+        return "⚠️ SERP_API_KEY가 설정되지 않았습니다."
+
+    def search(self, query, gl="kr", hl="ko", num=3, timeout=SEARCH_REQUEST_TIMEOUT_SEC):
+        params = {
+            "q": query,
+            "api_key": get_serp_api_key(),
+            "engine": "google",
+            "num": num,
+            "gl": gl,  # 한국 지역 설정
+            "hl": hl   # 한국어 결과
+        }
+        data = _get_json(SERPAPI_URL, params, timeout)
+        record_fixture(query, params, data)
+        return parse_serpapi_response(data)
+
+class FixtureSearchProvider(SearchProvider):
+    """로컬 fixture 서버 공급자 (SerpAPI와 같은 응답 형식, 키 불필요)"""
+
+    name = "fixture"
+
+    def __init__(self, url: str = SEARCH_FIXTURE_URL):
+        self.url = url
+
+    def search(self, query, gl="kr", hl="ko", num=3, timeout=SEARCH_REQUEST_TIMEOUT_SEC):
+        data = _get_json(self.url, {"q": query, "gl": gl, "hl": hl, "num": num}, timeout)
+        return parse_serpapi_response(data)
+
+class NoopSearchProvider(SearchProvider):
+    """검색하지 않는 공급자 (항상 빈 결과)"""
+
+    name = "none"
+    uses_cache = False
+
+    def search(self, query, gl="kr", hl="ko", num=3, timeout=SEARCH_REQUEST_TIMEOUT_SEC):
+        return []
+
+SEARCH_PROVIDERS = {
+    "serpapi": SerpApiProvider,
+    "fixture": FixtureSearchProvider,
+    "none": NoopSearchProvider,
+}
+
+_provider = None
+_provider_lock = threading.Lock()
+
+def get_search_provider() -> SearchProvider:
+    """환경 변수 SEARCH_PROVIDER로 선택된 공급자 (프로세스 전역 1개)"""
+    global _provider
+    if _provider is None:
+        with _provider_lock:
+            if _provider is None:
+                name = os.environ.get("SEARCH_PROVIDER", "serpapi").strip().lower()
+                if name not in SEARCH_PROVIDERS:
+                    print(f"⚠️ 알 수 없는 SEARCH_PROVIDER '{name}' - serpapi 사용")
+                    name = "serpapi"
+                _provider = SEARCH_PROVIDERS[name]()
+                print(f"🔎 웹 검색 공급자: {_provider.name}")
+    return _provider
+
+def set_search_provider(provider: SearchProvider):
+    """공급자 교체 (테스트 · 벤치마크용)"""
+    global _provider
+    with _provider_lock:
+        _provider = provider
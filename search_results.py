@@ -0,0 +1,98 @@
+# search_results.py
+"""
+웹 검색 결과 후처리 (프롬프트 삽입 전)
+- 중복 제거: 같은 URL, 스니펫이 거의 같은 결과(문자 shingle Jaccard 유사도)
+- 순위: 블록 목표와의 관련도(문자 bigram 겹침) + 검색 순위
+- 압축: 단계별 토큰 예산 안에서 관련도 높은 결과부터 포함, 긴 스니펫은 잘라냄
+"""
+
+import re
+
+from init_dspy import estimate_tokens
+
+SEARCH_RESULT_TOKEN_BUDGET = 1200   # 단계별 웹 검색 섹션 상한 (추정 토큰)
+NEAR_DUPLICATE_THRESHOLD = 0.6      # 스니펫 shingle Jaccard 유사도가 이 이상이면 중복
+SHINGLE_SIZE = 3
+SNIPPET_MAX_CHARS = 300
+
+def normalize_url(url: str) -> str:
+    """URL 비교용 정규화 (스킴 · www · 쿼리 · 끝 슬래시 제거)"""
+    url = re.sub(r"^https?://(www\.)?", "", (url or "").strip().lower())
+    return url.split("#")[0].split("?")[0].rstrip("/")
+
+def _normalize_text(text: str) -> str:
+    return re.sub(r"\s+", " ", re.sub(r"[^\w\s]", " ", (text or "").lower())).strip()
+
+def shingles(text: str, size: int = SHINGLE_SIZE) -> set:
+    """문자 단위 shingle 집합 (한국어는 띄어쓰기가 불규칙해 단어 대신 문자 사용)"""
+    text = _normalize_text(text).replace(" ", "")
+    if len(text) <= size:
+        return {text} if text else set()
+    return {text[i:i + size] for i in range(len(text) - size + 1)}
+
+def jaccard(a: set, b: set) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+def dedupe_results(items: list, threshold: float = NEAR_DUPLICATE_THRESHOLD) -> list:
+    """URL 중복 · 거의 같은 스니펫 제거 (먼저 나온 결과 유지)"""
+    kept = []
+    seen_urls = set()
+    kept_shingles = []
+    for item in items:
+        url = normalize_url(item.get("link", ""))
+        if url and url in seen_urls:
+            continue
+        item_shingles = shingles(f"{item.get('title', '')} {item.get('snippet', '')}")
+        if any(jaccard(item_shingles, other) >= threshold for other in kept_shingles):
+            continue
+        if url:
+            seen_urls.add(url)
+        kept_shingles.append(item_shingles)
+        kept.append(item)
+    return kept
+
+def relevance_score(item: dict, goal_bigrams: set) -> float:
+    """블록 목표와의 관련도 (목표 bigram 중 결과에 나타난 비율) + 검색 순위 가점"""
+    item_bigrams = shingles(f"{item.get('title', '')} {item.get('snippet', '')}", size=2)
+    overlap = len(goal_bigrams & item_bigrams) / len(goal_bigrams) if goal_bigrams else 0.0
+    return overlap + 0.1 / (item.get("position", 0) + 1)
+
+def format_result(item: dict, max_chars: int = SNIPPET_MAX_CHARS) -> str:
+    """결과 1건 포맷팅 (스니펫은 max_chars에서 자름)"""
+    snippet = item.get("snippet") or "내용 없음"
+    if len(snippet) > max_chars:
+        snippet = snippet[:max_chars].rstrip() + "…"
+    text = f"📄 {item.get('title') or '제목 없음'}\n{snippet}"
+    if item.get("link"):
+        text += f"\n(출처: {item['link']})"
+    return text
+
+def compress_results(items: list, goal: str = "", token_budget: int = SEARCH_RESULT_TOKEN_BUDGET) -> list:
+    """
+    중복 제거 후 관련도 순으로 정렬해 토큰 예산 안에 들어가는 결과만 포맷팅해 반환.
+    반환: [(검색어, 포맷된 결과)] 관련도 순
+    """
+    unique = dedupe_results(items)
+    goal_bigrams = shingles(goal, size=2)
+    ranked = sorted(unique, key=lambda item: relevance_score(item, goal_bigrams), reverse=True)
+
+    selected = []
+    used = 0
+    for item in ranked:
+        text = format_result(item)
+        cost = estimate_tokens(text)
+        if used + cost > token_budget:
+            # 짧게 줄여서라도 들어가면 포함
+            text = format_result(item, max_chars=SNIPPET_MAX_CHARS // 3)
+            cost = estimate_tokens(text)
+            if used + cost > token_budget:
+                continue
+        selected.append((item.get("query", ""), text))
+        used += cost
+
+    dropped = len(items) - len(selected)
+    if dropped:
+        print(f"🧹 웹 검색 결과 정리: {len(items)}건 → {len(selected)}건 (중복 {len(items) - len(unique)}건 제거, 약 {used} 토큰)")
+    return selected
@@ -0,0 +1,275 @@
+# section_parser.py
+"""
+분석 결과 섹션 분리 (output_structure 기준)
+- 항목 제목이 붙은 마커 줄만 먼저 찾고, 못 찾은 항목이 있을 때만 그 항목 자리(앞뒤 항목 마커 사이)의 제목(#) · 번호(1.) · 굵은 글씨(**) 마커를 색인
+- output_structure 항목마다 가장 잘 맞는 마커를 선택 (제목 원문 일치(공백 무관) → 정규화 제목 일치 → 포함 → 유사도, 앞 단계에서 모두 찾으면 뒤 단계 생략),
+  마커 사이를 섹션 내용으로 사용
+- 마커를 찾지 못한 항목만 키워드가 포함된 줄로 대체 (줄 목록을 만들지 않고 정규식으로 탐색)
+"""
+
+import re
+from bisect import bisect_left, bisect_right
+from difflib import SequenceMatcher
+from functools import lru_cache
+
+SECTION_MIN_CONTENT_CHARS = 10   # 이보다 짧은 내용은 섹션을 찾지 못한 것으로 처리
+SECTION_FUZZY_RATIO = 0.75       # 제목 유사도 기준 (제목 마커만)
+SECTION_KEYWORD_MAX_LINES = 10   # 키워드 대체 시 최대 줄 수
+
+# 마커 줄 (제목 #, 굵은 글씨 **, 번호 1.) - 줄바꿈 리터럴로 시작하는 패턴이라 본문 · 표 줄은 정규식 엔진 안에서 빠르게 건너뜀
+# 그룹: 1=제목 기호, 2=굵은 글씨 시작, 3=번호, 4=나머지
+_MARKER_PREFIX = r"\n[ \t]*(?:(#{1,6})[ \t]+|(\*\*)|(?=\d+[.)][ \t]))[ \t*]*(?:(\d+)[.)](?![\d.]))?[ \t]*"
+_MARKER_LINE = re.compile(_MARKER_PREFIX + r"([^\n]*)")
+_LEADING_NUMBER = re.compile(r"^[\s*]*\d+[.)](?![\d.])")
+_NON_WORD = re.compile(r"[\W_]+")
+
+# 마커 항목 (튜플 - 결과마다 수십 개가 만들어지므로 dict 대신 사용)
+_START, _CONTENT_START, _KIND, _NUMBER, _TEXT = range(5)
+
+# 마커 일치 등급 (작을수록 우선)
+_EXACT_NUMBERED, _EXACT, _CONTAINS, _FUZZY = range(4)
+
+def normalize_title(text: str) -> str:
+    """제목 비교용 정규화 - 번호 · 굵은 글씨 · 기호 · 공백 제거, 소문자"""
+    return _NON_WORD.sub("", _LEADING_NUMBER.sub("", text)).lower()
+
+def _compact(text: str) -> str:
+    """제목 원문 비교 키 - 공백만 제거 (정규식 없이 계산)"""
+    return "".join(text.split())
+
+def _marker_title(text: str) -> str:
+    """마커 제목 정규화 (번호는 마커 정규식에서 이미 분리되므로 숫자로 시작할 때만 번호 제거)"""
+    return normalize_title(text) if text[:1].isdigit() else _NON_WORD.sub("", text).lower()
+
+@lru_cache(maxsize=256)
+def _structure_keys(output_structure: tuple):
+    """
+    output_structure별 비교 키 (블록 구조는 고정이므로 구조마다 한 번만 계산).
+    반환: (정규화 제목 목록, 공백을 뺀 제목 → 위치, 항목 제목 마커 줄 정규식)
+    """
+    titles = tuple(normalize_title(structure) for structure in output_structure)
+    key_positions = {}
+    for position, structure in enumerate(output_structure):
+        key_positions.setdefault(_compact(structure), position)
+    # _MARKER_LINE과 그룹이 같고 나머지가 항목 제목(글자 사이 공백 무관)으로 시작하는 줄만 (하위 제목 · 본문 번호 목록은 건너뜀)
+    title_patterns = ["[ \t]*".join(map(re.escape, key)) for key in sorted(key_positions, key=len, reverse=True) if key]
+    title_line = re.compile(
+        _MARKER_PREFIX + r"([ \t*:]*(?:" + "|".join(title_patterns) + r")[^\n]*)"
+    ) if title_patterns else None
+    return titles, key_positions, title_line
+
+def find_title_markers(result: str, output_structure: list) -> list:
+    """
+    제목 원문(공백 무관)이 항목과 같은 마커만 찾음 (하위 제목 등 나머지 마커는 색인하지 않음).
+    전체 마커 색인 후 1단계에서 비교하는 마커와 같은 목록
+    """
+    _, key_positions, title_line = _structure_keys(tuple(output_structure))
+    if title_line is None:
+        return []
+    markers = (_marker(match) for match in title_line.finditer("\n" + result))
+    return [marker for marker in markers if marker is not None and _compact(marker[_TEXT]) in key_positions]
+
+@lru_cache(maxsize=1024)
+def _keyword_pattern(structure: str):
+    """키워드 대체용 정규식 (항목 단어 중 하나라도 포함, 대소문자 무시) - 대체가 필요할 때만 생성"""
+    keywords = structure.lower().split()
+    if not keywords:
+        return None
+    # 대소문자가 없는 단어(한글 등)만 있으면 IGNORECASE 없이 (탐색이 더 빠름)
+    flags = re.IGNORECASE if any(keyword != keyword.upper() for keyword in keywords) else 0
+    return re.compile("|".join(map(re.escape, keywords)), flags)
+
+def _marker(match):
+    """마커 줄 정규식 일치 → 마커 튜플 (닫는 ** 가 없는 굵은 글씨 줄은 None)"""
+    hashes, bold, number, title = match.groups()
+    content_start = match.end() - 1
+    if hashes:
+        kind = "heading"
+    elif bold:
+        # 굵은 글씨 마커는 닫는 ** 까지가 제목, 같은 줄의 나머지는 내용
+        close = title.find("**")
+        if close < 0:
+            return None
+        content_start -= len(title[close + 2:].lstrip(" \t:"))
+        title = title[:close]
+        kind = "bold"
+    else:
+        kind = "numbered"
+    return (match.start(), content_start, kind, int(number) if number else None, title.strip(" \t*:"))
+
+def tokenize_sections(result: str, start: int = 0, end: int = None) -> list:
+    """
+    결과의 섹션 마커 목록 (한 번 순회, start ~ end 구간만 지정 가능 - 위치는 마커 start 기준).
+    각 마커: (start, content_start, kind, number, text) 튜플
+    start: 마커 줄 시작 위치, content_start: 섹션 내용 시작 위치, kind: heading / numbered / bold,
+    text: 번호 · 굵은 글씨 기호 · 앞뒤 콜론을 뗀 제목 원문 (정규화는 원문 비교로 못 찾은 항목이 있을 때만)
+    """
+    # 첫 줄도 같은 패턴으로 찾도록 줄바꿈을 앞에 붙이고 위치는 1씩 보정
+    text = "\n" + result
+    markers = map(_marker, _MARKER_LINE.finditer(text, start, len(text) if end is None else end))
+    return [marker for marker in markers if marker is not None]
+
+def _pick(markers: list, indexes, used: set, number: int, previous_start: int):
+    """제목이 같은 마커 중 선택 - 번호가 같고 앞 항목 마커 다음에 오는 마커 우선 (목차 · 요약의 언급 회피)"""
+    candidates = [
+        ((_EXACT_NUMBERED if markers[index][_NUMBER] == number else _EXACT, markers[index][_START] <= previous_start), index)
+        for index in indexes if index not in used
+    ]
+    return min(candidates)[1] if candidates else None
+
+def _partial_candidates(markers: list, by_title: dict, used: set, number: int, title: str) -> list:
+    """제목이 정확히 같은 마커가 없을 때의 후보 (부분 일치 · 유사도) - 같은 제목은 한 번만 비교"""
+    candidates = []
+    matcher = None
+    for marker_title, indexes in by_title.items():
+        if not marker_title:
+            continue
+        contains = title in marker_title
+        contained = marker_title in title and len(marker_title) * 2 >= len(title)
+        similar = None
+        for index in indexes:
+            marker = markers[index]
+            if index in used or (marker[_KIND] == "numbered" and marker[_NUMBER] != number):
+                # 본문의 번호 목록은 번호가 같을 때만 부분 일치 허용
+                continue
+            if contains or (contained and marker[_KIND] != "bold"):
+                rank = _CONTAINS
+            elif marker[_KIND] == "heading":
+                if similar is None:
+                    # 길이 차이만으로 기준에 못 미치면 유사도 계산 생략 (real_quick_ratio와 같은 상한)
+                    similar = 2 * min(len(marker_title), len(title)) >= SECTION_FUZZY_RATIO * (len(marker_title) + len(title))
+                    if similar:
+                        if matcher is None:
+                            matcher = SequenceMatcher(None)
+                            matcher.set_seq2(title)
+                        matcher.set_seq1(marker_title)
+                        similar = matcher.quick_ratio() >= SECTION_FUZZY_RATIO and matcher.ratio() >= SECTION_FUZZY_RATIO
+                if not similar:
+                    continue
+                rank = _FUZZY
+            else:
+                continue
+            candidates.append((rank, index))
+    return candidates
+
+def _window(starts: list, position: int) -> tuple:
+    """항목 자리 - 앞 항목 마커 ~ 뒤 항목 마커 (찾은 항목 기준, 없으면 결과 처음 · 끝)"""
+    low = next((start for start in reversed(starts[:position]) if start is not None), -1)
+    high = next((start for start in starts[position + 1:] if start is not None), None)
+    return low, high
+
+def _match_titles(markers: list, output_structure: list):
+    """1단계 - 제목 원문(공백 무관)이 같은 마커를 색인으로 바로 찾음. 반환: (일치, 항목별 마커 위치, 사용한 마커)"""
+    _, key_positions, _ = _structure_keys(tuple(output_structure))
+    by_key = {}
+    for index, marker in enumerate(markers):
+        position = key_positions.get(_compact(marker[_TEXT]))
+        if position is not None:
+            by_key.setdefault(position, []).append(index)
+
+    starts = [None] * len(output_structure)
+    matched = {}
+    used = set()
+    previous_start = -1
+    for position, structure in enumerate(output_structure):
+        index = _pick(markers, by_key.get(position, ()), used, position + 1, previous_start)
+        if index is not None:
+            matched[structure] = index
+            used.add(index)
+            previous_start = starts[position] = markers[index][_START]
+    return matched, starts, used
+
+def match_sections(markers: list, output_structure: list) -> dict:
+    """
+    output_structure 항목 → 마커 인덱스 (세 단계, 앞 단계에서 모두 찾으면 뒤 단계는 건너뜀).
+    1) 제목 원문(공백 무관)이 같은 마커를 색인으로 바로 찾음 - 대부분의 결과는 여기서 끝남 (정규화 · 유사도 계산 없음)
+    2) 남은 항목만 정규화 제목(공백 · 기호 · 대소문자 무시)이 같은 마커를 찾음
+    3) 그래도 남은 항목만 부분 일치 · 유사도로 비교
+    2 · 3단계는 항목 자리(앞뒤 항목 마커 사이)의 마커만 비교 (목차 · 다른 항목의 하위 제목을 가져가지 않도록, 정규화 · 유사도 계산도 이 구간만)
+    """
+    matched, starts, used = _match_titles(markers, output_structure)
+    if len(matched) == len(output_structure):
+        return matched
+
+    titles = _structure_keys(tuple(output_structure))[0]
+    marker_starts = [marker[_START] for marker in markers]
+    normalized = {}
+    for exact in (True, False):
+        for position, (structure, title) in enumerate(zip(output_structure, titles)):
+            if structure in matched or not title:
+                continue
+            low, high = _window(starts, position)
+            by_title = {}
+            for index in range(bisect_right(marker_starts, low), len(markers) if high is None else bisect_left(marker_starts, high)):
+                if index in used:
+                    continue
+                if index not in normalized:
+                    normalized[index] = _marker_title(markers[index][_TEXT])
+                by_title.setdefault(normalized[index], []).append(index)
+            if exact:
+                index = _pick(markers, by_title.get(title, ()), used, position + 1, low)
+            else:
+                candidates = _partial_candidates(markers, by_title, used, position + 1, title)
+                index = min(candidates)[1] if candidates else None
+            if index is not None:
+                matched[structure] = index
+                used.add(index)
+                starts[position] = markers[index][_START]
+        if len(matched) == len(output_structure):
+            break
+    return matched
+
+def _keyword_lines(result: str, pattern) -> list:
+    """키워드가 포함된 줄 (앞에서부터 최대 SECTION_KEYWORD_MAX_LINES줄, 줄 목록을 만들지 않고 정규식으로 탐색)"""
+    lines = []
+    line_end = -1
+    for match in pattern.finditer(result):
+        if match.start() < line_end:
+            continue
+        line_start = result.rfind("\n", 0, match.start()) + 1
+        line_end = result.find("\n", match.end())
+        if line_end < 0:
+            line_end = len(result)
+        lines.append(result[line_start:line_end])
+        if len(lines) >= SECTION_KEYWORD_MAX_LINES:
+            break
+    return lines
+
+def parse_sections(result: str, output_structure: list) -> dict:
+    """output_structure 항목 → 섹션 내용 (찾지 못하면 키워드 포함 줄, 그것도 없으면 안내 문구)"""
+    result = result or ""
+    # 대부분의 결과는 모든 항목 제목이 그대로 마커에 있으므로 해당 마커만 찾음
+    markers = find_title_markers(result, output_structure)
+    matched, starts, _ = _match_titles(markers, output_structure)
+    if len(matched) < len(output_structure):
+        # 못 찾은 항목의 자리만 추가로 색인 (2 · 3단계는 이 구간만 비교하므로 전체 색인과 결과가 같음)
+        spans = {_window(starts, position) for position, structure in enumerate(output_structure) if structure not in matched}
+        known = {marker[_START] for marker in markers}
+        markers = sorted(markers + [
+            marker for low, high in spans for marker in tokenize_sections(result, low + 1, high)
+            if marker[_START] not in known
+        ])
+        matched = match_sections(markers, output_structure)
+    # 섹션은 다음 항목 마커 전까지
+    boundaries = sorted(markers[index][_START] for index in matched.values())
+
+    parsed = {}
+    for structure in output_structure:
+        content = None
+        if structure in matched:
+            start, content_start = markers[matched[structure]][:2]
+            end = next((b for b in boundaries if b > start), len(result))
+            content = result[content_start:end].strip()
+            if len(content) < SECTION_MIN_CONTENT_CHARS:
+                content = None
+
+        if not content:
+            # 키워드 기반 대체
+            pattern = _keyword_pattern(structure)
+            relevant_lines = _keyword_lines(result, pattern) if pattern else []
+            if relevant_lines:
+                content = "\n".join(relevant_lines)
+            else:
+                content = f"⚠️ '{structure}' 구조의 결과를 찾을 수 없습니다."
+        parsed[structure] = content
+    return parsed
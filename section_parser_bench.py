@@ -0,0 +1,228 @@
+# section_parser_bench.py
+"""
+분석 결과 섹션 분리 회귀 벤치마크
+- 기록된 분석 결과(user_data/<사용자>/analysis_results/*.json의 cot_history · step_history)를 이전 파서와 section_parser로 각각 분리
+- 항목별 결과 일치 여부와 파싱 시간 비교 (다른 항목은 원인별로 집계, 내용은 --show-diffs로 확인)
+- 블록 구조별 1회성 준비 비용(정규식 컴파일)은 따로 측정하고, 파싱 시간은 두 파서를 라운드마다 번갈아 측정해 최솟값 · 중앙값 비교
+  (모든 항목 제목이 마커에 있는 결과와 항목 누락 · 제목 변형이 있는 결과를 따로 집계)
+- 기록된 결과가 없거나 부족하면 블록 output_structure로 만든 가상 결과(--synthetic)로 측정
+
+실행:
+    python section_parser_bench.py --user-data user_data --synthetic 50 --repeat 5 --show-diffs
+"""
+
+import argparse
+import gc
+import glob
+import json
+import os
+import random
+import statistics
+import time
+from collections import Counter
+
+import section_parser
+from section_parser import parse_sections
+
+def legacy_parse(result: str, output_structure: list) -> dict:
+    """이전 파싱 방식 (항목마다 마커 6종 find + 이후 항목 마커 재탐색 + 줄 단위 키워드 검색) - 비교 기준"""
+    parsed_results = {}
+    for i, structure in enumerate(output_structure, 1):
+        markers = [f"## {i}. {structure}", f"## {structure}", f"{i}. {structure}", f"### {structure}", f"**{structure}**", structure]
+        content = None
+        start_idx = -1
+        used_marker = None
+        for marker in markers:
+            start_idx = result.find(marker)
+            if start_idx != -1:
+                used_marker = marker
+                break
+        if start_idx != -1:
+            end_idx = len(result)
+            for j, next_structure in enumerate(output_structure[i:], i + 1):
+                next_markers = [f"## {j}. {next_structure}", f"## {next_structure}", f"{j}. {next_structure}",
+                                f"### {next_structure}", f"**{next_structure}**"]
+                for next_marker in next_markers:
+                    next_idx = result.find(next_marker, start_idx + len(used_marker))
+                    if next_idx != -1 and next_idx < end_idx:
+                        end_idx = next_idx
+                        break
+                if end_idx < len(result):
+                    break
+            content = result[start_idx + len(used_marker):end_idx].strip()
+            if len(content) < 10:
+                content = None
+        if not content:
+            keywords = structure.lower().split()
+            relevant_lines = [line for line in result.split('\n') if any(keyword in line.lower() for keyword in keywords)]
+            content = '\n'.join(relevant_lines[:10]) if relevant_lines else f"⚠️ '{structure}' 구조의 결과를 찾을 수 없습니다."
+        parsed_results[structure] = content
+    return parsed_results
+
+def load_recorded_cases(user_data_dir: str, blocks_by_id: dict) -> list:
+    """기록된 분석 결과 → [(이름, 결과, output_structure)] (output_structure가 있는 블록만)"""
+    ids_by_title = {block["title"]: step_id for step_id, block in blocks_by_id.items()}
+    cases = []
+    for path in sorted(glob.glob(os.path.join(user_data_dir, "*", "analysis_results", "*.json"))):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"⚠️ 기록 로드 실패 ({path}): {e}")
+            continue
+        entries = [(h.get("step_id") or ids_by_title.get(h.get("step")), h.get("result")) for h in data.get("cot_history", [])]
+        entries += [(h.get("id"), h.get("result")) for h in data.get("step_history", [])]
+        seen = set()
+        for step_id, result in entries:
+            structure = blocks_by_id.get(step_id, {}).get("content_dsl", {}).get("output_structure")
+            if not structure or not result or (step_id, result) in seen:
+                continue
+            seen.add((step_id, result))
+            cases.append((f"{os.path.basename(path)}:{step_id}", result, structure))
+    return cases
+
+def make_synthetic_case(block: dict, rng: random.Random) -> str:
+    """output_structure로 만든 가상 결과 - 목차 · 표 · 하위 제목 · 마커 형식 변형 · 누락 항목 포함"""
+    structure = block["content_dsl"]["output_structure"]
+    parts = [f"# {block['title']}", "", "## 개요", "이번 분석은 다음 항목으로 구성됩니다: " + ", ".join(structure), ""]
+    for i, name in enumerate(structure, 1):
+        if rng.random() < 0.05:
+            continue
+        marker = rng.choice([
+            f"## {i}. {name}", f"## {i}. {name}", f"## {i}. {name}", f"## {name}", f"### {i}. **{name}**",
+            f"**{name}**", f"## {i}) {name}", f"## {i}. {name}:", f"## {i}. {name.replace(' ', '')}"
+        ])
+        parts.append(marker)
+        for k in range(rng.randint(1, 3)):
+            parts.append(f"### {i}.{k + 1} 세부 검토")
+            parts.append("| 구분 | 내용 | 근거 |")
+            parts.append("|---|---|---|")
+            parts.extend(f"| 항목 {r} | {name} 관련 검토 결과 {r} | 자료 {r} |" for r in range(rng.randint(3, 8)))
+            parts.append(f"{name}에 대한 해설입니다. " * rng.randint(5, 20))
+        parts.append("")
+    return "\n".join(parts)
+
+def classify_diff(result: str, legacy: str, parsed: str) -> str:
+    """결과가 다른 항목의 원인 분류 (섹션 시작 · 끝 위치 비교)"""
+    if parsed.startswith("⚠️"):
+        return "현재 파서에서 찾지 못함"
+    if legacy.startswith("⚠️"):
+        return "이전 파서에서 찾지 못함"
+    legacy_start, parsed_start = result.find(legacy), result.find(parsed)
+    if legacy_start < 0 or parsed_start < 0:
+        return "키워드 대체 결과가 다름"
+    if legacy_start < parsed_start:
+        if not result[legacy_start:parsed_start].strip(" \t\n:*"):
+            return "이전 파서: 마커 뒤 콜론 · 굵은 글씨 기호가 내용에 남음"
+        return "이전 파서: 목차 · 본문의 항목명 언급에서 시작"
+    if legacy_start > parsed_start:
+        return "현재 파서: 이전 파서보다 앞에서 시작"
+    if len(legacy) > len(parsed):
+        return "이전 파서: 형식이 다른 다음 항목 마커를 넘어감"
+    return "현재 파서: 이전 파서보다 길게 끝남"
+
+def measure_setup(cases: list) -> float:
+    """블록 구조별 1회성 준비 비용 (구조별 비교 키 · 정규식 생성, 캐시를 비운 상태에서 측정)"""
+    section_parser._structure_keys.cache_clear()
+    started = time.perf_counter()
+    for structure in {tuple(structure) for _, _, structure in cases}:
+        section_parser._structure_keys(structure)
+    return time.perf_counter() - started
+
+def all_titles_found(result: str, structure: list) -> bool:
+    """모든 항목 제목이 마커에 있는 결과인지 (section_parser가 추가 색인 없이 끝나는 경우)"""
+    markers = section_parser.find_title_markers(result, structure)
+    return len(section_parser._match_titles(markers, structure)[0]) == len(structure)
+
+def time_parser(parse, cases: list) -> float:
+    """결과 목록을 한 번씩 파싱하는 시간 (결과당 초)"""
+    started = time.perf_counter()
+    for _, result, structure in cases:
+        parse(result, structure)
+    return (time.perf_counter() - started) / len(cases)
+
+def run_benchmark(cases: list, repeat: int):
+    """
+    두 파서의 파싱 시간과 항목별 일치 여부.
+    시간은 두 파서를 라운드마다 번갈아 측정 (GC 끔, 준비 비용 제외)하고 그룹별 최솟값 · 중앙값 사용 -
+    전체 / 모든 항목 제목이 마커에 있는 결과 / 항목이 빠졌거나 제목이 달라 전체 색인이 필요한 결과
+    """
+    diffs = []
+    sections = 0
+    for name, result, structure in cases:
+        legacy = legacy_parse(result, structure)
+        parsed = parse_sections(result, structure)
+        sections += len(structure)
+        diffs.extend(
+            (name, item, legacy[item], parsed[item], classify_diff(result, legacy[item], parsed[item]))
+            for item in structure if legacy[item] != parsed[item]
+        )
+
+    titled = [case for case in cases if all_titles_found(case[1], case[2])]
+    groups = {
+        "전체": cases,
+        "제목 일치": titled,
+        "누락 · 변형": [case for case in cases if not all_titles_found(case[1], case[2])]
+    }
+    timings = {}
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for group, group_cases in groups.items():
+            if not group_cases:
+                continue
+            rounds = {"legacy": [], "section_parser": []}
+            for _ in range(repeat):
+                rounds["legacy"].append(time_parser(legacy_parse, group_cases))
+                rounds["section_parser"].append(time_parser(parse_sections, group_cases))
+            timings[group] = (len(group_cases), {name: (min(values), statistics.median(values)) for name, values in rounds.items()})
+    finally:
+        if gc_enabled:
+            gc.enable()
+    return timings, diffs, sections
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="분석 결과 섹션 분리 회귀 벤치마크")
+    parser.add_argument("--user-data", default="user_data", help="기록된 분석 결과 디렉터리")
+    parser.add_argument("--synthetic", type=int, default=0, help="추가로 만들 가상 결과 수")
+    parser.add_argument("--repeat", type=int, default=5, help="측정 라운드 수 (라운드마다 모든 결과를 두 파서로 한 번씩 파싱)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--show-diffs", action="store_true", help="결과가 다른 항목 출력")
+    args = parser.parse_args(argv)
+
+    from dsl_to_prompt import get_prompt_registry
+    blocks_by_id = get_prompt_registry().blocks_by_id
+    cases = load_recorded_cases(args.user_data, blocks_by_id)
+    print(f"📂 기록된 결과 {len(cases)}개")
+    if args.synthetic:
+        rng = random.Random(args.seed)
+        blocks = [block for block in blocks_by_id.values() if block.get("content_dsl", {}).get("output_structure")]
+        for n in range(args.synthetic):
+            block = rng.choice(blocks)
+            cases.append((f"synthetic-{n}:{block['id']}", make_synthetic_case(block, rng), block["content_dsl"]["output_structure"]))
+        print(f"🧪 가상 결과 {args.synthetic}개 추가")
+    if not cases:
+        print("⚠️ 측정할 결과가 없습니다. --synthetic으로 가상 결과를 추가하세요.")
+        return 1
+
+    setup = measure_setup(cases)
+    timings, diffs, sections = run_benchmark(cases, args.repeat)
+    total_chars = sum(len(result) for _, result, _ in cases)
+    structure_sizes = Counter(len(structure) for _, _, structure in cases)
+    print(f"📏 결과 {len(cases)}개 · 항목 {sections}개 · {total_chars:,}자 × {args.repeat}라운드 "
+          f"(결과당 항목 수: {', '.join(f'{n}개 {c}건' for n, c in sorted(structure_sizes.items()))})")
+    print(f"🧰 section_parser 블록 구조별 1회성 준비: {setup * 1000:.1f}ms (프로세스당 한 번, 반복 측정에서 제외)")
+    for group, (count, measured) in timings.items():
+        (legacy_min, legacy_median), (parser_min, parser_median) = measured["legacy"], measured["section_parser"]
+        print(f"⏱️ {group} ({count}건) 결과당 최솟값/중앙값 - legacy {legacy_min * 1e6:.1f}/{legacy_median * 1e6:.1f}µs · "
+              f"section_parser {parser_min * 1e6:.1f}/{parser_median * 1e6:.1f}µs → {legacy_min / parser_min:.2f}배")
+    print(f"🔍 결과가 다른 항목: {len(diffs)} / {sections}")
+    for reason, count in Counter(diff[4] for diff in diffs).most_common():
+        print(f"   - {reason}: {count}")
+    if args.show_diffs:
+        for name, item, legacy, parsed, reason in diffs:
+            print(f"\n--- {name} · {item} ({reason})\n[이전] {legacy[:200]!r}\n[현재] {parsed[:200]!r}")
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,83 @@
+# step_lineage.py
+"""
+단계 입력 추적 · 변경 전파 (증분 재계산)
+- 단계 결과를 반영할 때 입력 해시(프롬프트 + 선행 단계 결과 해시)와 결과 해시를 기록 (세션 저장: step_lineage)
+- 선행 단계 결과가 바뀌면(재분석 · 피드백 반영) 그 결과를 사용한 의존 단계를 '오래됨'으로 판정 (전이적으로)
+- 오래된 단계만 다시 계산하고, 입력이 같은 단계는 입력 해시별 결과 캐시에서 LLM 호출 없이 재사용
+"""
+
+import hashlib
+from datetime import datetime
+
+STEP_RESULT_CACHE_SIZE = 40   # 입력 해시별 결과 캐시 최대 항목 수 (세션별, 저장하지 않음)
+
+def hash_text(text) -> str:
+    """문자열 해시 (짧은 sha1)"""
+    return hashlib.sha1((text or "").encode("utf-8")).hexdigest()[:16]
+
+def make_input_hash(prompt: str, upstream_hashes: dict) -> str:
+    """단계 입력 해시 - 프롬프트 전체와 선행 단계 결과 해시 (다이제스트로 축약된 선행 결과 변경도 반영)"""
+    parts = [hash_text(prompt)] + [f"{step_id}={result_hash}" for step_id, result_hash in sorted(upstream_hashes.items())]
+    return hash_text("\n".join(parts))
+
+def get_result_hashes(cot_history: list, titles_by_id: dict) -> dict:
+    """cot_history → 단계 ID별 결과 해시 (예전 기록은 제목으로 단계 ID 매칭)"""
+    ids_by_title = {title: step_id for step_id, title in titles_by_id.items()}
+    hashes = {}
+    for h in cot_history or []:
+        step_id = h.get("step_id") or ids_by_title.get(h.get("step"))
+        if step_id and h.get("result"):
+            hashes[step_id] = hash_text(h["result"])
+    return hashes
+
+def get_upstream_hashes(step_id: str, dag: dict, result_hashes: dict) -> dict:
+    """단계가 사용하는 선행 단계(의존 그래프 기준)의 현재 결과 해시"""
+    return {d: result_hashes[d] for d in dag.get(step_id, ()) if d in result_hashes}
+
+def make_lineage_record(input_hash: str, result: str, upstream_hashes: dict) -> dict:
+    """단계 실행 기록 - 입력 해시 · 결과 해시 · 실행 당시 선행 단계 결과 해시"""
+    return {
+        "input_hash": input_hash,
+        "result_hash": hash_text(result),
+        "upstream": dict(upstream_hashes),
+        "updated": datetime.now().isoformat()
+    }
+
+def snapshot_step_state(step_id: str, title: str, cot_history: list, step_history: list, lineage: dict) -> dict:
+    """
+    피드백 반영 전 단계 상태 (되돌리기용) - cot_history에 반영된 결과 원문 · 마지막 프롬프트 · 실행 기록.
+    되돌릴 때 같은 결과 · 입력 해시로 다시 반영하면 이 결과를 사용한 이후 단계가 다시 최신 상태가 됨
+    """
+    entry = next((h for h in reversed(cot_history or []) if h.get("step_id") == step_id or h.get("step") == title), {})
+    return {
+        "step_id": step_id,
+        "result": entry.get("result", ""),
+        "prompt": next((h.get("prompt", "") for h in reversed(step_history or []) if h.get("id") == step_id), ""),
+        "lineage": dict((lineage or {}).get(step_id) or {})
+    }
+
+def find_stale_steps(steps: list, dag: dict, lineage: dict, result_hashes: dict) -> list:
+    """
+    오래된 단계 ID 목록 (워크플로우 순서).
+    완료 단계 중 실행 당시와 선행 단계 결과가 달라졌거나 선행 단계가 오래된 단계 (실행 기록이 없는 예전 결과는 판정하지 않음)
+    """
+    stale = set()
+    changed = True
+    while changed:
+        changed = False
+        for step in steps:
+            record = lineage.get(step.id)
+            if step.id in stale or step.id not in result_hashes or not record:
+                continue
+            upstream = record.get("upstream", {})
+            if any(d in stale or (d in result_hashes and upstream.get(d) != result_hashes[d]) for d in dag.get(step.id, ())):
+                stale.add(step.id)
+                changed = True
+    return [step.id for step in steps if step.id in stale]
+
+def cache_step_result(cache: dict, input_hash: str, result: str):
+    """입력 해시별 결과 캐시에 저장 (오래된 항목부터 제거)"""
+    cache.pop(input_hash, None)
+    cache[input_hash] = result
+    while len(cache) > STEP_RESULT_CACHE_SIZE:
+        cache.pop(next(iter(cache)))
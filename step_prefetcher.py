@@ -0,0 +1,87 @@
+# step_prefetcher.py
+"""
+다음 분석 단계 사전 준비 (speculative prefetch)
+- 단계 N 실행이 시작되면 단계 N+1의 웹 검색 결과 · 블록 고정 프롬프트 섹션을 백그라운드에서 준비
+- 준비 결과는 단계 ID별로 보관하고, 입력(블록 정의 · 프로젝트 정보)이 바뀌면 무효화
+- 워커 스레드에서는 st.session_state에 접근하지 않음 (입력은 메인 스레드에서 캡처해 전달)
+"""
+
+import hashlib
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+from dsl_to_prompt import render_static_sections, get_web_search_for_block
+
+# 프로세스 전역 워커 풀 (세션별 Prefetcher가 공유)
+_prefetch_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="step-prefetch")
+
+def make_prefetch_key(dsl_block: dict, user_inputs: dict) -> str:
+    """준비 결과의 유효성 판단용 입력 해시"""
+    payload = json.dumps(
+        {"block": dsl_block, "user_inputs": user_inputs},
+        ensure_ascii=False,
+        sort_keys=True,
+        default=str
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def _prepare_step(dsl_block: dict, user_inputs: dict, include_web_search: bool) -> dict:
+    """워커 스레드에서 실행 - LLM 호출 직전까지 필요한 입력 준비"""
+    prepared = {"static_sections": render_static_sections(dsl_block), "web_search_results": None}
+    if include_web_search:
+        prepared["web_search_results"] = get_web_search_for_block(dsl_block.get("id", ""), user_inputs, quiet=True)
+    return prepared
+
+class StepPrefetcher:
+    """세션 단위 단계 사전 준비 캐시 (단계 ID → (입력 해시, Future))"""
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def prefetch(self, step_id: str, dsl_block: dict, user_inputs: dict, include_web_search: bool):
+        """단계 준비 작업 예약 - 같은 입력으로 이미 준비 중/완료면 재사용"""
+        if not step_id or not dsl_block:
+            return
+        key = make_prefetch_key(dsl_block, user_inputs)
+        with self._lock:
+            entry = self._entries.get(step_id)
+            if entry and entry[0] == key and (entry[2] or not include_web_search):
+                return
+            # 입력이 바뀌었으면 이전 준비 결과는 버림
+            future = _prefetch_executor.submit(_prepare_step, dict(dsl_block), dict(user_inputs), include_web_search)
+            self._entries[step_id] = (key, future, include_web_search)
+        print(f"🔮 다음 단계 사전 준비 시작: {step_id} (웹 검색: {'포함' if include_web_search else '제외'})")
+
+    def get(self, step_id: str, dsl_block: dict, user_inputs: dict, timeout: float = None):
+        """준비된 입력 반환 - 입력이 달라졌거나 timeout 내에 준비되지 않으면 None
+
+        web_search_results가 None이면 웹 검색은 준비되지 않은 것 (호출 측에서 직접 검색)
+        """
+        key = make_prefetch_key(dsl_block, user_inputs)
+        with self._lock:
+            entry = self._entries.get(step_id)
+        if not entry:
+            return None
+        if entry[0] != key:
+            self.invalidate(step_id)
+            return None
+        try:
+            prepared = entry[1].result(timeout=timeout)
+        except FutureTimeoutError:
+            return None
+        except Exception as e:
+            print(f"⚠️ 사전 준비 실패 ({step_id}): {e}")
+            self.invalidate(step_id)
+            return None
+        print(f"🔮 사전 준비 결과 사용: {step_id}")
+        return prepared
+
+    def invalidate(self, step_id: str = None):
+        """단계 ID의 준비 결과 제거 (None이면 전체)"""
+        with self._lock:
+            if step_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(step_id, None)
@@ -0,0 +1,181 @@
+# step_scheduler.py
+"""
+워크플로우 단계 DAG 스케줄러
+- 선행 단계가 모두 끝난 단계를 동시에 실행 (전역 동시 실행 수 · 분당 시작 수 제한)
+- 입력 준비(prepare)와 결과 반영(commit)은 호출 스레드(Streamlit 스크립트 스레드)에서, LLM 호출(execute)만 워커 스레드에서 수행
+- 결과는 완료 순서와 무관하게 워크플로우 순서대로 반영 (cot_history 순서가 실행마다 동일)
+- 실패한 단계는 대기 후 재시도 (그동안 독립 단계는 계속 실행), 재시도 후에도 실패하면 의존 단계는 건너뜀
+- 완료 즉시 on_result로 체크포인트를 남기고, 재시작 시 체크포인트 결과(preloaded_results)는 다시 실행하지 않음
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from agent_executor import is_valid_result
+
+SCHEDULER_MAX_CONCURRENCY = 3      # 동시에 실행하는 단계 수
+SCHEDULER_MAX_STARTS_PER_MIN = 12  # 분당 시작하는 단계 수 (API 요청 속도 제한)
+SCHEDULER_POLL_SEC = 1.0           # 진행 상황 갱신 주기
+SCHEDULER_MAX_ATTEMPTS = 3         # 단계별 최대 실행 횟수 (첫 실행 포함)
+SCHEDULER_RETRY_BACKOFF_SEC = 10   # 재시도 대기 시간 (시도 횟수에 비례)
+
+# 단계 상태
+PENDING, RUNNING, DONE, FAILED, SKIPPED = "pending", "running", "done", "failed", "skipped"
+
+class DagScheduler:
+    """
+    단계 의존 그래프 실행기.
+    prepare(step, results) → payload   : 호출 스레드, results는 완료된 단계 ID → 결과 (반영 전 결과 포함)
+    execute(step, payload) → result    : 워커 스레드 (Streamlit 호출 금지)
+    commit(step, payload, result)      : 호출 스레드, 워크플로우 순서대로 호출
+    on_update(scheduler)               : 호출 스레드, 상태가 바뀔 때마다 호출 (진행 표시용)
+    on_result(step, payload, result)   : 호출 스레드, 단계 완료 즉시 호출 (체크포인트 저장용)
+    completed_ids                      : 이미 반영된 단계 (실행 · 반영 안 함)
+    preloaded_results                  : 완료됐지만 아직 반영되지 않은 결과 (단계 ID → (payload, 결과), 실행 없이 반영)
+    """
+
+    def __init__(self, steps, dag, prepare, execute, commit, on_update=None, completed_ids=(),
+                 max_concurrency=SCHEDULER_MAX_CONCURRENCY, max_starts_per_min=SCHEDULER_MAX_STARTS_PER_MIN,
+                 max_attempts=SCHEDULER_MAX_ATTEMPTS, on_result=None, preloaded_results=None):
+        self.steps = list(steps)
+        self.dag = dag
+        self.prepare = prepare
+        self.execute = execute
+        self.commit = commit
+        self.on_update = on_update
+        self.on_result = on_result
+        self.max_attempts = max(1, max_attempts)
+        self.max_concurrency = max(1, max_concurrency)
+        self.min_start_interval = 60.0 / max_starts_per_min if max_starts_per_min else 0.0
+        self.states = {step.id: (DONE if step.id in completed_ids else PENDING) for step in self.steps}
+        self.errors = {}
+        self.attempts = {}
+        self.started_at = {}
+        self.finished_at = {}
+        self._results = {}
+        self._payloads = {}
+        self._retry_at = {}
+        for step_id, (payload, result) in (preloaded_results or {}).items():
+            if self.states.get(step_id) == PENDING:
+                self.states[step_id] = DONE
+                self._payloads[step_id] = payload
+                self._results[step_id] = result
+        self._committed = {step.id for step in self.steps if step.id in completed_ids}
+        self._last_start = 0.0
+
+    def _is_unblocked(self, step_id):
+        """대기 중이고 선행 단계가 모두 완료된 단계 (재시도 대기 포함)"""
+        return self.states[step_id] == PENDING and all(self.states.get(d) == DONE for d in self.dag.get(step_id, ()))
+
+    def _is_ready(self, step_id):
+        return self._is_unblocked(step_id) and time.time() >= self._retry_at.get(step_id, 0.0)
+
+    def _skip_blocked(self):
+        """실패 · 건너뜀 단계에 의존하는 대기 단계를 건너뜀 처리 (전이적으로)"""
+        changed = True
+        while changed:
+            changed = False
+            for step_id, state in self.states.items():
+                if state == PENDING and any(self.states.get(d) in (FAILED, SKIPPED) for d in self.dag.get(step_id, ())):
+                    self.states[step_id] = SKIPPED
+                    self.errors[step_id] = "선행 단계 실패로 건너뜀"
+                    changed = True
+
+    def _commit_in_order(self):
+        """워크플로우 순서상 앞선 단계가 모두 끝난 완료 단계만 순서대로 반영"""
+        for step in self.steps:
+            state = self.states[step.id]
+            if state in (PENDING, RUNNING):
+                break
+            if state == DONE and step.id not in self._committed:
+                self.commit(step, self._payloads.get(step.id), self._results[step.id])
+                self._committed.add(step.id)
+
+    def _notify(self):
+        if self.on_update:
+            self.on_update(self)
+
+    def run(self) -> dict:
+        """모든 단계가 끝날 때까지 실행 - 단계 ID → 최종 상태 반환"""
+        steps_by_id = {step.id: step for step in self.steps}
+        running = {}
+        started = time.time()
+
+        with ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="step-dag") as executor:
+            while True:
+                # 준비된 단계 시작 (동시 실행 수 · 시작 간격 제한)
+                for step in self.steps:
+                    if len(running) >= self.max_concurrency:
+                        break
+                    if not self._is_ready(step.id):
+                        continue
+                    if time.time() - self._last_start < self.min_start_interval:
+                        break
+                    try:
+                        payload = self.prepare(step, dict(self._results))
+                    except Exception as e:
+                        self.states[step.id] = FAILED
+                        self.errors[step.id] = f"입력 준비 실패: {e}"
+                        continue
+                    self._payloads[step.id] = payload
+                    self.attempts[step.id] = self.attempts.get(step.id, 0) + 1
+                    self.states[step.id] = RUNNING
+                    self.started_at[step.id] = time.time()
+                    self._last_start = time.time()
+                    running[executor.submit(self.execute, step, payload)] = step.id
+                    print(f"🚀 단계 시작: {step.id} (동시 실행 {len(running)}/{self.max_concurrency})")
+
+                self._skip_blocked()
+                self._commit_in_order()
+                self._notify()
+
+                if not running:
+                    waiting = [step_id for step_id in self.states if self._is_unblocked(step_id)]
+                    if not waiting:
+                        break
+                    # 시작 간격 제한 · 재시도 대기
+                    next_start = max(
+                        self._last_start + self.min_start_interval,
+                        min(self._retry_at.get(step_id, 0.0) for step_id in waiting)
+                    )
+                    time.sleep(min(SCHEDULER_POLL_SEC, max(0.0, next_start - time.time())))
+                    continue
+
+                done, _ = wait(list(running), timeout=SCHEDULER_POLL_SEC, return_when=FIRST_COMPLETED)
+                for future in done:
+                    step_id = running.pop(future)
+                    self.finished_at[step_id] = time.time()
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        result = f"❌ {e}"
+                    elapsed = self.finished_at[step_id] - self.started_at[step_id]
+                    if is_valid_result(result):
+                        self.states[step_id] = DONE
+                        self._results[step_id] = result
+                        self.errors.pop(step_id, None)
+                        print(f"✅ 단계 종료: {step_id} ({elapsed:.1f}s)")
+                        if self.on_result:
+                            self.on_result(steps_by_id[step_id], self._payloads.get(step_id), result)
+                        continue
+                    self.errors[step_id] = (result or "빈 결과")[:200]
+                    if self.attempts[step_id] < self.max_attempts:
+                        # 재시도 예약 - 그동안 독립 단계는 계속 실행
+                        self.states[step_id] = PENDING
+                        self._retry_at[step_id] = time.time() + SCHEDULER_RETRY_BACKOFF_SEC * self.attempts[step_id]
+                        print(f"🔁 단계 실패, 재시도 예약: {step_id} ({self.attempts[step_id]}/{self.max_attempts}회, {elapsed:.1f}s)")
+                    else:
+                        self.states[step_id] = FAILED
+                        print(f"❌ 단계 실패: {step_id} ({self.attempts[step_id]}회 시도)")
+
+        # 남은 대기 단계 (순환 의존성 등) 정리
+        for step_id, state in self.states.items():
+            if state == PENDING:
+                self.states[step_id] = SKIPPED
+                self.errors.setdefault(step_id, "실행 가능한 순서가 없음 (순환 의존성)")
+        self._commit_in_order()
+        self._notify()
+
+        summary = {state: sum(1 for s in self.states.values() if s == state) for state in (DONE, FAILED, SKIPPED)}
+        print(f"🏁 DAG 실행 종료 ({time.time() - started:.1f}s): 완료 {summary[DONE]} · 실패 {summary[FAILED]} · 건너뜀 {summary[SKIPPED]}")
+        return dict(self.states)
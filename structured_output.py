@@ -0,0 +1,227 @@
+# structured_output.py
+"""
+블록 구조화 출력 (JSON, 도구 사용)
+- 블록의 output_structure · presentation.section_templates(필수 컬럼)로 제출 도구의 JSON 스키마 생성
+- 도구 호출을 강제해 결과를 JSON으로 받고 검증 (표는 columns · rows 배열)
+- 검증된 결과는 기존 형식('## 번호. 구조명' + 마크다운 표)으로 렌더링해 cot_history · 보고서 · 다이제스트에 그대로 사용
+- 항목별 내용 · 요약 · 인사이트는 파싱 없이 구조화 결과에서 바로 사용, 검증에 실패하면 마크다운 출력으로 한 번 다시 요청
+"""
+
+import json
+
+STRUCTURED_TOOL_NAME = "submit_analysis"
+STRUCTURED_OUTPUT_HEADROOM = 1.3   # JSON 키 · 이스케이프로 늘어나는 출력 토큰 여유분
+
+def is_structured_block(dsl_block: dict) -> bool:
+    """구조화 출력을 쓸 수 있는 블록 (output_structure가 있는 블록)"""
+    return bool((dsl_block or {}).get("content_dsl", {}).get("output_structure"))
+
+def get_required_columns(dsl_block: dict) -> dict:
+    """항목별 필수 표 컬럼 (presentation.section_templates 기준, output_structure 항목만)"""
+    content_dsl = dsl_block.get("content_dsl", {})
+    output_structure = content_dsl.get("output_structure", [])
+    templates = content_dsl.get("presentation", {}).get("section_templates", {})
+    return {
+        section: template.get("required_columns", [])
+        for section, template in templates.items()
+        if section in output_structure and template.get("required_columns")
+    }
+
+def build_output_schema(dsl_block: dict) -> dict:
+    """제출 도구 입력 스키마 - 요약 · 인사이트 · output_structure 순서의 항목 배열 (항목별 해설 + 표 배열)"""
+    content_dsl = dsl_block.get("content_dsl", {})
+    output_structure = content_dsl.get("output_structure", [])
+    required_columns = get_required_columns(dsl_block)
+    table_columns = content_dsl.get("templates", {}).get("tables", {}) if isinstance(content_dsl.get("templates"), dict) else {}
+
+    table_hints = [f"- {section}: {', '.join(columns)}" for section, columns in required_columns.items()]
+    table_hints += [f"- {name}: {', '.join(columns)}" for name, columns in table_columns.items() if isinstance(columns, list)]
+    table_schema = {
+        "type": "object",
+        "properties": {
+            "title": {"type": "string", "description": "표 제목"},
+            "columns": {"type": "array", "items": {"type": "string"}, "minItems": 1, "description": "컬럼명"},
+            "rows": {
+                "type": "array",
+                "items": {"type": "array", "items": {"type": "string"}},
+                "description": "행 목록 (각 행은 columns와 같은 개수의 셀)"
+            }
+        },
+        "required": ["columns", "rows"]
+    }
+    return {
+        "type": "object",
+        "properties": {
+            "summary": {"type": "string", "description": "핵심 요약 (2-4문장)"},
+            "insight": {"type": "string", "description": "주요 인사이트 · 전략적 제언 (2-4문장)"},
+            "sections": {
+                "type": "array",
+                "minItems": len(output_structure),
+                "maxItems": len(output_structure),
+                "description": "출력 구조 순서대로 한 항목씩: " + " / ".join(f"{i}. {s}" for i, s in enumerate(output_structure, 1)),
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "title": {"type": "string", "enum": list(output_structure)},
+                        "content": {"type": "string", "description": "항목 해설 (마크다운, 표는 tables에 작성)"},
+                        "tables": {
+                            "type": "array",
+                            "items": table_schema,
+                            "description": "항목의 표 (필수 컬럼이 지정된 항목은 해당 컬럼 포함)\n" + "\n".join(table_hints)
+                        }
+                    },
+                    "required": ["title", "content"]
+                }
+            }
+        },
+        "required": ["summary", "insight", "sections"]
+    }
+
+def get_output_tool(dsl_block: dict) -> dict:
+    """결과 제출 도구 정의 (Anthropic tools 형식)"""
+    return {
+        "name": STRUCTURED_TOOL_NAME,
+        "description": f"{dsl_block.get('title', '분석')} 결과를 출력 구조에 맞춰 제출합니다.",
+        "input_schema": build_output_schema(dsl_block)
+    }
+
+def structured_output_instruction(dsl_block: dict) -> str:
+    """프롬프트 끝에 붙이는 제출 방식 안내 (마크다운 출력 구조 지시를 대체)"""
+    lines = [
+        "\n# 🧩 결과 제출 방식",
+        f"위 출력 구조의 마크다운 형식 대신 `{STRUCTURED_TOOL_NAME}` 도구로 결과를 제출하세요.",
+        "- sections: 출력 구조의 모든 항목을 순서대로 (title은 구조명 그대로)",
+        "- content: 항목 해설 (마크다운), 표는 content에 쓰지 말고 tables에 columns · rows 배열로 작성",
+        "- summary · insight: 블록 전체의 핵심 요약과 전략적 제언",
+    ]
+    required_columns = get_required_columns(dsl_block)
+    if required_columns:
+        lines.append("- 필수 표 컬럼:")
+        lines.extend(f"  - {section}: {', '.join(columns)}" for section, columns in required_columns.items())
+    return "\n".join(lines) + "\n"
+
+def parse_structured_result(text: str):
+    """도구 입력 JSON 문자열 → dict (형식이 맞지 않으면 None)"""
+    try:
+        data = json.loads(text)
+    except (TypeError, ValueError):
+        return None
+    return data if isinstance(data, dict) else None
+
+def validate_structured_output(data: dict, dsl_block: dict):
+    """
+    구조화 결과 검증 및 정리 (항목을 output_structure 순서로 정렬, 행 셀 수를 컬럼 수에 맞춤).
+    반환: (정리된 결과, 오류 목록, 경고 목록) - 오류가 있으면 사용하지 않음
+    """
+    output_structure = dsl_block.get("content_dsl", {}).get("output_structure", [])
+    required_columns = get_required_columns(dsl_block)
+    errors, warnings = [], []
+
+    sections = data.get("sections")
+    if not isinstance(sections, list):
+        return data, ["sections 배열이 없습니다."], warnings
+    by_title = {}
+    for section in sections:
+        if not isinstance(section, dict) or not isinstance(section.get("content"), str):
+            errors.append("항목 형식이 올바르지 않습니다.")
+            continue
+        if section.get("title") not in output_structure:
+            warnings.append(f"출력 구조에 없는 항목 제외: {section.get('title')}")
+            continue
+        by_title.setdefault(section["title"], section)
+    missing = [title for title in output_structure if title not in by_title]
+    if missing:
+        errors.append(f"누락된 항목: {', '.join(missing)}")
+
+    normalized = []
+    for title in output_structure:
+        section = by_title.get(title)
+        if section is None:
+            continue
+        tables = []
+        for table in section.get("tables") or []:
+            columns = [str(c) for c in (table.get("columns") or [])] if isinstance(table, dict) else []
+            if not columns:
+                warnings.append(f"{title}: 컬럼이 없는 표 제외")
+                continue
+            rows = [
+                [str(cell) for cell in row[:len(columns)]] + [""] * (len(columns) - len(row))
+                for row in table.get("rows") or [] if isinstance(row, list)
+            ]
+            tables.append({"title": table.get("title", ""), "columns": columns, "rows": rows})
+        for column in required_columns.get(title, []):
+            if not any(column in table["columns"] for table in tables):
+                warnings.append(f"{title}: 필수 컬럼 누락 ({column})")
+        normalized.append({"title": title, "content": section["content"].strip(), "tables": tables})
+
+    return {
+        "summary": str(data.get("summary", "")).strip(),
+        "insight": str(data.get("insight", "")).strip(),
+        "sections": normalized
+    }, errors, warnings
+
+def render_table_markdown(table: dict) -> str:
+    """표 배열 → 마크다운 표"""
+    def cell(value):
+        return str(value).replace("|", "/").replace("\n", " ")
+    lines = []
+    if table.get("title"):
+        lines.append(f"**{table['title']}**\n")
+    lines.append("| " + " | ".join(cell(c) for c in table["columns"]) + " |")
+    lines.append("|" + "---|" * len(table["columns"]))
+    lines.extend("| " + " | ".join(cell(c) for c in row) + " |" for row in table["rows"])
+    return "\n".join(lines)
+
+def render_section_markdown(section: dict) -> str:
+    """항목 내용 (해설 + 표) 마크다운"""
+    parts = [section.get("content", "")]
+    parts.extend(render_table_markdown(table) for table in section.get("tables", []))
+    return "\n\n".join(part for part in parts if part)
+
+def render_structured_markdown(data: dict) -> str:
+    """구조화 결과 → 기존 마크다운 결과 형식 ('## 번호. 구조명' 항목, 요약 · 인사이트 포함)"""
+    parts = []
+    if data.get("summary"):
+        parts.append(f"**핵심 요약**: {data['summary']}")
+    for i, section in enumerate(data.get("sections", []), 1):
+        parts.append(f"## {i}. {section['title']}\n\n{render_section_markdown(section)}")
+    if data.get("insight"):
+        parts.append(f"**전략적 제언**: {data['insight']}")
+    return "\n\n".join(parts)
+
+def get_structured_sections(data: dict, output_structure: list) -> dict:
+    """구조화 결과의 항목별 내용 (파싱 없이, 없는 항목은 안내 문구)"""
+    by_title = {section["title"]: section for section in (data or {}).get("sections", [])}
+    return {
+        title: render_section_markdown(by_title[title]) if title in by_title else f"⚠️ '{title}' 구조의 결과를 찾을 수 없습니다."
+        for title in output_structure
+    }
+
+def execute_structured(prompt: str, dsl_block: dict, block_id: str = None, preferred_model: str = None,
+                       max_retries: int = 3, hedge: bool = False, output_budget: int = None):
+    """
+    구조화 출력으로 블록 실행 - (마크다운 결과, 구조화 결과) 반환.
+    응답이 JSON이 아니거나 검증에 실패하면 (None, None) - 호출 측에서 마크다운 출력으로 다시 요청
+    """
+    from init_dspy import execute_with_routing
+
+    text = execute_with_routing(
+        prompt + structured_output_instruction(dsl_block),
+        block_id=block_id,
+        preferred_model=preferred_model,
+        max_retries=max_retries,
+        hedge=hedge,
+        output_budget=int(output_budget * STRUCTURED_OUTPUT_HEADROOM) if output_budget else None,
+        tool=get_output_tool(dsl_block)
+    )
+    data = parse_structured_result(text)
+    if data is None:
+        print(f"⚠️ 구조화 출력 실패 ({block_id}): {(text or '빈 응답')[:120]}")
+        return None, None
+    data, errors, warnings = validate_structured_output(data, dsl_block)
+    if errors:
+        print(f"⚠️ 구조화 출력 검증 실패 ({block_id}): {'; '.join(errors)}")
+        return None, None
+    if warnings:
+        print(f"ℹ️ 구조화 출력 경고 ({block_id}): {'; '.join(warnings[:5])}")
+    return render_structured_markdown(data), data
@@ -40,7 +40,13 @@ class RateLimitHandler:
     def handle_overloaded_error(error, attempt: int) -> bool:
         """과부하 오류 처리"""
         if "overloaded_error" in str(error) or "Overloaded" in str(error):
-            wait_time = min(30 * (3 ** attempt) + random.uniform(10, 60), MAX_WAIT_TIME)
+            # 과부하 이력을 현재 DSPy LM 모델의 서킷 브레이커에 기록 (모델을 알 수 없으면 기록하지 않음)
+            # 대기 시간은 서킷 쿨다운 이내로 제한
+            from init_dspy import model_router, get_active_model, CIRCUIT_COOLDOWN_SEC
+            model = get_active_model()
+            if model:
+                model_router.record(model, 0.0, "overloaded")
+            wait_time = min(30 * (3 ** attempt) + random.uniform(10, 60), MAX_WAIT_TIME, CIRCUIT_COOLDOWN_SEC)
             st.warning(f"⚠️ API 서버 과부하. {wait_time:.0f}초 후 재시도합니다... (시도 {attempt + 1}/{MAX_RETRIES})")
             
             progress_bar = st.progress(0)
@@ -353,8 +359,17 @@ class AdvancedPDFAnalyzer:
             }
         }
 
-# === 전역 분석기 인스턴스 ===
-analyzer = AdvancedPDFAnalyzer()
+# === 전역 분석기 인스턴스 (첫 사용 시 생성) ===
+_analyzer = None
+
+def get_analyzer() -> AdvancedPDFAnalyzer:
+    """전역 분석기 반환 - DSPy 기본 LM 설정과 함께 지연 생성"""
+    global _analyzer
+    if _analyzer is None:
+        from init_dspy import ensure_default_lm
+        ensure_default_lm()
+        _analyzer = AdvancedPDFAnalyzer()
+    return _analyzer
 
 # === 기존 함수들과의 호환성을 위한 래퍼 함수들 ===
 
@@ -362,7 +377,7 @@ def summarize_pdf(pdf_text: str) -> str:
     """PDF 텍스트를 요약하는 함수 (기존 호환성) - Rate Limiting 처리 포함"""
     for attempt in range(MAX_RETRIES):
         try:
-            result = analyzer.comprehensive_analysis(pdf_text)
+            result = get_analyzer().comprehensive_analysis(pdf_text)
             return result["summary"]
         except Exception as e:
             # Rate Limit 오류 처리
@@ -388,7 +403,7 @@ def extract_site_analysis_fields(pdf_text: str) -> dict:
     """PDF에서 대지 및 법규 관련 필드를 추출하는 함수 (기존 호환성) - Rate Limiting 처리 포함"""
     for attempt in range(MAX_RETRIES):
         try:
-            result = analyzer.comprehensive_analysis(pdf_text)
+            result = get_analyzer().comprehensive_analysis(pdf_text)
             return result["site_fields"]
         except Exception as e:
             # Rate Limit 오류 처리
@@ -401,25 +416,25 @@ def extract_site_analysis_fields(pdf_text: str) -> dict:
             
             # 마지막 시도에서 실패한 경우
             if attempt == MAX_RETRIES - 1:
-                return analyzer.default_values
+                return get_analyzer().default_values
             
             # 일반 오류의 경우 짧은 대기 후 재시도
             wait_time = 5 + random.uniform(0, 5)
             st.warning(f"⚠️ 필드 추출 중 오류 발생. {wait_time:.1f}초 후 재시도합니다... (시도 {attempt + 1}/{MAX_RETRIES})")
             time.sleep(wait_time)
     
-    return analyzer.default_values
+    return get_analyzer().default_values
 
 # === 새로운 고급 함수들 ===
 
 def analyze_pdf_comprehensive(pdf_text: str) -> Dict[str, Any]:
     """종합적인 PDF 분석 (새로운 고급 기능)"""
-    return analyzer.comprehensive_analysis(pdf_text)
+    return get_analyzer().comprehensive_analysis(pdf_text)
 
 def analyze_pdf_in_chunks(pdf_text: str, chunk_size: int = 4000, max_chunks: int = 20) -> Dict[str, Any]:
     """큰 PDF를 청크로 나누어 분석 - 개선된 버전"""
     if len(pdf_text) <= chunk_size:
-        return analyzer.comprehensive_analysis(pdf_text)
+        return get_analyzer().comprehensive_analysis(pdf_text)
     
     # 대용량 PDF 경고
     if len(pdf_text) > 100000:  # 10만자 이상
@@ -475,7 +490,7 @@ def analyze_pdf_in_chunks(pdf_text: str, chunk_size: int = 4000, max_chunks: int
                 st.info(f"청크 {i+1} 건너뛰기 (너무 짧음)")
                 continue
                 
-            result = analyzer.comprehensive_analysis(chunk)
+            result = get_analyzer().comprehensive_analysis(chunk)
             chunk_results.append(result)
             successful_chunks += 1
             
@@ -502,7 +517,7 @@ def analyze_pdf_in_chunks(pdf_text: str, chunk_size: int = 4000, max_chunks: int
     if not chunk_results:
         return {
             "summary": "모든 청크 분석에 실패했습니다.",
-            "site_fields": analyzer.default_values,
+            "site_fields": get_analyzer().default_values,
             "pdf_type": {"pdf_type": "unknown", "document_category": "알 수 없음"},
             "quality": {
                 "completeness": 0,
@@ -524,13 +539,13 @@ def analyze_pdf_in_chunks(pdf_text: str, chunk_size: int = 4000, max_chunks: int
     
     # 사이트 필드 통합 (가장 완전한 정보 우선)
     combined_site_fields = {}
-    for field in analyzer.required_fields:
+    for field in get_analyzer().required_fields:
         for result in chunk_results:
-            if result["site_fields"].get(field) and result["site_fields"][field] != analyzer.default_values[field]:
+            if result["site_fields"].get(field) and result["site_fields"][field] != get_analyzer().default_values[field]:
                 combined_site_fields[field] = result["site_fields"][field]
                 break
         if field not in combined_site_fields:
-            combined_site_fields[field] = analyzer.default_values[field]
+            combined_site_fields[field] = get_analyzer().default_values[field]
     
     # 품질 평가 통합
     avg_quality_score = sum(r["quality"]["quality_score"] for r in chunk_results) / len(chunk_results)
@@ -539,8 +554,8 @@ def analyze_pdf_in_chunks(pdf_text: str, chunk_size: int = 4000, max_chunks: int
     combined_quality = {
         "completeness": round(avg_completeness, 1),
         "quality_score": round(avg_quality_score, 1),
-        "grade": analyzer.assign_grade(avg_quality_score),
-        "confidence_level": analyzer.assign_confidence_level(avg_quality_score)
+        "grade": get_analyzer().assign_grade(avg_quality_score),
+        "confidence_level": get_analyzer().assign_confidence_level(avg_quality_score)
     }
     
     # PDF 타입 결정 (가장 많이 나타난 타입 선택)
@@ -568,7 +583,7 @@ def analyze_pdf_in_chunks(pdf_text: str, chunk_size: int = 4000, max_chunks: int
 
 def get_pdf_quality_report(pdf_text: str) -> Dict[str, Any]:
     """PDF 품질 보고서 생성"""
-    result = analyzer.comprehensive_analysis(pdf_text)
+    result = get_analyzer().comprehensive_analysis(pdf_text)
     return {
         "quality_assessment": result["quality"],
         "pdf_type": result["pdf_type"],
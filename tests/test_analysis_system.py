@@ -0,0 +1,75 @@
+# tests/test_analysis_system.py
+"""analysis_system - 최종 워크플로우 순서 (의존 그래프의 위상 순서, 워크플로우에 저장된 ID 배열)"""
+
+import pytest
+
+from analysis_system import AnalysisWorkflow, ObjectiveType, PurposeType, build_step_dag, get_analysis_system
+
+SYSTEM = get_analysis_system()
+WORKFLOW_CASES = [
+    (purpose, objective)
+    for purpose in PurposeType
+    for objective in SYSTEM.get_available_objectives(purpose)
+]
+
+def assert_topological(steps):
+    """모든 단계의 선행 단계가 앞에 있음 (순환 의존성 없음)"""
+    dag = build_step_dag(steps)
+    positions = {step.id: index for index, step in enumerate(steps)}
+    for step in steps:
+        late = [d for d in dag[step.id] if positions[d] >= positions[step.id]]
+        assert not late, f"{step.id} 앞에 와야 하는 선행 단계: {late}"
+
+@pytest.mark.parametrize("purpose, objective", WORKFLOW_CASES, ids=lambda value: value.name)
+def test_final_workflow_has_no_dependency_cycles(purpose, objective):
+    workflow = SYSTEM.suggest_analysis_steps(purpose, [objective])
+    assert_topological(SYSTEM.get_final_workflow(workflow))
+
+def test_final_workflow_with_all_objectives_and_optional_steps():
+    for purpose in PurposeType:
+        workflow = SYSTEM.suggest_analysis_steps(purpose, SYSTEM.get_available_objectives(purpose))
+        present = {step.id for step in workflow.steps}
+        for step in SYSTEM.optional_steps:
+            if step.id not in present:
+                SYSTEM.add_optional_step(workflow, step.id)
+        assert_topological(SYSTEM.get_final_workflow(workflow))
+
+def test_next_executable_step_follows_dependencies():
+    workflow = SYSTEM.suggest_analysis_steps(PurposeType.NEIGHBORHOOD_FACILITY, SYSTEM.get_available_objectives(PurposeType.NEIGHBORHOOD_FACILITY))
+    steps = SYSTEM.get_final_workflow(workflow)
+    done = []
+    while True:
+        step = SYSTEM.get_next_executable_step(workflow, done)
+        if step is None:
+            break
+        assert all(d in done for d in build_step_dag(steps)[step.id])
+        done.append(step.id)
+    assert done == [step.id for step in steps]
+
+def test_step_order_is_cached_until_steps_change(monkeypatch):
+    workflow = SYSTEM.suggest_analysis_steps(PurposeType.NEIGHBORHOOD_FACILITY, [ObjectiveType.PLANNING_CONCEPT_DESIGN])
+    step_order = workflow.get_step_order()
+    assert step_order == tuple(step.id for step in SYSTEM.get_final_workflow(workflow))
+
+    calls = []
+    monkeypatch.setattr(AnalysisWorkflow, "refresh_order", lambda self: calls.append(self))
+    SYSTEM.get_current_step(workflow, 0)
+    SYSTEM.get_step_progress(workflow, [])
+    SYSTEM.can_execute_step(workflow, step_order[-1], [])
+    SYSTEM.get_next_executable_step(workflow, [])
+    assert calls == []
+
+def test_step_order_follows_added_and_removed_steps():
+    workflow = SYSTEM.suggest_analysis_steps(PurposeType.NEIGHBORHOOD_FACILITY, [ObjectiveType.PLANNING_CONCEPT_DESIGN])
+    removable = next(step.id for step in workflow.steps if not step.is_required)
+    SYSTEM.remove_step(workflow, removable)
+    assert removable not in workflow.get_step_order()
+
+    optional = next(step for step in SYSTEM.optional_steps if step.id not in workflow.get_step_order())
+    SYSTEM.add_optional_step(workflow, optional.id)
+    assert optional.id in workflow.get_step_order()
+    assert_topological(SYSTEM.get_final_workflow(workflow))
+
+    workflow.steps = [step for step in workflow.steps if step.is_required]
+    assert workflow.get_step_order() == tuple(step.id for step in SYSTEM.get_final_workflow(workflow))
+    assert set(workflow.get_step_order()) == {step.id for step in workflow.steps + workflow.custom_steps}
@@ -0,0 +1,63 @@
+# tests/test_output_budget.py
+"""init_dspy - 블록별 출력 예산은 응답 usage의 실제 출력 토큰으로 기록"""
+
+from types import SimpleNamespace
+
+import pytest
+
+import init_dspy
+from init_dspy import OutputBudgetTracker, execute_with_routing
+
+def make_response(text, output_tokens, stop_reason="end_turn"):
+    return SimpleNamespace(
+        content=[SimpleNamespace(type="text", text=text)],
+        stop_reason=stop_reason,
+        usage=SimpleNamespace(output_tokens=output_tokens),
+    )
+
+def make_tool_response(payload, output_tokens):
+    return SimpleNamespace(
+        content=[SimpleNamespace(type="tool_use", name="emit", input=payload)],
+        stop_reason="tool_use",
+        usage=SimpleNamespace(output_tokens=output_tokens),
+    )
+
+@pytest.fixture
+def tracker(tmp_path, monkeypatch):
+    tracker = OutputBudgetTracker(path=str(tmp_path / "history.json"))
+    monkeypatch.setattr(init_dspy, "output_budget_tracker", tracker)
+    return tracker
+
+def use_responses(monkeypatch, responses):
+    calls = []
+    def create(**kwargs):
+        calls.append(kwargs)
+        return responses.pop(0)
+    client = SimpleNamespace(messages=SimpleNamespace(create=create))
+    monkeypatch.setattr(init_dspy, "get_anthropic_client", lambda: client)
+    return calls
+
+def test_records_usage_output_tokens_not_length_estimate(tracker, monkeypatch):
+    use_responses(monkeypatch, [make_response("가" * 100, 137)])
+
+    assert execute_with_routing("프롬프트", block_id="summary") == "가" * 100
+    assert tracker._load()["summary"] == [137]
+
+def test_records_output_tokens_summed_across_continuations(tracker, monkeypatch):
+    calls = use_responses(monkeypatch, [
+        make_response("앞부분", 400, stop_reason="max_tokens"),
+        make_response(" 중간", 400, stop_reason="max_tokens"),
+        make_response(" 끝", 25),
+    ])
+
+    assert execute_with_routing("프롬프트", block_id="summary") == "앞부분 중간 끝"
+    assert len(calls) == 3
+    assert tracker._load()["summary"] == [825]
+
+def test_structured_output_records_under_structured_key(tracker, monkeypatch):
+    use_responses(monkeypatch, [make_tool_response({"요약": "내용"}, 42)])
+    tool = {"name": "emit", "input_schema": {"type": "object"}}
+
+    execute_with_routing("프롬프트", block_id="summary", tool=tool)
+
+    assert tracker._load() == {"summary:structured": [42]}
@@ -0,0 +1,72 @@
+# tests/test_prompt_budget.py
+"""prompt_budget - 섹션 단위 토큰 예산 맞춤"""
+
+from analysis_context import RollingContext
+from init_dspy import estimate_tokens
+from prompt_budget import TRUNCATION_MARKER, fit_prompt_sections
+
+def total_tokens(sections):
+    return sum(estimate_tokens(text) for _, text in sections)
+
+def test_within_budget_returns_sections_unchanged_without_empty_ones():
+    sections = [("principles", "핵심 원칙"), ("pdf", ""), ("web_search", "검색 결과")]
+    assert fit_prompt_sections(sections, token_budget=1000) == [("principles", "핵심 원칙"), ("web_search", "검색 결과")]
+
+def test_trims_lowest_priority_section_first():
+    principles = "원칙 " * 200
+    web_search = "\n".join(f"검색 결과 {i} " + "내용 " * 20 for i in range(50))
+    pdf = "PDF 요약 " * 100
+    sections = [("principles", principles), ("pdf", pdf), ("web_search", web_search)]
+    budget = estimate_tokens(principles) + estimate_tokens(pdf) + 200
+
+    fitted = dict(fit_prompt_sections(sections, token_budget=budget))
+
+    assert fitted["principles"] == principles
+    assert fitted["pdf"] == pdf
+    assert fitted["web_search"].endswith(TRUNCATION_MARKER + "\n")
+    assert total_tokens(fitted.items()) <= budget
+
+def test_sections_keep_their_minimum_then_next_rule_applies():
+    pdf = "\n".join("PDF 본문 " * 30 for _ in range(40))
+    header = "## 이전 단계 결과\n"
+    entries = [f"**단계 {i}**\n" + "결과 " * 150 for i in range(12)]
+    previous = header + "\n\n".join(entries) + "\n"
+    sections = [("pdf", pdf), ("previous_results", previous)]
+
+    fitted = dict(fit_prompt_sections(sections, token_budget=2200, entries={"previous_results": (header, entries)}))
+
+    # pdf는 최소 유지 토큰(400)까지만 줄고, 나머지는 오래된 이전 결과 항목 제거로 맞춤
+    assert 300 < estimate_tokens(fitted["pdf"]) <= 400
+    assert fitted["previous_results"].startswith("## 이전 단계 결과\n")
+    assert "**단계 0**" not in fitted["previous_results"]
+    assert "**단계 11**" in fitted["previous_results"]
+    assert total_tokens(fitted.items()) <= 2200
+
+def test_required_sections_are_kept_even_over_budget():
+    sections = [("principles", "원칙 " * 500)]
+    assert fit_prompt_sections(sections, token_budget=10) == sections
+
+def test_drop_oldest_keeps_bold_paragraphs_inside_entries():
+    # 구조화 결과는 본문이 '**핵심 요약**:'으로 시작 - 항목 경계가 아니므로 단계 A 일부만 남으면 안 됨
+    history = [
+        {"step_id": "a", "step": "단계A", "result": "**핵심 요약**: A요약\n\n**주요 인사이트**: " + "A내용 " * 1500},
+        {"step_id": "b", "step": "단계B", "result": "**핵심 요약**: B요약\n\n" + "B내용 " * 1500},
+    ]
+    previous = RollingContext().build(history, full_text_keys={"a", "b"})
+    assert len(previous.entries) == 2
+
+    header = "# 📚 이전 분석 결과\n"
+    sections = [("previous_results", f"{header}{previous}\n")]
+    budget = estimate_tokens(previous.entries[1]) + 100
+
+    fitted = dict(fit_prompt_sections(sections, token_budget=budget, entries={"previous_results": (header, previous.entries)}))
+
+    assert fitted["previous_results"] == f"{header}{previous.entries[1]}\n"
+    assert "A요약" not in fitted["previous_results"] and "A내용" not in fitted["previous_results"]
+
+def test_drop_oldest_without_entries_truncates_instead_of_guessing_boundaries():
+    previous = "# 📚 이전 분석 결과\n" + "\n\n".join(f"**단계 {i}**: " + "결과 " * 200 for i in range(10)) + "\n"
+    fitted = dict(fit_prompt_sections([("previous_results", previous)], token_budget=1600))
+
+    assert fitted["previous_results"].startswith("# 📚 이전 분석 결과\n**단계 0**")
+    assert fitted["previous_results"].endswith(TRUNCATION_MARKER + "\n")
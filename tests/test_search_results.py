@@ -0,0 +1,43 @@
+# tests/test_search_results.py
+"""search_results - 웹 검색 결과 중복 제거 · 예산 내 압축"""
+
+from search_results import compress_results, dedupe_results, normalize_url
+
+def item(link, title, snippet, **extra):
+    return {"link": link, "title": title, "snippet": snippet, **extra}
+
+def test_normalize_url_ignores_scheme_www_query_and_trailing_slash():
+    assert normalize_url("https://www.Example.com/path/?q=1#top") == "example.com/path"
+    assert normalize_url("http://example.com/path") == "example.com/path"
+
+def test_dedupe_drops_same_url_variants_and_keeps_first():
+    items = [
+        item("https://www.example.com/a?utm=1", "첫 결과", "서울시 용적률 완화 기준 안내"),
+        item("http://example.com/a/", "두 번째 결과", "전혀 다른 내용의 스니펫입니다"),
+        item("https://other.com/b", "다른 결과", "공공기여 비율에 따른 인센티브 산정"),
+    ]
+    assert [entry["title"] for entry in dedupe_results(items)] == ["첫 결과", "다른 결과"]
+
+def test_dedupe_drops_near_duplicate_snippets_from_other_sites():
+    snippet = "서울시는 역세권 청년주택 용적률을 최대 700%까지 완화하는 기준을 발표했다"
+    items = [
+        item("https://news-a.com/1", "역세권 청년주택 용적률 완화", snippet),
+        item("https://news-b.com/2", "역세권 청년주택 용적률 완화", snippet + "."),
+        item("https://news-c.com/3", "지구단위계획 변경 절차", "주민 열람 공고 후 도시건축공동위원회 심의를 거친다"),
+    ]
+    assert [entry["link"] for entry in dedupe_results(items)] == ["https://news-a.com/1", "https://news-c.com/3"]
+
+def test_dedupe_keeps_items_without_link_unless_near_duplicate():
+    items = [item("", "제목 A", "첫 번째 스니펫 내용"), item("", "제목 B", "완전히 다른 두 번째 설명")]
+    assert dedupe_results(items) == items
+
+def test_compress_orders_by_relevance_and_respects_budget():
+    items = [
+        item("https://a.com", "주차장 설치 기준", "부설주차장 설치 대수 산정", query="q1", position=0),
+        item("https://b.com", "용적률 완화 인센티브", "공공기여에 따른 용적률 완화 인센티브", query="q2", position=1),
+    ]
+    selected = compress_results(items, goal="용적률 완화 인센티브 검토")
+    assert [query for query, _ in selected] == ["q2", "q1"]
+    assert selected[0][1].startswith("📄 용적률 완화 인센티브\n")
+
+    assert compress_results(items, goal="용적률", token_budget=1) == []
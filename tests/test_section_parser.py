@@ -0,0 +1,68 @@
+# tests/test_section_parser.py
+"""section_parser - 결과 마크다운을 output_structure 항목별 섹션으로 분리"""
+
+from section_parser import parse_sections
+
+STRUCTURE = ["대지 현황 분석", "법규 검토", "개발 전략"]
+
+def test_splits_heading_sections_in_structure_order():
+    result = (
+        "# 분석 결과\n"
+        "## 1. 대지 현황 분석\n대지는 남향 완경사지이며 주변 도로 폭은 12m입니다.\n"
+        "## 2. 법규 검토\n제2종 일반주거지역으로 용적률 250% 이하입니다.\n"
+        "## 3. 개발 전략\n저층부 가로 활성화와 중정형 배치를 제안합니다.\n"
+    )
+    sections = parse_sections(result, STRUCTURE)
+
+    assert sections == {
+        "대지 현황 분석": "대지는 남향 완경사지이며 주변 도로 폭은 12m입니다.",
+        "법규 검토": "제2종 일반주거지역으로 용적률 250% 이하입니다.",
+        "개발 전략": "저층부 가로 활성화와 중정형 배치를 제안합니다.",
+    }
+
+def test_mixed_markers_strip_bold_and_colon():
+    result = (
+        "\n**1. 대지 현황 분석**: 대지는 남향 완경사지이며 접도 조건이 양호합니다.\n"
+        "2) 법규 검토\n제2종 일반주거지역으로 용적률 250% 이하입니다.\n"
+        "### 3. **개발 전략**\n저층부 가로 활성화와 중정형 배치를 제안합니다.\n"
+    )
+    sections = parse_sections(result, STRUCTURE)
+
+    assert sections["대지 현황 분석"] == "대지는 남향 완경사지이며 접도 조건이 양호합니다."
+    assert sections["법규 검토"] == "제2종 일반주거지역으로 용적률 250% 이하입니다."
+    assert sections["개발 전략"] == "저층부 가로 활성화와 중정형 배치를 제안합니다."
+
+def test_table_of_contents_mentions_are_not_section_starts():
+    result = (
+        "목차: 대지 현황 분석, 법규 검토, 개발 전략\n"
+        "## 대지 현황 분석\n대지는 남향 완경사지이며 주변 도로 폭은 12m입니다.\n"
+        "## 법규 검토\n제2종 일반주거지역으로 용적률 250% 이하입니다.\n"
+        "## 개발 전략\n저층부 가로 활성화와 중정형 배치를 제안합니다.\n"
+    )
+    sections = parse_sections(result, STRUCTURE)
+
+    assert sections["대지 현황 분석"] == "대지는 남향 완경사지이며 주변 도로 폭은 12m입니다."
+
+def test_reworded_title_is_matched_between_known_sections():
+    result = (
+        "## 1. 대지 현황 분석\n대지는 남향 완경사지이며 주변 도로 폭은 12m입니다.\n"
+        "## 2. 관련 법규 검토 결과\n제2종 일반주거지역으로 용적률 250% 이하입니다.\n"
+        "## 3. 개발 전략\n저층부 가로 활성화와 중정형 배치를 제안합니다.\n"
+    )
+    sections = parse_sections(result, STRUCTURE)
+
+    assert sections["법규 검토"] == "제2종 일반주거지역으로 용적률 250% 이하입니다."
+    assert sections["개발 전략"] == "저층부 가로 활성화와 중정형 배치를 제안합니다."
+
+def test_missing_section_falls_back_to_keyword_lines_or_notice():
+    result = (
+        "## 대지 현황 분석\n대지는 남향 완경사지이며 주변 도로 폭은 12m입니다.\n"
+        "법규 검토 결과 건폐율 60% 이하가 적용됩니다.\n"
+    )
+    sections = parse_sections(result, STRUCTURE)
+
+    assert sections["법규 검토"] == "법규 검토 결과 건폐율 60% 이하가 적용됩니다."
+    assert sections["개발 전략"] == "⚠️ '개발 전략' 구조의 결과를 찾을 수 없습니다."
+
+def test_empty_result():
+    assert parse_sections(None, ["개발 전략"]) == {"개발 전략": "⚠️ '개발 전략' 구조의 결과를 찾을 수 없습니다."}
@@ -0,0 +1,111 @@
+# tests/test_step_lineage.py
+"""step_lineage - 입력 해시 · 오래된 단계 판정 · 결과 캐시"""
+
+from types import SimpleNamespace
+
+from step_lineage import (
+    STEP_RESULT_CACHE_SIZE, cache_step_result, find_stale_steps, get_result_hashes,
+    get_upstream_hashes, hash_text, make_input_hash, make_lineage_record, snapshot_step_state
+)
+
+STEPS = [SimpleNamespace(id=step_id) for step_id in ("a", "b", "c", "d")]
+DAG = {"b": ["a"], "c": ["b"], "d": []}
+
+def run_all(results):
+    """모든 단계를 현재 결과로 실행한 것처럼 실행 기록 생성"""
+    hashes = {step_id: hash_text(result) for step_id, result in results.items()}
+    lineage = {}
+    for step_id, result in results.items():
+        upstream = get_upstream_hashes(step_id, DAG, hashes)
+        lineage[step_id] = make_lineage_record(make_input_hash(f"prompt {step_id}", upstream), result, upstream)
+    return lineage, hashes
+
+def test_input_hash_depends_on_prompt_and_upstream_not_order():
+    assert make_input_hash("p", {"a": "1", "b": "2"}) == make_input_hash("p", {"b": "2", "a": "1"})
+    assert make_input_hash("p", {"a": "1"}) != make_input_hash("p", {"a": "2"})
+    assert make_input_hash("p", {}) != make_input_hash("q", {})
+
+def test_result_hashes_match_old_entries_by_title():
+    history = [
+        {"step_id": "a", "result": "A"},
+        {"step": "B 단계", "result": "B"},
+        {"step_id": "c", "result": ""},
+    ]
+    assert get_result_hashes(history, {"b": "B 단계"}) == {"a": hash_text("A"), "b": hash_text("B")}
+
+def test_nothing_is_stale_when_results_unchanged():
+    lineage, hashes = run_all({"a": "A", "b": "B", "c": "C", "d": "D"})
+    assert find_stale_steps(STEPS, DAG, lineage, hashes) == []
+
+def test_changed_upstream_marks_dependents_stale_transitively():
+    lineage, hashes = run_all({"a": "A", "b": "B", "c": "C", "d": "D"})
+    hashes["a"] = hash_text("A (피드백 반영)")
+
+    # c의 직접 선행 단계 b는 결과가 같지만 b 자체가 오래됐으므로 c도 오래됨
+    assert find_stale_steps(STEPS, DAG, lineage, hashes) == ["b", "c"]
+
+def test_reverted_result_makes_dependents_current_again():
+    lineage, hashes = run_all({"a": "A", "b": "B", "c": "C"})
+    hashes["a"] = hash_text("A2")
+    assert find_stale_steps(STEPS, DAG, lineage, hashes) == ["b", "c"]
+    hashes["a"] = hash_text("A")
+    assert find_stale_steps(STEPS, DAG, lineage, hashes) == []
+
+def test_steps_without_record_or_result_are_not_judged():
+    lineage, hashes = run_all({"a": "A", "b": "B", "c": "C"})
+    del lineage["b"]          # 실행 기록이 없는 예전 결과
+    hashes["a"] = hash_text("A2")
+    assert find_stale_steps(STEPS, DAG, lineage, hashes) == []
+
+    lineage, hashes = run_all({"a": "A", "b": "B", "c": "C"})
+    del hashes["c"]           # 결과가 없는 단계
+    hashes["a"] = hash_text("A2")
+    assert find_stale_steps(STEPS, DAG, lineage, hashes) == ["b"]
+
+def test_result_cache_evicts_oldest_and_refreshes_reinserted_entries():
+    cache = {}
+    for i in range(STEP_RESULT_CACHE_SIZE):
+        cache_step_result(cache, f"h{i}", f"r{i}")
+    cache_step_result(cache, "h0", "r0 again")
+    cache_step_result(cache, "new", "r new")
+
+    assert len(cache) == STEP_RESULT_CACHE_SIZE
+    assert "h1" not in cache
+    assert cache["h0"] == "r0 again"
+    assert list(cache)[-2:] == ["h0", "new"]
+
+def test_feedback_revert_restores_original_hash_and_dependents():
+    # a → b 실행 후 a에 피드백 반영, 다시 원본으로 되돌리기 (commit_step_result와 같은 순서로 기록)
+    results = {"a": "## 대지 분석\n원본 결과 A", "b": "B"}
+    lineage, hashes = run_all(results)
+    cache = {}
+    cot_history = [{"step_id": step_id, "step": step_id.upper(), "result": result} for step_id, result in results.items()]
+    step_history = [{"id": "a", "prompt": "prompt a", "result": results["a"]}]
+
+    snapshot = snapshot_step_state("a", "A", cot_history, step_history, lineage)
+    assert snapshot["result"] == results["a"]
+    assert snapshot["prompt"] == "prompt a"
+
+    # 피드백 반영 - a 결과가 바뀌어 b가 오래됨
+    upstream = get_upstream_hashes("a", DAG, hashes)
+    lineage["a"] = make_lineage_record(make_input_hash("feedback prompt", upstream), "A (피드백)", upstream)
+    hashes["a"] = hash_text("A (피드백)")
+    assert find_stale_steps(STEPS, DAG, lineage, hashes) == ["b"]
+
+    # 되돌리기 - 원본 결과 · 입력 해시로 다시 반영
+    record = snapshot["lineage"]
+    lineage["a"] = make_lineage_record(record["input_hash"], snapshot["result"], record["upstream"])
+    hashes["a"] = hash_text(snapshot["result"])
+    cache_step_result(cache, record["input_hash"], snapshot["result"])
+
+    assert lineage["a"]["result_hash"] == lineage["b"]["upstream"]["a"] == hash_text(results["a"])
+    assert lineage["a"]["input_hash"] == make_input_hash("prompt a", {})
+    assert cache[make_input_hash("prompt a", {})] == results["a"]
+    assert find_stale_steps(STEPS, DAG, lineage, hashes) == []
+
+def test_snapshot_uses_latest_entries_and_tolerates_missing_history():
+    cot_history = [{"step": "A", "result": "예전 기록"}, {"step_id": "a", "result": "최신 결과"}]
+    step_history = [{"id": "a", "prompt": "첫 프롬프트"}, {"id": "a", "prompt": "재분석 프롬프트"}]
+    snapshot = snapshot_step_state("a", "A", cot_history, step_history, {})
+    assert (snapshot["result"], snapshot["prompt"], snapshot["lineage"]) == ("최신 결과", "재분석 프롬프트", {})
+    assert snapshot_step_state("x", "X", None, None, None)["result"] == ""
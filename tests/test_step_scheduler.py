@@ -0,0 +1,139 @@
+# tests/test_step_scheduler.py
+"""DagScheduler - 의존 순서 실행 · 재시도 · 실패 전파 · 완료/체크포인트 결과 처리 (Streamlit · 네트워크 없음)"""
+
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+import step_scheduler
+from step_scheduler import DagScheduler, DONE, FAILED, SKIPPED
+
+@pytest.fixture(autouse=True)
+def fast_scheduler(monkeypatch):
+    """재시도 대기 · 폴링 주기를 줄여 테스트를 빠르게 실행"""
+    monkeypatch.setattr(step_scheduler, "SCHEDULER_RETRY_BACKOFF_SEC", 0)
+    monkeypatch.setattr(step_scheduler, "SCHEDULER_POLL_SEC", 0.01)
+
+class Recorder:
+    """prepare · execute · commit 호출 기록"""
+
+    def __init__(self, outcomes=None):
+        self.outcomes = outcomes or {}  # 단계 ID → 시도별 결과 목록 (예외 객체면 발생)
+        self.prepared = {}
+        self.executed = []
+        self.committed = []
+        self._lock = threading.Lock()
+
+    def prepare(self, step, results):
+        self.prepared[step.id] = dict(results)
+        return {"prompt": f"prompt {step.id}"}
+
+    def execute(self, step, payload):
+        with self._lock:
+            attempt = self.executed.count(step.id)
+            self.executed.append(step.id)
+        outcomes = self.outcomes.get(step.id)
+        outcome = outcomes[min(attempt, len(outcomes) - 1)] if outcomes else f"result {step.id}"
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    def commit(self, step, payload, result):
+        self.committed.append((step.id, payload, result))
+
+def make_scheduler(step_ids, dag, recorder, **kwargs):
+    steps = [SimpleNamespace(id=step_id) for step_id in step_ids]
+    kwargs.setdefault("max_starts_per_min", 0)
+    return DagScheduler(steps, dag, recorder.prepare, recorder.execute, recorder.commit, **kwargs)
+
+def test_runs_dependencies_first_and_commits_in_workflow_order():
+    recorder = Recorder()
+    scheduler = make_scheduler(["a", "b", "c"], {"b": ["a"]}, recorder)
+
+    states = scheduler.run()
+
+    assert states == {"a": DONE, "b": DONE, "c": DONE}
+    assert recorder.prepared["b"]["a"] == "result a"
+    assert [step_id for step_id, _, _ in recorder.committed] == ["a", "b", "c"]
+
+def test_failed_step_is_retried_until_success():
+    recorder = Recorder({"a": ["❌ 일시 오류", "⚠️ 빈 응답", "result a"]})
+    scheduler = make_scheduler(["a", "b"], {"b": ["a"]}, recorder, max_attempts=3)
+
+    states = scheduler.run()
+
+    assert states == {"a": DONE, "b": DONE}
+    assert scheduler.attempts["a"] == 3
+    assert "a" not in scheduler.errors
+    assert recorder.committed[0] == ("a", {"prompt": "prompt a"}, "result a")
+
+def test_failure_after_retries_skips_dependents_transitively():
+    recorder = Recorder({"a": ["❌ 실패"]})
+    scheduler = make_scheduler(["a", "b", "c", "d"], {"b": ["a"], "c": ["b"]}, recorder, max_attempts=2)
+
+    states = scheduler.run()
+
+    assert states == {"a": FAILED, "b": SKIPPED, "c": SKIPPED, "d": DONE}
+    assert recorder.executed.count("a") == 2
+    assert "b" not in recorder.executed and "c" not in recorder.executed
+    assert scheduler.errors["a"] == "❌ 실패"
+    assert scheduler.errors["c"] == "선행 단계 실패로 건너뜀"
+    assert [step_id for step_id, _, _ in recorder.committed] == ["d"]
+
+def test_execute_exception_counts_as_failure():
+    recorder = Recorder({"a": [RuntimeError("boom")]})
+    scheduler = make_scheduler(["a"], {}, recorder, max_attempts=1)
+
+    assert scheduler.run() == {"a": FAILED}
+    assert scheduler.errors["a"] == "❌ boom"
+
+def test_prepare_failure_marks_step_failed_without_execution():
+    recorder = Recorder()
+
+    def prepare(step, results):
+        raise ValueError("입력 없음")
+
+    steps = [SimpleNamespace(id="a"), SimpleNamespace(id="b")]
+    scheduler = DagScheduler(steps, {"b": ["a"]}, prepare, recorder.execute, recorder.commit, max_starts_per_min=0)
+
+    assert scheduler.run() == {"a": FAILED, "b": SKIPPED}
+    assert recorder.executed == []
+    assert scheduler.errors["a"] == "입력 준비 실패: 입력 없음"
+
+def test_completed_and_preloaded_steps_are_not_executed():
+    recorder = Recorder()
+    checkpoint_payload = {"prompt": "checkpoint b"}
+    results_seen = []
+    scheduler = make_scheduler(
+        ["a", "b", "c"], {"b": ["a"], "c": ["b"]}, recorder,
+        completed_ids={"a"},
+        preloaded_results={"b": (checkpoint_payload, "cached b")},
+        on_result=lambda step, payload, result: results_seen.append(step.id)
+    )
+
+    states = scheduler.run()
+
+    assert states == {"a": DONE, "b": DONE, "c": DONE}
+    assert recorder.executed == ["c"]
+    assert recorder.prepared["c"] == {"b": "cached b"}
+    # 이미 반영된 단계는 다시 반영하지 않고, 체크포인트 결과는 저장된 payload로 반영
+    assert recorder.committed == [("b", checkpoint_payload, "cached b"), ("c", {"prompt": "prompt c"}, "result c")]
+    assert results_seen == ["c"]
+
+def test_preloaded_result_for_completed_step_is_ignored():
+    recorder = Recorder()
+    scheduler = make_scheduler(["a"], {}, recorder, completed_ids={"a"}, preloaded_results={"a": ({}, "stale a")})
+
+    assert scheduler.run() == {"a": DONE}
+    assert recorder.executed == []
+    assert recorder.committed == []
+
+def test_cyclic_dependencies_are_skipped():
+    recorder = Recorder()
+    scheduler = make_scheduler(["a", "b", "c"], {"a": ["b"], "b": ["a"]}, recorder)
+
+    states = scheduler.run()
+
+    assert states == {"a": SKIPPED, "b": SKIPPED, "c": DONE}
+    assert scheduler.errors["a"] == "실행 가능한 순서가 없음 (순환 의존성)"
@@ -0,0 +1,76 @@
+# tests/test_structured_output.py
+"""structured_output - 구조화 결과 파싱 · 검증 · 정리"""
+
+from structured_output import parse_structured_result, render_structured_markdown, validate_structured_output
+
+BLOCK = {
+    "title": "법규 분석",
+    "content_dsl": {
+        "output_structure": ["용도지역", "건축 규모"],
+        "presentation": {
+            "section_templates": {
+                "건축 규모": {"required_columns": ["항목", "기준"]},
+                "기타": {"required_columns": ["무시"]},
+            }
+        },
+    },
+}
+
+def section(title, content="내용", tables=None):
+    return {"title": title, "content": content, "tables": tables or []}
+
+def test_parse_structured_result_accepts_only_json_objects():
+    assert parse_structured_result('{"summary": "요약"}') == {"summary": "요약"}
+    assert parse_structured_result("[1, 2]") is None
+    assert parse_structured_result("❌ 오류") is None
+    assert parse_structured_result(None) is None
+
+def test_valid_output_is_reordered_and_rows_fit_columns():
+    data = {
+        "summary": " 요약 ",
+        "insight": "제언",
+        "sections": [
+            section("건축 규모", "  규모 검토  ", [{"title": "규모", "columns": ["항목", "기준"], "rows": [["용적률"], ["건폐율", "60%", "초과 셀"]]}]),
+            section("용도지역"),
+        ],
+    }
+    cleaned, errors, warnings = validate_structured_output(data, BLOCK)
+
+    assert errors == [] and warnings == []
+    assert cleaned["summary"] == "요약"
+    assert [s["title"] for s in cleaned["sections"]] == ["용도지역", "건축 규모"]
+    assert cleaned["sections"][1]["content"] == "규모 검토"
+    assert cleaned["sections"][1]["tables"][0]["rows"] == [["용적률", ""], ["건폐율", "60%"]]
+
+def test_missing_section_and_bad_items_are_errors():
+    data = {"sections": [section("용도지역"), {"title": "건축 규모", "content": 3}]}
+    _, errors, _ = validate_structured_output(data, BLOCK)
+    assert errors == ["항목 형식이 올바르지 않습니다.", "누락된 항목: 건축 규모"]
+
+    _, errors, _ = validate_structured_output({"sections": "없음"}, BLOCK)
+    assert errors == ["sections 배열이 없습니다."]
+
+def test_unknown_sections_and_missing_columns_are_warnings():
+    data = {
+        "sections": [
+            section("용도지역"),
+            section("건축 규모", tables=[{"columns": ["항목"], "rows": [["높이"]]}, {"columns": [], "rows": []}]),
+            section("추가 항목"),
+        ]
+    }
+    cleaned, errors, warnings = validate_structured_output(data, BLOCK)
+
+    assert errors == []
+    assert warnings == ["출력 구조에 없는 항목 제외: 추가 항목", "건축 규모: 컬럼이 없는 표 제외", "건축 규모: 필수 컬럼 누락 (기준)"]
+    assert len(cleaned["sections"][1]["tables"]) == 1
+
+def test_rendered_markdown_contains_sections_and_tables():
+    data = {"summary": "요약", "insight": "제언", "sections": [
+        section("용도지역", "제2종 일반주거지역"),
+        section("건축 규모", "규모", [{"title": "규모", "columns": ["항목", "기준"], "rows": [["건폐율", "60%"]]}]),
+    ]}
+    cleaned, _, _ = validate_structured_output(data, BLOCK)
+    markdown = render_structured_markdown(cleaned)
+
+    assert "용도지역" in markdown and "제2종 일반주거지역" in markdown
+    assert "| 항목 | 기준 |" in markdown and "| 건폐율 | 60% |" in markdown
@@ -3,6 +3,7 @@ import streamlit as st
 import json
 from datetime import datetime
 import os
+from analysis_system import STEP_DONE, RESULT_STATUSES
 
 def init_user_state():
     """사용자 상태 초기화 - 로그인된 사용자의 기존 데이터 로드"""
@@ -68,6 +69,20 @@ def init_user_state():
         if "web_search_settings" not in st.session_state:
             st.session_state.web_search_settings = saved_data.get("web_search_settings", {})
         
+        # 전체 자동 실행 체크포인트 (완료됐지만 cot_history에 아직 반영되지 않은 결과) 및 진행 상태
+        if "run_checkpoints" not in st.session_state:
+            st.session_state.run_checkpoints = saved_data.get("run_checkpoints", {})
+        
+        if "run_all_status" not in st.session_state:
+            st.session_state.run_all_status = saved_data.get("run_all_status", {})
+        
+        if "step_lineage" not in st.session_state:
+            st.session_state.step_lineage = saved_data.get("step_lineage", {})
+        
+        # 완료 색인 (예전 세션 데이터에 없으면 cot_history로 재구성)
+        if "step_completion" not in st.session_state and "step_completion" in saved_data:
+            st.session_state.step_completion = saved_data["step_completion"]
+        
         if "uploaded_pdf" not in st.session_state:
             st.session_state.uploaded_pdf = saved_data.get("uploaded_pdf", None)
         
@@ -87,8 +102,8 @@ def init_user_state():
             st.session_state.selected_objectives = saved_data.get("selected_objectives", [])
         
         if "analysis_system" not in st.session_state:
-            from analysis_system import AnalysisSystem
-            st.session_state.analysis_system = AnalysisSystem()
+            from analysis_system import get_analysis_system
+            st.session_state.analysis_system = get_analysis_system()
         
         # 마지막 로드 시간 기록
         st.session_state.last_data_load = datetime.now().isoformat()
@@ -136,6 +151,12 @@ def init_user_state():
             st.session_state.current_step_outputs = {}
         if "web_search_settings" not in st.session_state:
             st.session_state.web_search_settings = {}
+        if "run_checkpoints" not in st.session_state:
+            st.session_state.run_checkpoints = {}
+        if "run_all_status" not in st.session_state:
+            st.session_state.run_all_status = {}
+        if "step_lineage" not in st.session_state:
+            st.session_state.step_lineage = {}
         if "uploaded_pdf" not in st.session_state:
             st.session_state.uploaded_pdf = None
         if "site_fields" not in st.session_state:
@@ -149,8 +170,8 @@ def init_user_state():
         if "selected_objectives" not in st.session_state:
             st.session_state.selected_objectives = []
         if "analysis_system" not in st.session_state:
-            from analysis_system import AnalysisSystem
-            st.session_state.analysis_system = AnalysisSystem()
+            from analysis_system import get_analysis_system
+            st.session_state.analysis_system = get_analysis_system()
 
 def convert_analysis_step_to_dict(step):
     """AnalysisStep 객체를 딕셔너리로 변환"""
@@ -195,7 +216,7 @@ def convert_dict_to_analysis_step(step_dict):
             is_optional=step_dict.get('is_optional', False),
             order=step_dict.get('order', 0),
             category=step_dict.get('category', ''),
-            dependencies=step_dict.get('dependencies', [])
+            dependencies=step_dict.get('dependencies') or None  # 비어 있으면 선언된 선행 단계 사용
         )
     return step_dict
 
@@ -233,6 +254,10 @@ def save_user_data():
         "current_step_display_data": st.session_state.get("current_step_display_data", None),
         "current_step_outputs": st.session_state.get("current_step_outputs", {}),
         "web_search_settings": st.session_state.get("web_search_settings", {}),
+        "run_checkpoints": st.session_state.get("run_checkpoints", {}),
+        "run_all_status": st.session_state.get("run_all_status", {}),
+        "step_lineage": st.session_state.get("step_lineage", {}),
+        "step_completion": get_completion_index(),
         "uploaded_pdf": st.session_state.get("uploaded_pdf", None),
         "site_fields": st.session_state.get("site_fields", {}),
         "pdf_analysis_result": st.session_state.get("pdf_analysis_result", {}),
@@ -261,8 +286,59 @@ def get_user_inputs():
         "project_goal": st.session_state.get("project_goal", "")
     }
 
-def save_step_result(step_id: str, result: str):
+def build_completion_index(cot_history: list) -> dict:
+    """cot_history로 완료 색인 재구성 (색인이 없는 예전 세션 · 불러온 프로젝트용, 예전 기록은 제목으로 단계 ID 매칭)"""
+    from dsl_to_prompt import get_prompt_registry
+    from step_lineage import hash_text
+    
+    ids_by_title = {block["title"]: step_id for step_id, block in get_prompt_registry().blocks_by_id.items()}
+    index = {}
+    for h in cot_history or []:
+        step_id = h.get("step_id") or ids_by_title.get(h.get("step"))
+        if step_id and h.get("result"):
+            index[step_id] = {
+                "status": STEP_DONE,
+                "title": h.get("step", ""),
+                "result_hash": hash_text(h["result"]),
+                "updated": h.get("timestamp", "")
+            }
+    return index
+
+def get_completion_index() -> dict:
+    """
+    단계 ID → {status, title, result_hash, updated} - 단계 완료 여부의 기준 (진행 상황 · 실행 가능 여부 판단)
+    결과 저장 시 갱신되며, 없으면 cot_history로 한 번 재구성
+    """
+    if "step_completion" not in st.session_state:
+        st.session_state.step_completion = build_completion_index(st.session_state.get("cot_history", []))
+    return st.session_state.step_completion
+
+def is_step_completed(step_id: str) -> bool:
+    """단계 결과가 있는지 (오래된 결과 포함)"""
+    return get_completion_index().get(step_id, {}).get("status") in RESULT_STATUSES
+
+def get_completed_step_ids() -> set:
+    """결과가 있는 단계 ID 집합"""
+    return {step_id for step_id, entry in get_completion_index().items() if entry.get("status") in RESULT_STATUSES}
+
+def set_step_status(step_id: str, status: str):
+    """완료 색인의 단계 상태 변경 (결과 해시 · 제목은 유지)"""
+    entry = get_completion_index().setdefault(step_id, {"title": "", "result_hash": ""})
+    entry["status"] = status
+    entry["updated"] = datetime.now().isoformat()
+
+def save_step_result(step_id: str, result: str, title: str = ""):
+    from step_lineage import hash_text
+    
     st.session_state.step_results[step_id] = result
+    # 완료 색인 갱신
+    index = get_completion_index()
+    index[step_id] = {
+        "status": STEP_DONE,
+        "title": title or index.get(step_id, {}).get("title", ""),
+        "result_hash": hash_text(result),
+        "updated": datetime.now().isoformat()
+    }
     # 자동 저장
     save_user_data()
 
@@ -321,6 +397,7 @@ def save_current_project(project_name):
         "pdf_summary": st.session_state.get("pdf_summary", ""),
         "site_fields": st.session_state.get("site_fields", {}),
         "pdf_analysis_result": st.session_state.get("pdf_analysis_result", {}),
+        "step_lineage": st.session_state.get("step_lineage", {}),
         "created_at": datetime.now().isoformat()
     }
     
@@ -352,6 +429,11 @@ def load_project(project_name):
             st.session_state.pdf_summary = project_data.get("pdf_summary", "")
             st.session_state.site_fields = project_data.get("site_fields", {})
             st.session_state.pdf_analysis_result = project_data.get("pdf_analysis_result", {})
+            st.session_state.step_lineage = project_data.get("step_lineage", {})
+            st.session_state.step_completion = build_completion_index(st.session_state.cot_history)
+            # 이전 프로젝트의 자동 실행 체크포인트 · 진행 상태는 버림 (같은 단계 ID로 재개 반영되지 않도록)
+            st.session_state.run_checkpoints = {}
+            st.session_state.run_all_status = {}
             
             # 프로젝트 정보를 세션 상태에 설정
             for key, value in st.session_state.user_inputs.items():
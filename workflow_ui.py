@@ -12,9 +12,12 @@ import streamlit as st
 import json
 import time
 from datetime import datetime
-from user_state import get_user_inputs, save_step_result, append_step_history
+from user_state import (
+    get_user_inputs, save_step_result, append_step_history,
+    get_completion_index, get_completed_step_ids, is_step_completed, set_step_status
+)
 from analysis_system import (
-    AnalysisSystem, PurposeType, ObjectiveType, AnalysisWorkflow
+    AnalysisSystem, PurposeType, ObjectiveType, AnalysisWorkflow, get_analysis_system
 )
 from agent_executor import (
     run_requirement_table,
@@ -36,24 +39,51 @@ from utils_pdf import (
     extract_text_from_pdf,
     get_pdf_summary,
 )
-from dsl_to_prompt import convert_dsl_to_prompt
+from dsl_to_prompt import convert_dsl_to_prompt, estimate_block_output_tokens
 
 # 파일 상단에 상수 정의
 REQUIRED_FIELDS = ["project_name", "building_type", "site_location", "owner", "site_area", "project_goal"]
 FEEDBACK_TYPES = ["추가 분석 요청", "수정 요청", "다른 관점 제시", "구조 변경", "기타"]
 
-def execute_claude_analysis(prompt, description):
-    """Claude 분석 실행 함수 - 세션 상태 기반 모델 선택"""
+def execute_claude_analysis(prompt, description, block_id=None, output_budget=None, dsl_block=None):
+    """Claude 분석 실행 함수 - 세션 선택 모델을 기준으로 블록별 라우팅 및 출력 예산 적용
+
+    dsl_block: 지정하고 구조화 출력이 켜져 있으면 JSON으로 요청 (검증된 구조화 결과는 commit_step_result에서 함께 저장)
+    """
     
-    # 세션 상태에서 선택된 모델 가져오기
+    # 세션 상태에서 선택된 모델 가져오기 (라우터의 기준 모델)
     selected_model = st.session_state.get('selected_model', 'claude-sonnet-4-20250514')
     
-    # SDK 방식으로 실행 (DSPy 설정 변경 없이) - 재시도 로직 포함
-    from init_dspy import execute_with_sdk_with_retry
+    # SDK 방식으로 실행 (DSPy 설정 변경 없이) - 라우팅 및 재시도 로직 포함
+    from init_dspy import execute_with_routing
+    from structured_output import execute_structured, is_structured_block
+    
+    # 구조화 출력 (검증 실패 시 아래 마크다운 출력으로 다시 요청)
+    if st.session_state.get('structured_output', False) and block_id and is_structured_block(dsl_block):
+        with st.spinner(f"{description} 분석 중... (구조화 출력)"):
+            result, structured = execute_structured(
+                prompt,
+                dsl_block,
+                block_id=block_id,
+                preferred_model=selected_model,
+                hedge=st.session_state.get('enable_hedging', False),
+                output_budget=output_budget
+            )
+        if result:
+            st.session_state.setdefault('pending_structured', {})[block_id] = {"result": result, "structured": structured}
+            return result
+        st.info("ℹ️ 구조화 출력 검증에 실패해 일반 출력으로 다시 요청합니다.")
     
     # 진행 상황 표시
     with st.spinner(f"{description} 분석 중... (재시도 로직 포함)"):
-        result = execute_with_sdk_with_retry(prompt, selected_model, max_retries=3)
+        result = execute_with_routing(
+            prompt,
+            block_id=block_id,
+            preferred_model=selected_model,
+            max_retries=3,
+            hedge=st.session_state.get('enable_hedging', False),
+            output_budget=output_budget
+        )
     
     # 오류 메시지 개선
     if result.startswith("❌") or result.startswith("⚠️"):
@@ -64,10 +94,306 @@ def execute_claude_analysis(prompt, description):
     
     return result
 
+def session_model_context():
+    """세션에서 선택한 모델을 현재 요청에만 적용하는 DSPy 컨텍스트"""
+    from init_dspy import model_context
+    return model_context(st.session_state.get('selected_model', 'claude-sonnet-4-20250514'))
+
+def session_prompt_budget():
+    """세션에서 선택한 모델의 프롬프트 토큰 예산"""
+    from init_dspy import get_prompt_token_budget
+    return get_prompt_token_budget(st.session_state.get('selected_model', 'claude-sonnet-4-20250514'))
+
+def get_analysis_context():
+    """세션별 이전 결과 컨텍스트 (단계 다이제스트 보관)"""
+    if 'analysis_context' not in st.session_state:
+        from analysis_context import RollingContext
+        st.session_state.analysis_context = RollingContext()
+    return st.session_state.analysis_context
+
+def build_previous_results(dsl_block, exclude_keys=(), cot_history=None):
+    """현재 블록용 이전 결과 섹션 - 직접 선행 단계는 원문, 간접 선행 단계는 다이제스트 (토큰 예산 내)
+
+    cot_history: 지정하면 세션 기록 대신 사용 (병렬 실행 중 아직 반영되지 않은 결과 포함용)
+    """
+    from analysis_context import build_previous_results_for_block
+    
+    if cot_history is None:
+        cot_history = st.session_state.get('cot_history', [])
+    return build_previous_results_for_block(dsl_block, cot_history, get_analysis_context(), exclude_keys=exclude_keys)
+
+def get_session_step_graph(steps=None):
+    """현재 워크플로우의 단계 의존 그래프와 단계별 결과 해시 (변경 전파 판정용, 결과 해시는 완료 색인 기준)"""
+    from analysis_system import build_step_dag, RESULT_STATUSES
+    
+    if steps is None:
+        steps = st.session_state.get('workflow_steps', [])
+    result_hashes = {
+        step_id: entry['result_hash']
+        for step_id, entry in get_completion_index().items()
+        if entry.get('status') in RESULT_STATUSES and entry.get('result_hash')
+    }
+    return build_step_dag(steps), result_hashes
+
+def commit_step_result(step_id, title, prompt, result, upstream_hashes=None, input_hash=None, structured=None):
+    """
+    단계 결과 반영 - 결과 저장 · 이력 · cot_history · 다이제스트 · 실행 기록 갱신 후 자동 저장 (메인 스레드 전용).
+    이미 결과가 있는 단계(재분석 · 피드백 반영)는 cot_history의 해당 단계 항목을 교체하고,
+    결과가 바뀌면 이 결과를 사용한 이후 단계는 오래된 단계로 표시됨
+    upstream_hashes / input_hash: 실행 당시 값 (생략하면 현재 선행 단계 결과로 계산)
+    structured: 구조화 출력 결과 (생략하면 execute_claude_analysis가 이 결과로 남긴 구조화 결과 사용)
+    """
+    from analysis_core import make_history_entry
+    from step_lineage import get_upstream_hashes, make_input_hash, make_lineage_record, cache_step_result
+    
+    pending = st.session_state.get('pending_structured', {}).pop(step_id, None)
+    if structured is None and pending and pending["result"] == result:
+        structured = pending["structured"]
+    
+    save_step_result(step_id, result, title)
+    append_step_history(step_id, title, prompt, result)
+    
+    # cot_history에도 반영 (기존 호환성 유지) - 같은 단계가 있으면 교체
+    if 'cot_history' not in st.session_state:
+        st.session_state.cot_history = []
+    existing = next(
+        (h for h in st.session_state.cot_history if h.get('step_id') == step_id or h.get('step') == title),
+        None
+    )
+    entry = make_history_entry(title, step_id, result, structured)
+    if existing is not None:
+        # 이전 결과의 구조화 결과 · 요약은 새 결과와 맞지 않으므로 제거
+        for key in ('structured', 'summary', 'insight'):
+            existing.pop(key, None)
+        existing.update(entry)
+    else:
+        st.session_state.cot_history.append(entry)
+    # 다음 단계 프롬프트용 다이제스트 갱신
+    get_analysis_context().update(step_id, result)
+    # 실행 기록 (입력 해시 · 선행 단계 결과 해시) 및 입력 해시별 결과 캐시
+    if upstream_hashes is None:
+        dag, result_hashes = get_session_step_graph()
+        upstream_hashes = get_upstream_hashes(step_id, dag, result_hashes)
+    input_hash = input_hash or make_input_hash(prompt, upstream_hashes)
+    st.session_state.setdefault('step_lineage', {})[step_id] = make_lineage_record(input_hash, result, upstream_hashes)
+    cache_step_result(st.session_state.setdefault('step_result_cache', {}), input_hash, result)
+    # 반영된 단계의 자동 실행 체크포인트 정리
+    st.session_state.get('run_checkpoints', {}).pop(step_id, None)
+    # 이 결과를 사용한 이후 단계의 오래됨 상태 갱신
+    refresh_stale_status()
+    
+    # 자동 저장
+    from user_state import save_user_data
+    save_user_data()
+
+def refresh_stale_status(steps=None):
+    """완료 색인의 오래됨 상태 갱신 - 선행 단계 결과가 바뀐 완료 단계는 stale, 다시 최신이 된 단계는 done"""
+    from analysis_system import STEP_DONE, STEP_STALE, RESULT_STATUSES
+    from step_lineage import find_stale_steps
+    
+    if steps is None:
+        steps = st.session_state.get('workflow_steps', [])
+    dag, result_hashes = get_session_step_graph(steps)
+    stale_ids = set(find_stale_steps(steps, dag, st.session_state.get('step_lineage', {}), result_hashes))
+    index = get_completion_index()
+    for step in steps:
+        status = index.get(step.id, {}).get('status')
+        if status in RESULT_STATUSES and status != (STEP_STALE if step.id in stale_ids else STEP_DONE):
+            set_step_status(step.id, STEP_STALE if step.id in stale_ids else STEP_DONE)
+
+def get_stale_steps(steps):
+    """선행 단계 결과가 바뀐 뒤 다시 계산되지 않은 단계 ID 목록 (워크플로우 순서, 완료 색인 기준)"""
+    from analysis_system import STEP_STALE
+    
+    refresh_stale_status(steps)
+    index = get_completion_index()
+    return [step.id for step in steps if index.get(step.id, {}).get('status') == STEP_STALE]
+
+def run_workflow_dag(current_steps, blocks_by_id, on_update=None, rerun_ids=()):
+    """
+    남은 워크플로우 단계를 의존 그래프 순서로 병렬 자동 실행.
+    세션 상태 읽기와 결과 반영은 이 함수(스크립트 스레드)에서만 수행하고, 결과는 워크플로우 순서대로 cot_history에 반영.
+    단계가 끝나면 즉시 체크포인트(run_checkpoints)를 저장하므로 중단 후 다시 실행하면 완료된 단계는 건너뜀.
+    rerun_ids: 완료됐지만 다시 계산할 단계 (오래된 단계) - 나머지 완료 단계 결과는 그대로 사용
+    반환: (단계 ID → 상태, 단계 ID → 오류 메시지)
+    """
+    from analysis_system import build_step_dag, get_critical_path_length
+    from step_scheduler import DagScheduler
+    from analysis_core import execute_step, merge_pending_results
+    from step_lineage import get_result_hashes, get_upstream_hashes
+    from user_state import save_user_data
+    from analysis_system import STEP_FAILED
+    
+    completed_ids = {step.id for step in current_steps if step.id in get_completed_step_ids()} - set(rerun_ids)
+    runnable_steps = [step for step in current_steps if step.id in blocks_by_id or step.id in completed_ids]
+    dag = build_step_dag(runnable_steps)
+    
+    # 이전 실행에서 완료됐지만 반영되지 않은 결과 (중단 후 재개)
+    checkpoints = st.session_state.setdefault('run_checkpoints', {})
+    preloaded_results = {
+        step_id: ({"prompt": checkpoint.get("prompt", "")}, checkpoint["result"])
+        for step_id, checkpoint in checkpoints.items()
+        if step_id in blocks_by_id and step_id not in completed_ids and checkpoint.get("result")
+    }
+    if preloaded_results:
+        print(f"♻️ 체크포인트에서 {len(preloaded_results)}개 단계 결과 복원")
+    
+    # 세션 값은 실행 전에 한 번 캡처 (워커에서 st.session_state 접근 금지)
+    user_inputs = get_user_inputs()
+    pdf_summary = get_pdf_summary()
+    site_fields = dict(st.session_state.get('site_fields', {}))
+    web_search_settings = dict(st.session_state.get('web_search_settings', {}))
+    model = st.session_state.get('selected_model', 'claude-sonnet-4-20250514')
+    hedge = st.session_state.get('enable_hedging', False)
+    structured_output = st.session_state.get('structured_output', False)
+    token_budget = session_prompt_budget()
+    
+    titles_by_id = {step_id: block['title'] for step_id, block in blocks_by_id.items()}
+    result_cache = dict(st.session_state.get('step_result_cache', {}))
+    
+    def prepare(step, results):
+        block = blocks_by_id[step.id]
+        # 아직 cot_history에 반영되지 않은 완료 결과(다시 계산한 결과 포함)도 선행 단계 컨텍스트로 사용
+        history = merge_pending_results(st.session_state.get('cot_history', []), results, titles_by_id)
+        return {
+            "block": block,
+            "user_inputs": user_inputs,
+            "previous_results": build_previous_results(block, exclude_keys={step.id, block['title']}, cot_history=history),
+            "upstream_hashes": get_upstream_hashes(step.id, dag, get_result_hashes(history, titles_by_id)),
+            "result_cache": result_cache,
+            "pdf_summary": pdf_summary,
+            "site_fields": site_fields,
+            "include_web_search": web_search_settings.get(f"web_search_{step.id}", False),
+            "token_budget": token_budget,
+            "model": model,
+            "hedge": hedge,
+            "structured_output": structured_output
+        }
+    
+    def save_checkpoint(step, payload, result):
+        # 완료 즉시 저장 - 앞선 단계를 기다리는 동안 중단돼도 결과 보존
+        checkpoints[step.id] = {
+            "title": blocks_by_id[step.id]['title'],
+            "prompt": payload.get("prompt", ""),
+            "result": result,
+            "finished_at": datetime.now().isoformat()
+        }
+        save_user_data()
+    
+    def commit(step, payload, result):
+        commit_step_result(
+            step.id, blocks_by_id[step.id]['title'], payload.get("prompt", ""), result,
+            upstream_hashes=payload.get("upstream_hashes"), input_hash=payload.get("input_hash"),
+            structured=payload.get("structured")
+        )
+    
+    last_states = {}
+    
+    def update(scheduler):
+        # 상태가 바뀌었을 때만 진행 상태 저장 (새로고침 후 진행 패널 복원용)
+        if scheduler.states != last_states:
+            last_states.clear()
+            last_states.update(scheduler.states)
+            st.session_state.run_all_status = make_run_all_status(scheduler, active=True)
+            save_user_data()
+        if on_update:
+            on_update(scheduler)
+    
+    pending_count = len(runnable_steps) - len(completed_ids) - len(preloaded_results)
+    print(f"🕸️ DAG 실행: {pending_count}개 단계, 임계 경로 {get_critical_path_length({k: v for k, v in dag.items() if k not in completed_ids}):.0f}단계")
+    
+    scheduler = DagScheduler(
+        runnable_steps, dag, prepare, execute_step, commit,
+        on_update=update, completed_ids=completed_ids,
+        on_result=save_checkpoint, preloaded_results=preloaded_results
+    )
+    # 워커는 payload의 모델로 SDK를 직접 호출하므로 (dspy.context는 스레드 로컬) 모델 컨텍스트 불필요
+    states = scheduler.run()
+    
+    st.session_state.run_all_status = make_run_all_status(scheduler, active=False)
+    # 결과 없이 실패한 단계는 완료 색인에 실패로 기록 (기존 결과가 있는 단계는 그대로 유지)
+    for step_id, state in states.items():
+        if state == "failed" and not is_step_completed(step_id):
+            set_step_status(step_id, STEP_FAILED)
+    
+    # 첫 미완료 단계로 이동 (오래된 단계 재계산은 보던 단계 유지)
+    if not rerun_ids:
+        st.session_state.current_step_index = next(
+            (i for i, step in enumerate(current_steps) if states.get(step.id) != "done"),
+            len(current_steps) - 1
+        )
+    save_user_data()
+    return states, scheduler.errors
+
+def make_run_all_status(scheduler, active):
+    """자동 실행 진행 상태 스냅샷 (세션 저장용)"""
+    return {
+        "active": active,
+        "updated": datetime.now().isoformat(),
+        "steps": {
+            step.id: {
+                "state": scheduler.states[step.id],
+                "attempts": scheduler.attempts.get(step.id, 0),
+                "elapsed": round(scheduler.finished_at.get(step.id, time.time()) - scheduler.started_at[step.id], 1)
+                if step.id in scheduler.started_at else None,
+                "error": scheduler.errors.get(step.id, "")
+            }
+            for step in scheduler.steps
+        }
+    }
+
+def render_run_all_panel(status, blocks_by_id, container=None):
+    """자동 실행 진행 패널 - 전체 진행률과 단계별 상태 · 시도 횟수 · 소요 시간 · 오류"""
+    container = container or st
+    steps = status.get("steps", {})
+    if not steps:
+        return
+    icons = {"pending": "⏳ 대기", "running": "🔄 실행 중", "done": "✅ 완료", "failed": "❌ 실패", "skipped": "⏭️ 건너뜀"}
+    finished = sum(1 for s in steps.values() if s["state"] in ("done", "failed", "skipped"))
+    with container.container():
+        st.progress(finished / len(steps), text=f"자동 실행 {finished} / {len(steps)}")
+        rows = ["| 단계 | 상태 | 시도 | 소요 시간 | 비고 |", "|---|---|---|---|---|"]
+        for step_id, s in steps.items():
+            title = blocks_by_id.get(step_id, {}).get('title', step_id)
+            elapsed = f"{s['elapsed']}s" if s.get("elapsed") is not None else "-"
+            note = (s.get("error") or "").replace("|", "/").replace("\n", " ")[:80]
+            rows.append(f"| {title} | {icons.get(s['state'], s['state'])} | {s.get('attempts', 0)} | {elapsed} | {note} |")
+        st.markdown("\n".join(rows))
+
+def get_step_prefetcher():
+    """세션별 다음 단계 사전 준비기"""
+    if 'step_prefetcher' not in st.session_state:
+        from step_prefetcher import StepPrefetcher
+        st.session_state.step_prefetcher = StepPrefetcher()
+    return st.session_state.step_prefetcher
+
+def prefetch_next_step(current_steps, current_step_index, blocks_by_id, user_inputs, include_web_search=False):
+    """현재 단계 실행과 병행해 다음 단계의 웹 검색 · 고정 프롬프트 섹션 준비"""
+    if current_step_index + 1 >= len(current_steps):
+        return
+    next_step = current_steps[current_step_index + 1]
+    next_block = blocks_by_id.get(next_step.id)
+    if not next_block:
+        return
+    # 다음 단계 웹 검색은 해당 단계 설정 또는 현재 단계 설정을 따름
+    next_web_search = st.session_state.get('web_search_settings', {}).get(f"web_search_{next_step.id}", False) or include_web_search
+    get_step_prefetcher().prefetch(next_step.id, next_block, user_inputs, next_web_search)
+
+def prefetch_workflow_searches(steps, user_inputs):
+    """분석 시작 시 웹 검색이 켜진 모든 단계의 검색어를 모아 중복 제거 후 백그라운드 검색 (캐시 예열)"""
+    from dsl_to_prompt import get_search_queries_for_block
+    from search_helper import warm_search_cache
+    
+    web_search_settings = st.session_state.get('web_search_settings', {})
+    queries = []
+    for step in steps:
+        if web_search_settings.get(f"web_search_{step.id}", False):
+            queries.extend(get_search_queries_for_block(step.id, user_inputs))
+    return warm_search_cache(queries)
+
 def create_analysis_workflow(purpose_enum, objective_enums):
-    """워크플로우 생성 함수"""
-    system = AnalysisSystem()
-    return system.suggest_analysis_steps(purpose_enum, objective_enums)
+    """워크플로우 생성 함수 (공유 AnalysisSystem 사용)"""
+    return get_analysis_system().suggest_analysis_steps(purpose_enum, objective_enums)
 
 def validate_user_inputs(user_inputs):
     """사용자 입력 검증 함수"""
@@ -294,6 +620,7 @@ def render_workflow_summary(workflow: AnalysisWorkflow, system: AnalysisSystem):
             st.session_state.cot_history = []
         st.session_state.workflow_steps = final_steps
         st.session_state.show_feedback = False
+        prefetch_workflow_searches(final_steps, get_user_inputs())
         
         st.success("✅ 분석이 시작되었습니다! 각 단계를 수동으로 진행하세요.")
         st.rerun()
@@ -404,9 +731,53 @@ def render_analysis_execution():
         st.warning("⚠️ 실행할 분석 단계가 없습니다.")
         return
 
-    progress_percentage = ((current_step_index + 1) / total_steps) * 100
+    # 완료 단계 수는 완료 색인 기준 (건너뛰며 실행 · 재계산해도 정확)
+    completed_count = len(get_completed_step_ids() & {step.id for step in current_steps})
+    progress_percentage = (completed_count / total_steps) * 100
     st.progress(progress_percentage / 100)
-    st.write(f"**진행 상황**: {current_step_index + 1} / {total_steps}")
+    st.write(f"**진행 상황**: {current_step_index + 1} / {total_steps} 단계 · 완료 {completed_count}개")
+
+    # 전체 자동 실행 (선행 단계가 끝난 단계들을 동시에 실행, 단계별 체크포인트 저장)
+    run_all_status = st.session_state.get('run_all_status', {})
+    interrupted = run_all_status.get("active") or bool(st.session_state.get('run_checkpoints'))
+    if interrupted:
+        st.warning("⚠️ 이전 자동 실행이 중단되었습니다. 완료된 단계 결과는 보존되어 있으며, 이어서 실행하면 남은 단계만 실행합니다.")
+    
+    run_all_label = "▶️ 자동 실행 이어하기" if interrupted else "⚡ 남은 단계 전체 자동 실행"
+    if st.button(run_all_label, help="남은 단계를 의존 순서에 따라 자동으로 실행합니다. 독립 단계는 동시에 실행되고, 실패한 단계는 재시도됩니다.", key="run_workflow_dag"):
+        if not get_pdf_summary():
+            st.error("❌ PDF 요약 정보가 없습니다. PDF를 다시 업로드해주세요.")
+        else:
+            panel = st.empty()
+            states, errors = run_workflow_dag(
+                current_steps, blocks_by_id,
+                on_update=lambda scheduler: render_run_all_panel(make_run_all_status(scheduler, active=True), blocks_by_id, panel)
+            )
+            failed = [step_id for step_id, state in states.items() if state in ("failed", "skipped")]
+            if not failed:
+                st.rerun()
+            st.error(f"❌ {len(failed)}개 단계가 완료되지 않았습니다. 다시 실행하면 남은 단계만 재시도합니다.")
+    elif run_all_status.get("steps"):
+        with st.expander("📊 최근 자동 실행 결과", expanded=interrupted):
+            render_run_all_panel(run_all_status, blocks_by_id)
+
+    # 선행 단계 결과가 바뀐 뒤 다시 계산되지 않은 단계 (재분석 · 피드백 반영 후)
+    stale_ids = get_stale_steps(current_steps)
+    if stale_ids:
+        stale_titles = [blocks_by_id.get(step_id, {}).get('title', step_id) for step_id in stale_ids]
+        st.warning(f"⚠️ 앞 단계 결과가 바뀌어 {len(stale_ids)}개 단계 결과가 오래되었습니다: {', '.join(stale_titles)}")
+        if st.button(f"🔁 오래된 단계만 다시 계산 ({len(stale_ids)}개)", key="recompute_stale_steps",
+                     help="바뀐 결과를 사용한 단계만 의존 순서대로 다시 실행합니다. 나머지 단계 결과는 그대로 사용합니다."):
+            panel = st.empty()
+            states, errors = run_workflow_dag(
+                current_steps, blocks_by_id,
+                on_update=lambda scheduler: render_run_all_panel(make_run_all_status(scheduler, active=True), blocks_by_id, panel),
+                rerun_ids=set(stale_ids)
+            )
+            failed = [step_id for step_id in stale_ids if states.get(step_id) != "done"]
+            if not failed:
+                st.rerun()
+            st.error(f"❌ {len(failed)}개 단계를 다시 계산하지 못했습니다. 다시 실행하면 남은 단계만 재시도합니다.")
 
     # 4) 현재 단계 표시 및 실행
     if current_step_index < len(current_steps):
@@ -417,14 +788,8 @@ def render_analysis_execution():
         if current_step.id in blocks_by_id:
             current_block = blocks_by_id[current_step.id]
         
-        # 현재 단계의 분석 상태 확인 (수정된 로직)
-        step_completed = False
-        if current_block:
-            # current_block['title']로 저장된 경우 체크
-            step_completed = any(h['step'] == current_block['title'] for h in st.session_state.get('cot_history', []))
-        else:
-            # current_step.title로 저장된 경우 체크
-            step_completed = any(h['step'] == current_step.title for h in st.session_state.get('cot_history', []))
+        # 현재 단계의 분석 상태 확인 (완료 색인 기준)
+        step_completed = is_step_completed(current_step.id)
         
         # 웹 검색 설정 초기화
         if 'web_search_settings' not in st.session_state:
@@ -492,7 +857,14 @@ def render_analysis_execution():
                 key=web_search_key,
                 help="이 단계에서 최신 웹 검색 결과를 포함하여 분석합니다."
             )
-        
+            if st.session_state.web_search_settings[web_search_key]:
+                from search_helper import get_search_cache_stats
+                cache_stats = get_search_cache_stats()
+                st.caption(
+                    f"💾 검색 캐시: 적중 {cache_stats['hit'] + cache_stats['stale']} · "
+                    f"미스 {cache_stats['miss']} · 오프라인 {cache_stats['offline']}"
+                )
+
         # 분석 실행 버튼 (단계가 완료되지 않은 경우에만 표시)
         if not step_completed:
             if current_block:
@@ -530,10 +902,14 @@ def render_analysis_execution():
                         # DSL을 프롬프트로 변환
                         from dsl_to_prompt import convert_dsl_to_prompt
                         
-                        # 이전 분석 결과들 가져오기
-                        previous_results = ""
-                        if st.session_state.get('cot_history'):
-                            previous_results = "\n\n".join([f"**{h['step']}**: {h['result']}" for h in st.session_state.cot_history])
+                        # 이전 단계 실행 중 미리 준비된 입력 (입력이 바뀌었으면 None)
+                        prepared = get_step_prefetcher().get(current_step.id, current_block, user_inputs)
+                        
+                        # 현재 단계 LLM 호출과 병행해 다음 단계 입력 준비
+                        prefetch_next_step(current_steps, current_step_index, blocks_by_id, user_inputs, include_web_search)
+                        
+                        # 이전 분석 결과들 가져오기 (필요 단계 원문 + 나머지 다이제스트)
+                        previous_results = build_previous_results(current_block)
                         
                         # 프롬프트 생성 (웹 검색 설정 반영)
                         prompt = convert_dsl_to_prompt(
@@ -542,7 +918,10 @@ def render_analysis_execution():
                             previous_summary=previous_results,
                             pdf_summary=pdf_summary,
                             site_fields=st.session_state.get('site_fields', {}),
-                            include_web_search=include_web_search  # ✅ 사용자 선택 반영
+                            include_web_search=include_web_search,  # ✅ 사용자 선택 반영
+                            static_sections=prepared["static_sections"] if prepared else None,
+                            web_search_results=prepared["web_search_results"] if prepared else None,
+                            token_budget=session_prompt_budget()
                         )
                         
                         # 웹 검색 상태 표시
@@ -550,28 +929,15 @@ def render_analysis_execution():
                             st.info("🌐 웹 검색이 포함된 분석을 실행합니다...")
                         
                         # Claude 분석 실행
-                        result = execute_claude_analysis(prompt, current_block['title'])
+                        result = execute_claude_analysis(prompt, current_block['title'], block_id=current_step.id, output_budget=estimate_block_output_tokens(current_block), dsl_block=current_block)
                         # 실패 가드: 결과가 없거나 실패 메시지면 즉시 중단
                         if not result or result == f"{current_block['title']} 분석 실패":
                             st.error(f"❌ {current_block['title']} 분석 실패")
                             return
                         
                         if result and result != f"{current_block['title']} 분석 실패":
-                            # 결과 저장
-                            save_step_result(current_step.id, result)
-                            append_step_history(current_step.id, current_block['title'], prompt, result)
-                            
-                            # cot_history에도 추가 (기존 호환성 유지)
-                            if 'cot_history' not in st.session_state:
-                                st.session_state.cot_history = []
-                            st.session_state.cot_history.append({
-                                'step': current_block['title'],
-                                'result': result
-                            })
-                            
-                            # 자동 저장
-                            from user_state import save_user_data
-                            save_user_data()
+                            # 결과 저장 (cot_history · 다이제스트 · 자동 저장 포함)
+                            commit_step_result(current_step.id, current_block['title'], prompt, result)
                             
                             st.success(f"✅ {current_block['title']} 분석 완료!")
                             
@@ -587,7 +953,7 @@ def render_analysis_execution():
                                 # 템플릿이 있는 경우 구조화된 표시
                                 output_structure = content_dsl.get("output_structure", [])
                                 if output_structure:
-                                    parsed_results = parse_analysis_result_by_structure(result, output_structure)
+                                    parsed_results = parse_analysis_result_by_structure(result, output_structure, get_step_structured(current_step.id))
                                     result_tabs = st.tabs(output_structure)
                                     for i, (tab, structure_name) in enumerate(zip(result_tabs, output_structure)):
                                         with tab:
@@ -606,7 +972,7 @@ def render_analysis_execution():
                                 # 기존 방식: 일반 결과 표시
                                 output_structure = current_block.get("content_dsl", {}).get("output_structure", [])
                                 if output_structure:
-                                    parsed_results = parse_analysis_result_by_structure(result, output_structure)
+                                    parsed_results = parse_analysis_result_by_structure(result, output_structure, get_step_structured(current_step.id))
                                     result_tabs = st.tabs(output_structure)
                                     for i, (tab, structure_name) in enumerate(zip(result_tabs, output_structure)):
                                         with tab:
@@ -635,14 +1001,8 @@ def render_analysis_execution():
                                         with st.spinner(f"{current_step.title} 재분석 중..."):
                                             from dsl_to_prompt import convert_dsl_to_prompt
                                             
-                                            previous_results = ""
-                                            if st.session_state.get('cot_history'):
-                                                # 현재 단계 결과 제외
-                                                previous_results = "\n\n".join([
-                                                    f"**{h['step']}**: {h['result']}" 
-                                                    for h in st.session_state.cot_history 
-                                                    if h['step'] != current_block['title']
-                                                ])
+                                            # 현재 단계 결과 제외 (필요 단계 원문 + 나머지 다이제스트)
+                                            previous_results = build_previous_results(current_block, exclude_keys={current_step.id, current_block['title']})
                                             
                                             prompt = convert_dsl_to_prompt(
                                                 dsl_block=current_block,
@@ -650,19 +1010,15 @@ def render_analysis_execution():
                                                 previous_summary=previous_results,
                                                 pdf_summary=pdf_summary,
                                                 site_fields=st.session_state.get('site_fields', {}),
-                                                include_web_search=False
+                                                include_web_search=False,
+                                                token_budget=session_prompt_budget()
                                             )
                                             
-                                            new_result = execute_claude_analysis(prompt, current_block['title'])
+                                            new_result = execute_claude_analysis(prompt, current_block['title'], block_id=current_step.id, output_budget=estimate_block_output_tokens(current_block), dsl_block=current_block)
                                             
                                             if new_result and new_result != f"{current_block['title']} 분석 실패":
-                                                # 기존 결과 업데이트
-                                                for h in st.session_state.cot_history:
-                                                    if h['step'] == current_block['title']:
-                                                        h['result'] = new_result
-                                                        break
-                                                
-                                                save_step_result(current_step.id, new_result)
+                                                # 기존 결과 교체 (이 결과를 사용한 이후 단계는 오래된 단계로 표시)
+                                                commit_step_result(current_step.id, current_block['title'], prompt, new_result)
                                                 st.success("✅ 재분석 완료!")
                                                 st.rerun()
                                             else:
@@ -702,15 +1058,23 @@ def render_analysis_execution():
                                             try:
                                                 # 피드백 처리 프롬프트 생성
                                                 current_results = st.session_state.current_step_outputs
-                                                original_result = current_results.get("original_result", "")
-                                                if not original_result:
-                                                    # 원본 결과가 없으면 현재 결과를 원본으로 저장
-                                                    original_result = "\n\n".join([
-                                                        f"**{key}**: {value}" 
-                                                        for key, value in current_results.items() 
-                                                        if key != "saved" and key != "original_result" and key != "updated_result" and key != "feedback_applied"
-                                                    ])
-                                                    st.session_state.current_step_outputs["original_result"] = original_result
+                                                snapshot = current_results.get("feedback_original")
+                                                if not (snapshot and snapshot.get("step_id") == current_step.id and current_results.get("feedback_applied")):
+                                                    # 첫 피드백 직전 상태 보관 (반영된 결과 원문 · 프롬프트 · 실행 기록, 되돌리기용)
+                                                    from step_lineage import snapshot_step_state
+                                                    snapshot = snapshot_step_state(
+                                                        current_step.id, current_block['title'],
+                                                        st.session_state.get('cot_history', []),
+                                                        st.session_state.get('step_history', []),
+                                                        st.session_state.get('step_lineage', {})
+                                                    )
+                                                    st.session_state.current_step_outputs["feedback_original"] = snapshot
+                                                original_result = snapshot["result"] or "\n\n".join([
+                                                    # 반영된 결과가 없으면 현재 출력으로 구성 (프롬프트용)
+                                                    f"**{key}**: {value}"
+                                                    for key, value in current_results.items()
+                                                    if key not in ("saved", "feedback_original", "updated_result", "feedback_applied")
+                                                ])
                                                 
                                                 feedback_prompt = f"""
 기존 분석 결과:
@@ -736,7 +1100,8 @@ def render_analysis_execution():
                                                 
                                                 # 피드백 처리 실행
                                                 from agent_executor import execute_agent
-                                                updated_result = execute_agent(feedback_prompt)
+                                                with session_model_context():
+                                                    updated_result = execute_agent(feedback_prompt)
                                                 
                                                 # 업데이트된 결과 저장
                                                 st.session_state.current_step_outputs["updated_result"] = updated_result
@@ -754,9 +1119,8 @@ def render_analysis_execution():
                                                     "timestamp": time.time()
                                                 })
                                                 
-                                                # cot_history 업데이트 (마지막 항목을 업데이트된 결과로 교체)
-                                                if st.session_state.cot_history:
-                                                    st.session_state.cot_history[-1]["result"] = updated_result
+                                                # 현재 단계 결과를 피드백 반영 결과로 교체 (이후 단계는 오래된 단계로 표시)
+                                                commit_step_result(current_step.id, current_block['title'], feedback_prompt, updated_result)
                                                 
                                                 st.success("✅ 피드백이 처리되었습니다!")
                                                 st.info(" 피드백이 적용된 결과가 아래에 표시됩니다.")
@@ -789,11 +1153,14 @@ def render_analysis_execution():
                                 if st.session_state.get('current_step_outputs', {}).get("feedback_applied"):
                                     if st.button("🔄 원본 결과로 되돌리기", key=f"revert_original_{current_step.id}"):
                                         st.session_state.current_step_outputs["feedback_applied"] = False
-                                        if st.session_state.cot_history:
-                                            # 원본 결과로 되돌리기
-                                            original_result = st.session_state.current_step_outputs.get("original_result", "")
-                                            if original_result:
-                                                    st.session_state.cot_history[-1]["result"] = original_result
+                                        # 반영돼 있던 원본 결과 · 프롬프트 · 실행 기록으로 되돌리기 (입력이 같은 이후 단계는 다시 최신 상태가 됨)
+                                        snapshot = st.session_state.current_step_outputs.get("feedback_original") or {}
+                                        if snapshot.get("step_id") == current_step.id and snapshot.get("result"):
+                                            commit_step_result(
+                                                current_step.id, current_block['title'], snapshot["prompt"], snapshot["result"],
+                                                upstream_hashes=snapshot["lineage"].get("upstream"),
+                                                input_hash=snapshot["lineage"].get("input_hash")
+                                            )
                                         st.rerun()
                             
                                 # 피드백 취소 버튼
@@ -857,7 +1224,7 @@ def render_analysis_execution():
                         st.code(step_result[:1000] + "..." if len(step_result) > 1000 else step_result)
                 
                 # 결과를 구조별로 파싱
-                parsed_results = parse_analysis_result_by_structure(step_result, output_structure)
+                parsed_results = parse_analysis_result_by_structure(step_result, output_structure, get_step_structured(current_step.id))
                 
                 # output_structure 기반 탭 생성
                 result_tabs = st.tabs(output_structure)
@@ -912,14 +1279,8 @@ def render_analysis_execution():
                         with st.spinner(f"{current_block['title']} 재분석 중..."):
                             from dsl_to_prompt import convert_dsl_to_prompt
                             
-                            previous_results = ""
-                            if st.session_state.get('cot_history'):
-                                # 현재 단계 결과 제외
-                                previous_results = "\n\n".join([
-                                    f"**{h['step']}**: {h['result']}" 
-                                    for h in st.session_state.cot_history 
-                                    if h['step'] != current_block['title']
-                                ])
+                            # 현재 단계 결과 제외 (필요 단계 원문 + 나머지 다이제스트)
+                            previous_results = build_previous_results(current_block, exclude_keys={current_step.id, current_block['title']})
                             
                             prompt = convert_dsl_to_prompt(
                                 dsl_block=current_block,
@@ -927,19 +1288,15 @@ def render_analysis_execution():
                                 previous_summary=previous_results,
                                 pdf_summary=pdf_summary,
                                 site_fields=st.session_state.get('site_fields', {}),
-                                include_web_search=False
+                                include_web_search=False,
+                                token_budget=session_prompt_budget()
                             )
                             
-                            new_result = execute_claude_analysis(prompt, current_block['title'])
+                            new_result = execute_claude_analysis(prompt, current_block['title'], block_id=current_step.id, output_budget=estimate_block_output_tokens(current_block), dsl_block=current_block)
                             
                             if new_result and new_result != f"{current_block['title']} 분석 실패":
-                                # 기존 결과 업데이트
-                                for h in st.session_state.cot_history:
-                                    if h['step'] == current_block['title']:
-                                        h['result'] = new_result
-                                        break
-                                
-                                save_step_result(current_step.id, new_result)
+                                # 기존 결과 교체 (이 결과를 사용한 이후 단계는 오래된 단계로 표시)
+                                commit_step_result(current_step.id, current_block['title'], prompt, new_result)
                                 st.success("✅ 재분석 완료!")
                                 st.rerun()
                             else:
@@ -1004,13 +1361,12 @@ def render_analysis_execution():
                                 
                                 # 피드백 처리 실행
                                 from agent_executor import execute_agent
-                                updated_result = execute_agent(feedback_prompt)
+                                with session_model_context():
+                                    updated_result = execute_agent(feedback_prompt)
                                 
-                                # cot_history 업데이트
-                                for h in st.session_state.cot_history:
-                                    if h['step'] == current_step.title:
-                                        h['result'] = updated_result
-                                        break
+                                # 현재 단계 결과 교체 (이후 단계는 오래된 단계로 표시)
+                                step_title = current_block['title'] if current_block else current_step.title
+                                commit_step_result(current_step.id, step_title, feedback_prompt, updated_result)
                                 
                                 # 피드백 히스토리에 추가
                                 if "feedback_history" not in st.session_state:
@@ -1207,7 +1563,8 @@ def render_optimization_tab():
                 cot_history = st.session_state.cot_history if has_analysis else []
                 
                 # 외부 문서 내용을 포함한 최적화 분석 실행
-                optimization_result = generate_optimization_analysis_with_external_content(user_inputs, cot_history, analysis_summary)
+                with session_model_context():
+                    optimization_result = generate_optimization_analysis_with_external_content(user_inputs, cot_history, analysis_summary)
                 
                 # 결과를 session_state에 저장
                 st.session_state.optimization_result = optimization_result
@@ -1800,7 +2157,8 @@ def render_claude_narrative_tab():
                 
                 # Narrative 생성 함수 호출
                 from agent_executor import generate_narrative
-                narrative_result = generate_narrative(narrative_prompt)
+                with session_model_context():
+                    narrative_result = generate_narrative(narrative_prompt)
                 
                 # 결과를 세션에 저장
                 st.session_state.narrative_result = narrative_result
@@ -1885,7 +2243,8 @@ def render_claude_narrative_tab():
                         
                         # 재생성 실행
                         from agent_executor import generate_narrative
-                        updated_narrative = generate_narrative(feedback_prompt)
+                        with session_model_context():
+                            updated_narrative = generate_narrative(feedback_prompt)
                         
                         # 결과 업데이트
                         st.session_state.narrative_result = updated_narrative
@@ -2056,11 +2415,12 @@ def render_midjourney_prompt_tab():
                 }
                 
                 # generate_midjourney_prompt 함수 호출
-                prompt_result = generate_midjourney_prompt(
-                    user_inputs, 
-                    st.session_state.get('cot_history', []), 
-                    image_settings
-                )
+                with session_model_context():
+                    prompt_result = generate_midjourney_prompt(
+                        user_inputs, 
+                        st.session_state.get('cot_history', []), 
+                        image_settings
+                    )
                 
                 # 결과 표시
                 st.success("✅ 이미지 생성 프롬프트 생성 완료!")
@@ -2214,96 +2574,21 @@ def render_midjourney_prompt_tab():
     
 #     # 분석 결과 요약 제거 - 중복되는 부분 삭제
 
-def parse_analysis_result_by_structure(result: str, output_structure: list) -> dict:
-    """완전히 개선된 분석 결과 파싱 함수"""
-    parsed_results = {}
-    
-    # 각 구조별로 정확한 경계 찾기
-    for i, structure in enumerate(output_structure, 1):
-        # 정확한 마커 패턴들 (우선순위 순)
-        markers = [
-            f"## {i}. {structure}",
-            f"## {structure}",
-            f"{i}. {structure}",
-            f"### {structure}",
-            f"**{structure}**",
-            structure
-        ]
-        
-        content = None
-        start_idx = -1
-        used_marker = None
-        
-        # 마커 찾기
-        for marker in markers:
-            start_idx = result.find(marker)
-            if start_idx != -1:
-                used_marker = marker
-                break
-        
-        if start_idx != -1:
-            # 다음 구조의 시작 위치 찾기
-            end_idx = len(result)
-            
-            # 다음 번호의 구조 찾기
-            for j, next_structure in enumerate(output_structure[i:], i+1):
-                next_markers = [
-                    f"## {j}. {next_structure}",
-                    f"## {next_structure}",
-                    f"{j}. {next_structure}",
-                    f"### {next_structure}",
-                    f"**{next_structure}**"
-                ]
-                
-                for next_marker in next_markers:
-                    next_idx = result.find(next_marker, start_idx + len(used_marker))
-                    if next_idx != -1 and next_idx < end_idx:
-                        end_idx = next_idx
-                        break
-                
-                if end_idx < len(result):
-                    break
-            
-            # 내용 추출
-            content_start = start_idx + len(used_marker)
-            content = result[content_start:end_idx].strip()
-            
-            # 앞뒤 공백 및 불필요한 문자 제거
-            content = content.strip()
-            if content.startswith('\n'):
-                content = content[1:]
-            if content.endswith('\n'):
-                content = content[:-1]
-            
-            # 내용이 너무 짧으면 무효로 처리
-            if len(content) < 10:
-                content = None
-        
-        # 내용을 찾지 못한 경우
-        if not content:
-            # 키워드 기반 검색
-            keywords = structure.lower().split()
-            lines = result.split('\n')
-            
-            relevant_lines = []
-            for line in lines:
-                line_lower = line.lower()
-                if any(keyword in line_lower for keyword in keywords):
-                    relevant_lines.append(line)
-            
-            if relevant_lines:
-                content = '\n'.join(relevant_lines[:10])  # 최대 10줄
-            else:
-                content = f"⚠️ '{structure}' 구조의 결과를 찾을 수 없습니다."
-        
-        parsed_results[structure] = content
-    
-    return parsed_results
+def parse_analysis_result_by_structure(result: str, output_structure: list, structured: dict = None) -> dict:
+    """분석 결과를 output_structure 항목별로 분리 (구조화 결과가 있으면 파싱 없이 사용, 없으면 섹션 마커를 한 번만 색인)"""
+    if structured:
+        from structured_output import get_structured_sections
+        return get_structured_sections(structured, output_structure)
+    from section_parser import parse_sections
+    return parse_sections(result, output_structure)
+
+def get_step_structured(step_id: str):
+    """cot_history에 저장된 단계의 구조화 출력 결과 (없으면 None)"""
+    return next((h.get('structured') for h in st.session_state.get('cot_history', []) if h.get('step_id') == step_id), None)
 
 def create_analysis_workflow(purpose_enum, objective_enums):
-    """워크플로우 생성 함수"""
-    system = AnalysisSystem()
-    return system.suggest_analysis_steps(purpose_enum, objective_enums)
+    """워크플로우 생성 함수 (공유 AnalysisSystem 사용)"""
+    return get_analysis_system().suggest_analysis_steps(purpose_enum, objective_enums)
 
 def validate_user_inputs(user_inputs):
     """사용자 입력 검증 함수"""
@@ -2543,8 +2828,8 @@ def render_analysis_workflow():
     # 1단계: 목적과 용도 선택
     st.subheader("1단계: 분석 목적과 용도 선택")
     
-    from analysis_system import AnalysisSystem, PurposeType, ObjectiveType
-    system = AnalysisSystem()
+    from analysis_system import PurposeType, ObjectiveType
+    system = get_analysis_system()
     
     # 용도 선택
     purpose_options = [purpose.value for purpose in PurposeType]
@@ -2624,7 +2909,7 @@ def render_analysis_workflow():
                         from analysis_system import AnalysisStep
                         
                         # 권장 순서에 따른 적절한 위치 찾기
-                        cot_order = system._load_recommended_cot_order()
+                        cot_order = system.catalog.cot_order
                         new_step_order = cot_order.get(block_id, 999)  # 기본값을 높게 설정
                         
                         new_step = AnalysisStep(
@@ -2708,8 +2993,7 @@ def render_analysis_workflow():
             
             with col1:
                 if st.button("🔄 권장 순서 제안", type="secondary", help="선택된 단계들을 권장 CoT 순서로 재정렬합니다", key="recommend_order_workflow"):
-                    from analysis_system import AnalysisSystem
-                    system = AnalysisSystem()
+                    system = get_analysis_system()
                     
                     # 현재 단계들을 권장 순서로 정렬 (editable_steps 사용)
                     sorted_steps = system.sort_steps_by_recommended_order(st.session_state.editable_steps)
@@ -2728,6 +3012,7 @@ def render_analysis_workflow():
                     # 분석 시작 시 editable_steps를 workflow_steps로 복사
                     st.session_state.workflow_steps = st.session_state.editable_steps.copy()
                     st.session_state.analysis_started = True
+                    prefetch_workflow_searches(st.session_state.workflow_steps, user_inputs)
                     # current_step_index를 0으로 초기화하지 않고 기존 값 유지
                     if 'current_step_index' not in st.session_state:
                         st.session_state.current_step_index = 0